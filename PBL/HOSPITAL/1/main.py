@@ -1,4 +1,7 @@
+import hashlib
+import io
 import os
+from collections import OrderedDict
 from pathlib import Path
 from tkinter import *
 from tkinter import messagebox
@@ -49,12 +52,33 @@ if not logo_path.exists():
 # Simple Excel-based Data Initialization
 # ------------------------------------------------------------
 patients_file = DATA / "patients.xlsx"
+
+def save_patients(df):
+    # Write a temp workbook (unique per writer) and rename it over the old
+    # one, then fsync the folder, so a crash mid-save never leaves a
+    # half-written or missing patients.xlsx
+    temp = patients_file.with_name(f".patients.{os.getpid()}.{os.urandom(4).hex()}.tmp.xlsx")
+    try:
+        df.to_excel(temp, index=False)
+        with open(temp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(temp, patients_file)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    if os.name == "posix":
+        dir_fd = os.open(DATA, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
 if not patients_file.exists():
     df = pd.DataFrame([
         {"ID": 1, "Name": "Akbar", "Age": 35, "Gender": "Male", "Visits": 3},
         {"ID": 2, "Name": "Priya", "Age": 29, "Gender": "Female", "Visits": 5},
     ])
-    df.to_excel(patients_file, index=False)
+    save_patients(df)
 
 # ------------------------------------------------------------
 # Dashboard Windows
@@ -114,7 +138,7 @@ def add_patient():
         new_id = df["ID"].max() + 1
         new_row = {"ID": new_id, "Name": name, "Age": int(age), "Gender": gender, "Visits": 1}
         df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        df.to_excel(patients_file, index=False)
+        save_patients(df)
         messagebox.showinfo("Success", f"Patient {name} added successfully!")
         win.destroy()
 
@@ -131,6 +155,51 @@ def add_patient():
 
     tb.Button(win, text="Save", bootstyle=SUCCESS, command=save_patient).grid(row=3, column=0, columnspan=2, pady=10)
 
+QR_CACHE_DIR = IMAGES / "qr_cache"
+QR_MEMORY = OrderedDict()   # content hash -> PNG bytes, most recent last
+
+def qr_png(text, memory_limit=64, disk_limit=500):
+    """PNG bytes of a QR code, rendered only the first time its text is seen."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    if key in QR_MEMORY:
+        QR_MEMORY.move_to_end(key)
+        return QR_MEMORY[key]
+    cached = QR_CACHE_DIR / f"{key}.png"
+    # Other running instances share the cache: any file may be pruned under us
+    try:
+        png = cached.read_bytes()
+        cached.touch()
+    except OSError:
+        buffer = io.BytesIO()
+        qrcode.make(text).save(buffer, format="PNG")
+        png = buffer.getvalue()
+        QR_CACHE_DIR.mkdir(exist_ok=True)
+        tmp = cached.with_name(f"{key}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
+        tmp.write_bytes(png)
+        os.replace(tmp, cached)
+        prune_qr_cache(keep=cached, limit=disk_limit)
+    QR_MEMORY[key] = png
+    if len(QR_MEMORY) > memory_limit:
+        QR_MEMORY.popitem(last=False)
+    return png
+
+def prune_qr_cache(keep=None, limit=500):
+    """Delete the least recently used PNGs beyond limit, sparing keep."""
+    used = []
+    for f in QR_CACHE_DIR.glob("*.png"):
+        try:
+            used.append((f.stat().st_mtime, f))
+        except OSError:  # removed by another instance meanwhile
+            pass
+    used.sort()
+    for _, old in used[:max(len(used) - limit, 0)]:
+        if old == keep:
+            continue
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
 def generate_qr():
     df = pd.read_excel(patients_file)
     patient_names = df["Name"].tolist()
@@ -140,9 +209,10 @@ def generate_qr():
         if not selected:
             messagebox.showerror("Error", "Select a patient")
             return
-        qr_img = qrcode.make(f"Patient: {selected}")
         save_path = IMAGES / f"{selected}_qr.png"
-        qr_img.save(save_path)
+        png = qr_png(f"Patient: {selected}")
+        if not save_path.exists() or save_path.read_bytes() != png:
+            save_path.write_bytes(png)
         messagebox.showinfo("Success", f"QR Code saved to {save_path}")
 
     qr_win = Toplevel()
@@ -11,17 +11,21 @@ Features:
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk, ImageDraw, ImageFont
-import csv, os, qrcode, zipfile, shutil
+import csv, os, io, qrcode, zipfile, shutil, hashlib, json
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 import random
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # Optional reportlab for proper PDF invoice
 try:
     from reportlab.lib.pagesizes import A4
     from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
     REPORTLAB_AVAILABLE = True
 except:
     REPORTLAB_AVAILABLE = False
@@ -50,12 +54,141 @@ def read_csv(fname):
     with open(path, newline='', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
+def atomic_write(path, write, newline=None):
+    # unique temp file next to path, fsynced and renamed over it, then the folder
+    # fsynced: a crash (or a second writer) never leaves a truncated or mixed file
+    directory, name = os.path.split(os.path.abspath(path))
+    temp = os.path.join(directory, f'.{name}.{os.getpid()}.{os.urandom(4).hex()}.tmp')
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline=newline) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temp, os.stat(path).st_mode & 0o7777)
+        os.replace(temp, path)
+    except BaseException:
+        try: os.remove(temp)
+        except OSError: pass
+        raise
+    if os.name == 'posix':
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try: os.fsync(dir_fd)
+        finally: os.close(dir_fd)
+
 def write_csv(fname, fieldnames, rows):
-    path = os.path.join(DATA_DIR, fname)
-    with open(path, 'w', newline='', encoding='utf-8') as f:
+    def write(f):
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows)
+    atomic_write(os.path.join(DATA_DIR, fname), write, newline='')
+
+# Charts are drawn on one background thread (object API, no pyplot state)
+# and only redrawn when their data changed or the image file is gone
+CHART_POOL = ThreadPoolExecutor(max_workers=1)
+_chart_hashes = {}   # outpath -> hash of the data last drawn there
+
+def render_chart(outpath, kind, labels, values, title, figsize):
+    fig = Figure(figsize=figsize); FigureCanvasAgg(fig); ax = fig.add_subplot(111)
+    if kind == 'pie': ax.pie(values, labels=labels, autopct='%1.1f%%')
+    else: ax.plot(labels, values, marker='o')
+    ax.set_title(title); fig.tight_layout(); fig.savefig(outpath)
+
+def submit_chart(outpath, kind, labels, values, title, figsize):
+    digest = hashlib.sha1(json.dumps([kind, labels, values, title, figsize]).encode('utf-8')).hexdigest()
+    if _chart_hashes.get(outpath) == digest and os.path.exists(outpath):
+        done = Future(); done.set_result(outpath); return done
+    def run():
+        render_chart(outpath, kind, labels, values, title, figsize)
+        _chart_hashes[outpath] = digest
+        return outpath
+    return CHART_POOL.submit(run)
+
+# QR codes by content hash: PNG bytes in a small LRU plus a bounded folder of
+# <hash>.png files shared with the invoice workers (no billqr_* per export)
+QR_DIR = os.path.join(IMG_DIR, 'qr_cache'); os.makedirs(QR_DIR, exist_ok=True)
+_qr_memory = OrderedDict()
+
+def qr_png_path(data):
+    # several document workers share QR_DIR: any file may vanish under us (pruned by another)
+    path = os.path.join(QR_DIR, hashlib.sha256(data.encode('utf-8')).hexdigest() + '.png')
+    try: os.utime(path); return path
+    except OSError: pass
+    tmp = f'{path}.{os.getpid()}.{os.urandom(4).hex()}.tmp'; qrcode.make(data).save(tmp); os.replace(tmp, path)
+    prune_qr_cache(keep=path)
+    return path
+
+def prune_qr_cache(keep=None, limit=500):
+    used = []
+    for f in os.listdir(QR_DIR):
+        if not f.endswith('.png'): continue
+        try: used.append((os.path.getmtime(os.path.join(QR_DIR, f)), os.path.join(QR_DIR, f)))
+        except OSError: pass  # removed by another worker meanwhile
+    used.sort()
+    for _, old in used[:max(len(used) - limit, 0)]:
+        if old == keep: continue
+        try: os.remove(old)
+        except OSError: pass
+
+def qr_png(data):
+    if data in _qr_memory: _qr_memory.move_to_end(data); return _qr_memory[data]
+    try:
+        with open(qr_png_path(data), 'rb') as f: png = f.read()
+    except FileNotFoundError:  # pruned by another worker right after it was written
+        buf = io.BytesIO(); qrcode.make(data).save(buf); png = buf.getvalue()
+    _qr_memory[data] = png
+    if len(_qr_memory) > 128: _qr_memory.popitem(last=False)
+    return png
+
+def qr_image(data):
+    img = Image.open(io.BytesIO(qr_png(data))); img.load(); return img
+
+def write_invoice(bill_rec):
+    # runs in a document worker; returns the PDF (or PNG without reportlab)
+    out_pdf = os.path.join(IMG_DIR, f'bill_{bill_rec["billId"]}.pdf')
+    out_img = os.path.join(IMG_DIR, f'bill_{bill_rec["billId"]}.png')
+    if REPORTLAB_AVAILABLE:
+        c = canvas.Canvas(out_pdf, pagesize=A4)
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(40,800,"Smart Hospital - Invoice")
+        c.setFont("Helvetica", 12)
+        c.drawString(40,770,f"Bill ID: {bill_rec['billId']}")
+        c.drawString(40,750,f"Patient ID: {bill_rec.get('patientId','')}")
+        c.drawString(40,730,f"Amount: ₹{bill_rec.get('amount','')}")
+        c.drawString(40,710,f"Date: {bill_rec.get('date','')}")
+        c.drawString(40,690,f"Mode: {bill_rec.get('mode','')}")
+        c.drawString(40,670,f"Paid: {bill_rec.get('paid','')}")
+        # QR
+        c.drawImage(ImageReader(io.BytesIO(qr_png(f"bill:{bill_rec['billId']}"))), 420, 720, width=120, height=120)
+        c.showPage(); c.save()
+        return out_pdf
+    # image invoice
+    img = Image.new('RGB',(700,900),(255,255,255)); d = ImageDraw.Draw(img)
+    try:
+        fnt = ImageFont.truetype('arial.ttf', 16)
+    except:
+        fnt = ImageFont.load_default()
+    d.text((30,40), 'Smart Hospital - Invoice', font=fnt, fill=(0,0,0))
+    d.text((30,80), f"Bill ID: {bill_rec['billId']}")
+    d.text((30,110), f"Patient ID: {bill_rec.get('patientId','')}")
+    d.text((30,140), f"Amount: ₹{bill_rec.get('amount','')}")
+    d.text((30,170), f"Date: {bill_rec.get('date','')}")
+    d.text((30,200), f"Mode: {bill_rec.get('mode','')}")
+    d.text((30,230), f"Paid: {bill_rec.get('paid','')}")
+    qr = qr_image(f"bill:{bill_rec['billId']}"); qr.thumbnail((160,160)); img.paste(qr, (480,90))
+    img.save(out_img)
+    return out_img
+
+# Invoices are written by worker processes (reportlab is already loaded by
+# the module import each worker does), so the UI never waits on a document
+_doc_pool = None
+def doc_pool():
+    global _doc_pool
+    if _doc_pool is None:
+        try: _doc_pool = ProcessPoolExecutor(max_workers=2)
+        except (OSError, NotImplementedError): _doc_pool = ThreadPoolExecutor(max_workers=1)
+    return _doc_pool
 
 # Simple undo stack (simulating Java stack)
 class SimpleStack:
@@ -67,6 +200,32 @@ class SimpleStack:
 
 UNDO_STACK = SimpleStack()
 
+# Income pre-summed per month (and per payment mode), kept up to date as bills are added/undone
+class IncomeRollup:
+    def __init__(self, bills=()):
+        self.months = {}; self.modes = {}; self.counts = {}
+        for b in bills: self.add(b)
+    def _parts(self, b):
+        try:
+            amt = float(b.get('amount', 0))
+            month = datetime.strptime(b.get('date',''), '%Y-%m-%d').strftime('%Y-%m')
+        except:
+            return None, None, 0.0
+        return month, b.get('mode','') or 'Cash', amt
+    def add(self, b, sign=1):
+        month, mode, amt = self._parts(b)
+        if month is None: return
+        self.counts[month] = self.counts.get(month, 0) + sign
+        if not self.counts[month]:
+            del self.counts[month]; self.months.pop(month, None)
+        else:
+            self.months[month] = self.months.get(month, 0) + sign*amt
+        self.modes[mode] = self.modes.get(mode, 0) + sign*amt
+    def remove(self, b): self.add(b, -1)
+    def series(self, start=None, end=None):
+        keys = sorted(k for k in self.months if (start is None or k >= start) and (end is None or k <= end))
+        return keys, [self.months[k] for k in keys]
+
 # Create sample data if missing
 def ensure_sample_data():
     if not read_csv('doctors.csv'):
@@ -131,23 +290,26 @@ class SHMSApp(tk.Tk):
         self.load_all()
         self.show_login_selection()
 
+    # The lists below are the authoritative state once loaded: actions change
+    # them in place and save_all(<table>) writes just the tables they touched,
+    # so nothing has to be re-read from disk after a save.
     def load_all(self):
+        self.dirty = set()
         self.patients = read_csv('patients.csv')
         self.doctors = read_csv('doctors.csv')
         self.appointments = read_csv('appointments.csv')
         self.pharmacy = read_csv('pharmacy.csv')
         self.bills = read_csv('bills.csv')
+        self.income = IncomeRollup(self.bills)
         self.prescriptions = read_csv('prescriptions.csv')
         self.labreports = read_csv('labreports.csv')
 
-    def save_all(self):
-        write_csv('patients.csv', CSV_HEADERS['patients'], self.patients)
-        write_csv('doctors.csv', CSV_HEADERS['doctors'], self.doctors)
-        write_csv('appointments.csv', CSV_HEADERS['appointments'], self.appointments)
-        write_csv('pharmacy.csv', CSV_HEADERS['pharmacy'], self.pharmacy)
-        write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
-        write_csv('prescriptions.csv', CSV_HEADERS['prescriptions'], self.prescriptions)
-        write_csv('labreports.csv', CSV_HEADERS['labreports'], self.labreports)
+    def save_all(self, *changed):
+        # mark the tables in changed as modified and write the modified ones (all when none are)
+        self.dirty.update(changed)
+        for table in [t for t in CSV_HEADERS if t in self.dirty] if self.dirty else list(CSV_HEADERS):
+            write_csv(table+'.csv', CSV_HEADERS[table], getattr(self, table))
+            self.dirty.discard(table)
 
     # ---- Login screens ----
     def show_login_selection(self):
@@ -182,7 +344,6 @@ class SHMSApp(tk.Tk):
     # ---- Main UI skeleton ----
     def show_main(self):
         for w in self.winfo_children(): w.destroy()
-        self.load_all()
         top = ttk.Frame(self, padding=8); top.pack(fill='x')
         ttk.Label(top, text=f'SHMS - {self.role} ({self.user})', font=('Helvetica',14,'bold')).pack(side='left')
         ttk.Button(top, text='Export Package', command=self.export_package).pack(side='right', padx=4)
@@ -225,10 +386,7 @@ class SHMSApp(tk.Tk):
         ttk.Label(frm, text=f'Upcoming Appointments: {upcoming}').pack(anchor='w')
         # show disease chart
         chart_path = os.path.join(IMG_DIR,'disease_dist.png')
-        self.build_disease_pie(chart_path)
-        if os.path.exists(chart_path):
-            img = Image.open(chart_path); img.thumbnail((800,360)); ph = ImageTk.PhotoImage(img)
-            lbl = ttk.Label(frm, image=ph); lbl.image = ph; lbl.pack(pady=8)
+        self.show_chart(frm, self.build_disease_pie(chart_path), (800,360), pady=8)
 
     def tab_receptionist(self):
         self.clear_area(); frm = ttk.Frame(self.area, padding=8); frm.pack(expand=True, fill='both')
@@ -301,10 +459,9 @@ class SHMSApp(tk.Tk):
         for l in labs: lines.append(f" - {l['date']} {l['test']}: {l['result']}")
         text_widget.delete('1.0','end'); text_widget.insert('1.0', '\n'.join(lines))
         # build visits chart
-        chart_path = os.path.join(IMG_DIR, f'visits_{pid}.png'); self.build_patient_visits(pid, chart_path)
-        if os.path.exists(chart_path):
-            top = tk.Toplevel(self); top.title('Visits Graph'); img = Image.open(chart_path); img.thumbnail((520,260)); ph = ImageTk.PhotoImage(img)
-            lbl = ttk.Label(top, image=ph); lbl.image = ph; lbl.pack()
+        chart_path = os.path.join(IMG_DIR, f'visits_{pid}.png'); future = self.build_patient_visits(pid, chart_path)
+        if future:
+            top = tk.Toplevel(self); top.title('Visits Graph'); self.show_chart(top, future, (520,260))
 
     def add_patient(self):
         win = tk.Toplevel(self); win.title('Add Patient')
@@ -321,8 +478,8 @@ class SHMSApp(tk.Tk):
             pid = 1
             if self.patients: pid = int(self.patients[-1]['id']) + 1
             rec = {'id':str(pid),'name':e1.get(),'age':e2.get(),'gender':e3.get() or 'M','disease':e4.get(),'photo':pvar.get(),'created':datetime.now().strftime('%Y-%m-%d')}
-            self.patients.append(rec); write_csv('patients.csv', CSV_HEADERS['patients'], self.patients)
-            messagebox.showinfo('Saved','Patient added'); win.destroy(); self.load_all(); self.show_main()
+            self.patients.append(rec); self.save_all('patients')
+            messagebox.showinfo('Saved','Patient added'); win.destroy(); self.show_main()
         ttk.Button(win, text='Save', command=save).grid(row=6,column=0,columnspan=3,pady=6)
 
     def tab_doctors(self):
@@ -342,8 +499,8 @@ class SHMSApp(tk.Tk):
             did = 1
             if self.doctors: did = int(self.doctors[-1]['id']) + 1
             rec = {'id':str(did),'name':e1.get(),'specialization':e2.get(),'photo':''}
-            self.doctors.append(rec); write_csv('doctors.csv', CSV_HEADERS['doctors'], self.doctors)
-            messagebox.showinfo('Saved','Doctor added'); win.destroy(); self.load_all(); self.show_main()
+            self.doctors.append(rec); self.save_all('doctors')
+            messagebox.showinfo('Saved','Doctor added'); win.destroy(); self.show_main()
         ttk.Button(win, text='Save', command=save).grid(row=3,column=0,columnspan=2,pady=6)
 
     def tab_appointments(self, today_only=False, open_new=False):
@@ -374,8 +531,8 @@ class SHMSApp(tk.Tk):
             aid = 1
             if self.appointments: aid = int(self.appointments[-1]['id']) + 1
             rec = {'id':str(aid),'patientId':e1.get(),'doctorId':e2.get(),'date':e3.get(),'time':e4.get(),'status':'Scheduled'}
-            self.appointments.append(rec); write_csv('appointments.csv', CSV_HEADERS['appointments'], self.appointments)
-            messagebox.showinfo('Saved','Appointment scheduled'); win.destroy(); self.load_all(); self.show_main()
+            self.appointments.append(rec); self.save_all('appointments')
+            messagebox.showinfo('Saved','Appointment scheduled'); win.destroy(); self.show_main()
         ttk.Button(win, text='Save', command=save).grid(row=4,column=0,columnspan=2,pady=6)
 
     def mark_done(self, tree):
@@ -384,8 +541,8 @@ class SHMSApp(tk.Tk):
         vals = tree.item(sel[0])['values']; aid = str(vals[0])
         for a in self.appointments:
             if a['id']==aid: a['status']='Done'
-        write_csv('appointments.csv', CSV_HEADERS['appointments'], self.appointments)
-        messagebox.showinfo('Updated','Marked done'); self.load_all(); self.show_main()
+        self.save_all('appointments')
+        messagebox.showinfo('Updated','Marked done'); self.show_main()
 
     def tab_pharmacy(self):
         self.clear_area(); frm = ttk.Frame(self.area, padding=8); frm.pack(expand=True, fill='both')
@@ -411,8 +568,8 @@ class SHMSApp(tk.Tk):
                     found = True
             if not found:
                 self.pharmacy.append({'medicine':e1.get(),'quantity':e2.get(),'price':e3.get()})
-            write_csv('pharmacy.csv', CSV_HEADERS['pharmacy'], self.pharmacy)
-            messagebox.showinfo('Saved','Medicine updated'); win.destroy(); self.load_all(); self.show_main()
+            self.save_all('pharmacy')
+            messagebox.showinfo('Saved','Medicine updated'); win.destroy(); self.show_main()
         ttk.Button(win, text='Save', command=save).grid(row=3,column=0,columnspan=2,pady=6)
 
     def fulfill_prescription(self):
@@ -430,9 +587,9 @@ class SHMSApp(tk.Tk):
                 if mrec['medicine'].lower()==med.lower():
                     try: mrec['quantity'] = str(max(0,int(mrec.get('quantity',0)) - q))
                     except: pass
-            write_csv('pharmacy.csv', CSV_HEADERS['pharmacy'], self.pharmacy)
+            self.save_all('pharmacy')
             messagebox.showinfo('Fulfilled', f'Prescription {rec["prescId"]} fulfilled. Stock updated.')
-            win.destroy(); self.load_all(); self.show_main()
+            win.destroy(); self.show_main()
         ttk.Button(win, text='Fulfill', command=fulfill).pack(pady=6)
 
     def tab_billing(self):
@@ -448,6 +605,7 @@ class SHMSApp(tk.Tk):
         ttk.Button(btnf, text='Generate Bill', command=lambda: self.generate_bill(tree)).pack(side='left', padx=4)
         ttk.Button(btnf, text='Undo Last (Stack)', command=self.undo_last_bill).pack(side='left', padx=4)
         ttk.Button(btnf, text='Export Invoice (PDF/Image)', command=self.export_invoice_selected).pack(side='left', padx=4)
+        ttk.Button(btnf, text="Today's Invoices", command=self.export_todays_invoices).pack(side='left', padx=4)
 
     def generate_bill(self, tree):
         win = tk.Toplevel(self); win.title('Generate Bill')
@@ -466,7 +624,7 @@ class SHMSApp(tk.Tk):
             # depending on mode -> request card details or generate QR or cash immediate
             if mode=='Cash':
                 rec['paid']='yes'; rec['method_details']='Cash'
-                self.bills.append(rec); write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
+                self.bills.append(rec); self.income.add(rec); self.save_all('bills')
                 UNDO_STACK.push(rec); messagebox.showinfo('Saved','Cash bill recorded (Paid)')
             elif mode=='Card':
                 # ask for card details (simulate)
@@ -475,8 +633,8 @@ class SHMSApp(tk.Tk):
                     if len(cn) < 12 or len(cvv) < 3:
                         messagebox.showerror('Card Error','Invalid card details'); return
                     rec['paid']='yes'; rec['method_details'] = f'Card|{name}|{cn[-4:]}'
-                    self.bills.append(rec); write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
-                    UNDO_STACK.push(rec); messagebox.showinfo('Paid','Card payment simulated and recorded'); cwin.destroy(); win.destroy(); self.load_all(); self.show_main()
+                    self.bills.append(rec); self.income.add(rec); self.save_all('bills')
+                    UNDO_STACK.push(rec); messagebox.showinfo('Paid','Card payment simulated and recorded'); cwin.destroy(); win.destroy(); self.show_main()
                 cwin = tk.Toplevel(win); cwin.title('Card Payment')
                 ttk.Label(cwin, text='Name on Card').grid(row=0,column=0); cname = ttk.Entry(cwin); cname.grid(row=0,column=1)
                 ttk.Label(cwin, text='Card Number').grid(row=1,column=0); cardnum = ttk.Entry(cwin); cardnum.grid(row=1,column=1)
@@ -487,27 +645,25 @@ class SHMSApp(tk.Tk):
             elif mode=='Online':
                 # generate QR and show dialog; payment marked when user clicks Mark Paid
                 qrdata = f"ONLINEPAY|bill:{rec['billId']}|patient:{rec['patientId']}|amount:{rec['amount']}"
-                img = qrcode.make(qrdata)
-                qrpath = os.path.join(IMG_DIR, f'qr_bill_{rec["billId"]}.png'); img.save(qrpath)
-                self.bills.append(rec); write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
+                self.bills.append(rec); self.income.add(rec); self.save_all('bills')
                 UNDO_STACK.push(rec)
                 qwin = tk.Toplevel(win); qwin.title('Online Payment (QR)')
-                pil = Image.open(qrpath); pil.thumbnail((300,300)); ph = ImageTk.PhotoImage(pil)
+                pil = qr_image(qrdata); pil.thumbnail((300,300)); ph = ImageTk.PhotoImage(pil)
                 lbl = ttk.Label(qwin, image=ph); lbl.image = ph; lbl.pack(pady=8)
                 def mark_paid_action():
                     for b in self.bills:
                         if b['billId']==str(rec['billId']):
                             b['paid']='yes'; b['method_details']='OnlineQR'
-                            write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
+                            self.save_all('bills')
                             # create invoice
                             self.create_invoice(b)
                             messagebox.showinfo('Paid','Payment recorded and invoice generated.')
-                            qwin.destroy(); win.destroy(); self.load_all(); self.show_main()
+                            qwin.destroy(); win.destroy(); self.show_main()
                             return
                 ttk.Button(qwin, text='Mark Paid', command=mark_paid_action).pack()
                 return
             # final actions for non-card handled above
-            win.destroy(); self.load_all(); self.show_main()
+            win.destroy(); self.show_main()
         ttk.Button(win, text='Generate', command=save).grid(row=3,column=0,columnspan=2,pady=6)
 
     def undo_last_bill(self):
@@ -515,10 +671,12 @@ class SHMSApp(tk.Tk):
         if not rec:
             messagebox.showinfo('Undo','Nothing to undo.')
             return
+        for b in self.bills:
+            if b.get('billId')==rec.get('billId'): self.income.remove(b)
         self.bills = [b for b in self.bills if b.get('billId')!=rec.get('billId')]
-        write_csv('bills.csv', CSV_HEADERS['bills'], self.bills)
+        self.save_all('bills')
         messagebox.showinfo('Undo','Removed bill '+rec.get('billId',''))
-        self.load_all(); self.show_main()
+        self.show_main()
 
     def export_invoice_selected(self):
         # ask user to select bill from list and export invoice
@@ -540,50 +698,43 @@ class SHMSApp(tk.Tk):
             win.destroy()
         ttk.Button(win, text='Export', command=export).pack(pady=6)
 
-    def create_invoice(self, bill_rec, show_dialog=False):
-        # generate PDF if reportlab present, otherwise image PNG
-        out_pdf = os.path.join(IMG_DIR, f'bill_{bill_rec["billId"]}.pdf')
-        out_img = os.path.join(IMG_DIR, f'bill_{bill_rec["billId"]}.png')
-        if REPORTLAB_AVAILABLE:
-            c = canvas.Canvas(out_pdf, pagesize=A4)
-            c.setFont("Helvetica-Bold", 18)
-            c.drawString(40,800,"Smart Hospital - Invoice")
-            c.setFont("Helvetica", 12)
-            c.drawString(40,770,f"Bill ID: {bill_rec['billId']}")
-            c.drawString(40,750,f"Patient ID: {bill_rec.get('patientId','')}")
-            c.drawString(40,730,f"Amount: ₹{bill_rec.get('amount','')}")
-            c.drawString(40,710,f"Date: {bill_rec.get('date','')}")
-            c.drawString(40,690,f"Mode: {bill_rec.get('mode','')}")
-            c.drawString(40,670,f"Paid: {bill_rec.get('paid','')}")
-            # QR
-            qr = qrcode.make(f"bill:{bill_rec['billId']}")
-            qr_io = os.path.join(IMG_DIR, f'billqr_{bill_rec["billId"]}.png'); qr.save(qr_io)
-            c.drawImage(qr_io, 420, 720, width=120, height=120)
-            c.showPage(); c.save()
+    def create_invoice(self, bill_rec, show_dialog=False, callback=None):
+        # queue the invoice (PDF if reportlab present, otherwise PNG); returns the Future
+        future = doc_pool().submit(write_invoice, dict(bill_rec))
+        def finished(futures):
+            try: out = futures[0].result()
+            except Exception as e:
+                print(f'Invoice failed: {e}'); messagebox.showerror('Invoice', f'Could not create invoice: {e}'); return
             if show_dialog:
-                dest = filedialog.asksaveasfilename(defaultextension='.pdf', initialfile=f'bill_{bill_rec["billId"]}.pdf')
+                ext = os.path.splitext(out)[1]
+                dest = filedialog.asksaveasfilename(defaultextension=ext, initialfile=os.path.basename(out))
                 if dest:
-                    shutil.copyfile(out_pdf, dest); messagebox.showinfo('Saved', 'Invoice saved to '+dest)
-        else:
-            # image invoice
-            img = Image.new('RGB',(700,900),(255,255,255)); d = ImageDraw.Draw(img)
-            try:
-                fnt = ImageFont.truetype('arial.ttf', 16)
-            except:
-                fnt = ImageFont.load_default()
-            d.text((30,40), 'Smart Hospital - Invoice', font=fnt, fill=(0,0,0))
-            d.text((30,80), f"Bill ID: {bill_rec['billId']}")
-            d.text((30,110), f"Patient ID: {bill_rec.get('patientId','')}")
-            d.text((30,140), f"Amount: ₹{bill_rec.get('amount','')}")
-            d.text((30,170), f"Date: {bill_rec.get('date','')}")
-            d.text((30,200), f"Mode: {bill_rec.get('mode','')}")
-            d.text((30,230), f"Paid: {bill_rec.get('paid','')}")
-            qr = qrcode.make(f"bill:{bill_rec['billId']}"); qr.thumbnail((160,160)); img.paste(qr, (480,90))
-            img.save(out_img)
-            if show_dialog:
-                dest = filedialog.asksaveasfilename(defaultextension='.png', initialfile=f'bill_{bill_rec["billId"]}.png')
-                if dest:
-                    shutil.copyfile(out_img, dest); messagebox.showinfo('Saved','Invoice saved to '+dest)
+                    shutil.copyfile(out, dest); messagebox.showinfo('Saved','Invoice saved to '+dest)
+            if callback: callback(out)
+        self.when_done([future], finished)
+        return future
+
+    def create_invoices(self, bills):
+        # batch: queue every invoice at once and report when all are written
+        futures = [doc_pool().submit(write_invoice, dict(b)) for b in bills]
+        def finished(futures):
+            failed = [f for f in futures if f.exception() is not None]
+            msg = f'{len(futures)-len(failed)} invoice(s) written to {IMG_DIR}'
+            if failed: msg += f'\n{len(failed)} failed: {failed[0].exception()}'
+            messagebox.showinfo('Invoices', msg)
+        self.when_done(futures, finished)
+        return futures
+
+    def export_todays_invoices(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        bills = [b for b in self.bills if b.get('date') == today]
+        if not bills: messagebox.showinfo('No Bills','No bills dated today.'); return
+        self.create_invoices(bills)
+
+    def when_done(self, futures, callback):
+        # poll from the Tk loop; callback(futures) runs on the Tk thread
+        if all(f.done() for f in futures): callback(futures); return
+        self.after(100, lambda: self.when_done(futures, callback))
 
     def tab_labreports(self):
         self.clear_area(); frm = ttk.Frame(self.area, padding=8); frm.pack(expand=True, fill='both')
@@ -607,21 +758,19 @@ class SHMSApp(tk.Tk):
             rid = 1
             if self.labreports: rid = int(self.labreports[-1]['reportId']) + 1
             rec = {'reportId':str(rid),'patientId':e1.get(),'doctorId':e2.get(),'date':datetime.now().strftime('%Y-%m-%d'),'test':e3.get(),'result':e4.get()}
-            self.labreports.append(rec); write_csv('labreports.csv', CSV_HEADERS['labreports'], self.labreports)
-            messagebox.showinfo('Saved','Report added'); win.destroy(); self.load_all(); self.show_main()
+            self.labreports.append(rec); self.save_all('labreports')
+            messagebox.showinfo('Saved','Report added'); win.destroy(); self.show_main()
         ttk.Button(win, text='Save', command=save).grid(row=4,column=0,columnspan=2,pady=6)
 
     def tab_analytics(self):
         self.clear_area(); frm = ttk.Frame(self.area, padding=8); frm.pack(expand=True, fill='both')
         ttk.Label(frm, text='Analytics', font=('Helvetica',14,'bold')).pack(anchor='w')
         # disease pie
-        pie = os.path.join(IMG_DIR,'disease_dist.png'); self.build_disease_pie(pie)
-        if os.path.exists(pie):
-            img = Image.open(pie); img.thumbnail((760,300)); ph = ImageTk.PhotoImage(img); ttk.Label(frm, image=ph).image = ph; ttk.Label(frm, image=ph).pack(pady=6)
+        pie = os.path.join(IMG_DIR,'disease_dist.png')
+        self.show_chart(frm, self.build_disease_pie(pie), (760,300), pady=6)
         # income over time
-        inc = os.path.join(IMG_DIR,'income_time.png'); self.build_income_over_time(inc)
-        if os.path.exists(inc):
-            im2 = Image.open(inc); im2.thumbnail((760,220)); ph2 = ImageTk.PhotoImage(im2); ttk.Label(frm, image=ph2).image = ph2; ttk.Label(frm, image=ph2).pack(pady=6)
+        inc = os.path.join(IMG_DIR,'income_time.png')
+        self.show_chart(frm, self.build_income_over_time(inc), (760,220), pady=6)
 
     def tab_emergency(self):
         self.clear_area(); frm = ttk.Frame(self.area, padding=8); frm.pack(expand=True, fill='both')
@@ -639,46 +788,50 @@ class SHMSApp(tk.Tk):
             if self.patients: pid = int(self.patients[-1]['id']) + 1
             name = e1.get().strip() or f'Emerg{pid}'
             self.patients.append({'id':str(pid),'name':name,'age':'','gender':'','disease':'Emergency','photo':'','created':datetime.now().strftime('%Y-%m-%d')})
-            write_csv('patients.csv', CSV_HEADERS['patients'], self.patients)
             # appointment now
             aid = 1
             if self.appointments: aid = int(self.appointments[-1]['id']) + 1
             rec = {'id':str(aid),'patientId':str(pid),'doctorId':e2.get(),'date':datetime.now().strftime('%Y-%m-%d'),'time':datetime.now().strftime('%H:%M'),'status':'Scheduled'}
-            self.appointments.append(rec); write_csv('appointments.csv', CSV_HEADERS['appointments'], self.appointments)
-            messagebox.showinfo('Created','Emergency patient and appointment created'); win.destroy(); self.load_all(); self.show_main()
+            self.appointments.append(rec); self.save_all('patients','appointments')
+            messagebox.showinfo('Created','Emergency patient and appointment created'); win.destroy(); self.show_main()
         ttk.Button(win, text='Create', command=save).grid(row=2,column=0,columnspan=2,pady=6)
 
     # ---- Charts / helpers ----
+    # build_* return a Future of the image path (None when there is no data)
     def build_disease_pie(self, outpath):
         diseases = [p.get('disease','Unknown') for p in self.patients]
         counts = {}
         for d in diseases: counts[d] = counts.get(d,0) + 1
         labels = list(counts.keys()); sizes = list(counts.values())
-        if not sizes: return
-        plt.figure(figsize=(6,3.2)); plt.pie(sizes, labels=labels, autopct='%1.1f%%'); plt.title('Disease distribution'); plt.tight_layout(); plt.savefig(outpath); plt.close()
+        if not sizes: return None
+        return submit_chart(outpath, 'pie', labels, sizes, 'Disease distribution', (6,3.2))
 
     def build_patient_visits(self, pid, outpath):
         appts = [a for a in self.appointments if a['patientId']==str(pid)]
-        if not appts: return
+        if not appts: return None
         dates = sorted(list({a['date'] for a in appts}))
         counts = [sum(1 for a in appts if a['date']==d) for d in dates]
-        plt.figure(figsize=(5,2.4)); plt.plot(dates, counts, marker='o'); plt.title('Visits over time'); plt.tight_layout(); plt.savefig(outpath); plt.close()
+        return submit_chart(outpath, 'line', dates, counts, 'Visits over time', (5,2.4))
 
     def build_income_over_time(self, outpath):
-        # group bills by month
-        inc = {}
-        for b in (self.bills or []):
-            date = b.get('date','')
+        # monthly totals come pre-summed from the income rollup
+        keys, values = self.income.series()
+        if not keys: return None
+        return submit_chart(outpath, 'line', list(keys), list(values), 'Income over months', (7,2.2))
+
+    def show_chart(self, parent, future, size, **pack):
+        # placeholder now, the image once the background render is done
+        if future is None: return
+        lbl = ttk.Label(parent, text='Loading chart...'); lbl.pack(**pack)
+        def poll():
+            if not lbl.winfo_exists(): return
+            if not future.done(): lbl.after(50, poll); return
             try:
-                dt = datetime.strptime(date,'%Y-%m-%d')
-                key = dt.strftime('%Y-%m')
-                amt = float(b.get('amount',0))
-                inc[key] = inc.get(key,0) + amt
-            except:
-                pass
-        if not inc: return
-        keys = sorted(inc.keys()); values = [inc[k] for k in keys]
-        plt.figure(figsize=(7,2.2)); plt.plot(keys, values, marker='o'); plt.title('Income over months'); plt.tight_layout(); plt.savefig(outpath); plt.close()
+                img = Image.open(future.result()); img.thumbnail(size); ph = ImageTk.PhotoImage(img)
+                lbl.config(image=ph, text=''); lbl.image = ph
+            except Exception as e:
+                print(f'Chart failed: {e}'); lbl.config(text='Chart unavailable')
+        poll()
 
     # ---- Export package (zip) ----
     def export_package(self):
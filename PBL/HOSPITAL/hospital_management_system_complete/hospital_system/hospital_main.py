@@ -17,6 +17,8 @@ import io
 import hashlib
 import random
 import shutil
+import difflib
+from collections import OrderedDict
 
 # Data Structures (Java-style implementation in Python)
 class Stack:
@@ -111,6 +113,21 @@ USERS = {
     'lab2': {'password': 'lab123', 'role': 'Lab', 'name': 'Anna Lab Tech'}
 }
 
+# CSV columns of each table, keyed by its MainDashboard attribute (<name>.csv)
+TABLES = {
+    'patients': ['id', 'name', 'age', 'gender', 'contact', 'address', 'blood_group',
+                 'admission_date', 'department', 'assigned_doctor', 'status', 'photo'],
+    'doctors': ['id', 'name', 'specialization', 'contact', 'email', 'department', 'photo'],
+    'appointments': ['id', 'patient_id', 'doctor_id', 'date', 'time', 'type', 'status', 'notes'],
+    'pharmacy': ['medicine', 'category', 'quantity', 'price', 'expiry_date', 'supplier'],
+    'bills': ['bill_id', 'patient_id', 'amount', 'date', 'payment_mode', 'status', 'items'],
+    'prescriptions': ['id', 'patient_id', 'doctor_id', 'date', 'medicine', 'dosage',
+                      'duration', 'notes'],
+    'lab_reports': ['report_id', 'patient_id', 'test_name', 'date', 'result', 'status',
+                    'technician'],
+    'departments': ['id', 'name', 'head_doctor', 'beds_total', 'beds_occupied'],
+}
+
 def hash_password(password):
     """Simple password hashing"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -125,13 +142,43 @@ def read_csv(filename):
         reader = csv.DictReader(f)
         return list(reader)
 
+def atomic_write(path, write, newline=None):
+    """Replace path with what write(file) writes, all or nothing.
+    The data goes to a uniquely named temp file in the same folder, is
+    fsynced and renamed over path, and the folder is fsynced, so a crash
+    leaves the old or the new file, never a truncated one."""
+    directory, name = os.path.split(os.path.abspath(path))
+    temp = os.path.join(directory, f'.{name}.{os.getpid()}.{os.urandom(4).hex()}.tmp')
+    # 0o666 as for any new file: the umask narrows it
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline=newline) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temp, os.stat(path).st_mode & 0o7777)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    if os.name == 'posix':
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
 def write_csv(filename, fieldnames, data):
-    """Write data to CSV file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+    """Write data to a CSV file in DATA_DIR atomically (see atomic_write)"""
+    def write(f):
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(data)
+    atomic_write(os.path.join(DATA_DIR, filename), write, newline='')
 
 def generate_id(prefix, existing_data, id_field):
     """Generate unique ID with prefix"""
@@ -149,22 +196,99 @@ def generate_id(prefix, existing_data, id_field):
     
     return f"{prefix}{str(max_id + 1).zfill(3)}"
 
-def generate_patient_qr(patient_data):
-    """Generate QR code for patient"""
-    qr_data = json.dumps({
+class QRCodeCache:
+    """Rendered QR codes keyed by a hash of their content.
+    
+    PNG bytes are kept in a small in-memory LRU and in a bounded folder of
+    <hash>.png files, so a QR code is rendered once and later requests
+    (this session or the next) do not run the encoder again.
+    """
+    
+    def __init__(self, folder, memory_limit=128, disk_limit=1000):
+        self.folder = folder
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+    
+    def png(self, data):
+        key = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        path = os.path.join(self.folder, f'{key}.png')
+        # Other running instances share the folder: any file may be pruned under us
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+            os.utime(path)
+        except OSError:
+            qr = qrcode.QRCode(version=1, box_size=10, border=5)
+            qr.add_data(data)
+            qr.make(fit=True)
+            buffer = io.BytesIO()
+            qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+            png = buffer.getvalue()
+            self._store(path, png)
+        self.memory[key] = png
+        while len(self.memory) > self.memory_limit:
+            self.memory.popitem(last=False)
+        return png
+    
+    def image(self, data):
+        """A fresh PIL image of the QR code"""
+        img = Image.open(io.BytesIO(self.png(data)))
+        img.load()
+        return img
+    
+    def _store(self, path, png):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{os.urandom(4).hex()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(png)
+        os.replace(tmp, path)
+        self._prune(keep=path)
+    
+    def _prune(self, keep=None):
+        """Delete the least recently used PNGs beyond disk_limit, sparing keep"""
+        used = []
+        for name in os.listdir(self.folder):
+            if not name.endswith('.png'):
+                continue
+            try:
+                used.append((os.path.getmtime(os.path.join(self.folder, name)),
+                             os.path.join(self.folder, name)))
+            except OSError:  # removed by another instance meanwhile
+                pass
+        used.sort()
+        for _, old in used[:max(len(used) - self.disk_limit, 0)]:
+            if old == keep:
+                continue
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+QR_CACHE = QRCodeCache(os.path.join(IMG_DIR, 'qr_cache'))
+
+def patient_qr_data(patient_data):
+    return json.dumps({
         'id': patient_data['id'],
         'name': patient_data['name'],
         'contact': patient_data.get('contact', ''),
         'blood_group': patient_data.get('blood_group', '')
     })
-    
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
+
+def generate_patient_qr(patient_data):
+    """Write the patient's QR code to qr_patient_<id>.png (skipped when the
+    file already holds the same code)"""
+    png = QR_CACHE.png(patient_qr_data(patient_data))
     qr_path = os.path.join(IMG_DIR, f'qr_patient_{patient_data["id"]}.png')
-    img.save(qr_path)
+    if os.path.exists(qr_path) and os.path.getsize(qr_path) == len(png):
+        with open(qr_path, 'rb') as f:
+            if f.read() == png:
+                return qr_path
+    with open(qr_path, 'wb') as f:
+        f.write(png)
     return qr_path
 
 def create_default_avatar(name, patient_id):
@@ -264,6 +388,197 @@ class ModernButton(tk.Canvas):
     def on_leave(self, event):
         self.draw_button(hover=False)
 
+class WindowedTree:
+    """Renders only the visible rows of a large list in a Treeview.
+    
+    The full list stays in Python; the scrollbar and mouse wheel move a
+    window over it and only those rows are inserted into Tk.
+    """
+    def __init__(self, tree, scrollbar, values):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.values = values
+        self.data = []
+        self.offset = 0
+        self.visible = int(tree.cget('height')) or 20
+        
+        tree.configure(yscrollcommand='')
+        scrollbar.config(command=self.yview)
+        tree.bind('<Configure>', self.on_resize, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self.on_wheel, add='+')
+    
+    def set_data(self, data):
+        self.data = data
+        self.render()
+    
+    def sort_by(self, col):
+        """Sort the whole list by a column (as text, like sort_treeview)"""
+        index = list(self.tree['columns']).index(col)
+        self.data = sorted(self.data, key=lambda row: str(self.values(row)[index]))
+        self.render()
+    
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.data))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            self.offset += step * self.visible if args[2] == 'pages' else step
+        self.render()
+    
+    def on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.offset += -3 if up else 3
+        self.render()
+        return 'break'
+    
+    def on_resize(self, event):
+        rowheight = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        visible = max(1, event.height // rowheight - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+    
+    def render(self):
+        total = len(self.data)
+        self.offset = max(0, min(self.offset, total - self.visible))
+        window = self.data[self.offset:self.offset + self.visible]
+        
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for row in window:
+            self.tree.insert('', 'end', values=self.values(row))
+        
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(window)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+class TrigramIndex:
+    """Trigram inverted index for substring search over a few text fields.
+    
+    Each trigram of a record's lower-cased fields maps to the set of
+    records containing it, so a search only checks the records found under
+    all of the term's trigrams instead of scanning the whole list.
+    """
+    def __init__(self, records, fields, key='id'):
+        self.fields = fields
+        self.key = key
+        self.postings = {}
+        self.texts = {}
+        self.records = {}
+        self.docs = {}
+        self.next_doc = 0
+        for record in records:
+            self.add(record)
+    
+    def add(self, record):
+        doc = self.next_doc
+        self.next_doc += 1
+        text = '\x1f'.join(str(record.get(f, '')).lower() for f in self.fields)
+        self.texts[doc] = text
+        self.records[doc] = record
+        self.docs.setdefault(record.get(self.key), []).append(doc)
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            self.postings.setdefault(gram, set()).add(doc)
+    
+    def remove(self, key_value):
+        for doc in self.docs.pop(key_value, []):
+            text = self.texts.pop(doc)
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                self.postings[gram].discard(doc)
+            del self.records[doc]
+    
+    def search(self, term):
+        """Records containing term in one of the fields, in insertion order"""
+        term = term.lower()
+        if len(term) < 3:
+            docs = [d for d, text in self.texts.items() if term in text]
+        else:
+            postings = sorted((self.postings.get(term[i:i + 3], set())
+                               for i in range(len(term) - 2)), key=len)
+            docs = postings[0].intersection(*postings[1:])
+            docs = [d for d in docs if term in self.texts[d]]
+        return [self.records[d] for d in sorted(docs)]
+    
+    def closest(self, term, field='name', limit=10):
+        """Records whose field best matches a misspelt term, best first"""
+        term = term.lower()
+        shared = {}
+        for gram in {term[i:i + 3] for i in range(len(term) - 2)}:
+            for doc in self.postings.get(gram, ()):
+                shared[doc] = shared.get(doc, 0) + 1
+        candidates = sorted(shared, key=lambda d: (-shared[d], d))[:limit * 10]
+        scored = []
+        for doc in candidates:
+            ratio = difflib.SequenceMatcher(
+                None, term, str(self.records[doc].get(field, '')).lower()).ratio()
+            if ratio >= 0.6:
+                scored.append((-ratio, doc))
+        return [self.records[d] for _, d in sorted(scored)[:limit]]
+
+class DashboardCounters:
+    """Running counters behind the dashboard stat cards.
+    
+    Every list is counted once when it is loaded; add() and remove() keep
+    the counts current as records are written, so the cards are read in
+    constant time instead of rescanning the lists.
+    """
+    def __init__(self):
+        self.counts = {}
+    
+    def contributions(self, name, record):
+        """(counter key, amount) pairs a record adds to the counts"""
+        date = record.get('date', '')
+        if name == 'patients':
+            return [(('patients',), 1),
+                    (('patients', record.get('assigned_doctor', '')), 1)]
+        if name == 'appointments':
+            doctor_id = record.get('doctor_id', '')
+            pairs = [(('appointments', date), 1),
+                     (('appointments', date, doctor_id), 1)]
+            if record.get('status') == 'Scheduled':
+                pairs.append((('scheduled', doctor_id), 1))
+            return pairs
+        if name == 'bills':
+            try:
+                return [(('revenue', date), float(record.get('amount') or 0))]
+            except ValueError:
+                return []
+        if name == 'pharmacy':
+            pairs = [(('pharmacy',), 1)]
+            try:
+                if int(record.get('quantity') or 0) < 20:
+                    pairs.append((('low_stock',), 1))
+            except ValueError:
+                pass
+            return pairs
+        if name == 'prescriptions':
+            return [(('prescriptions', date), 1)]
+        if name == 'lab_reports':
+            pairs = [(('lab_reports',), 1)]
+            if record.get('status') == 'Pending':
+                pairs.append((('lab_pending',), 1))
+            elif record.get('status') == 'Completed':
+                pairs.append((('lab_completed', date), 1))
+            return pairs
+        return [((name,), 1)]
+    
+    def add(self, name, record, sign=1):
+        for key, amount in self.contributions(name, record):
+            self.counts[key] = self.counts.get(key, 0) + sign * amount
+    
+    def remove(self, name, record):
+        self.add(name, record, -1)
+    
+    def count(self, name, records):
+        for record in records:
+            self.add(name, record)
+    
+    def get(self, *key):
+        return self.counts.get(key, 0)
+
 class LoginWindow(tk.Tk):
     """Modern login window with role selection"""
     def __init__(self):
@@ -450,7 +765,9 @@ class MainDashboard(tk.Tk):
     
     def load_data(self):
         """Load all data from CSV files"""
+        self.dirty = set()
         self.patients = read_csv('patients.csv')
+        self.patient_index = TrigramIndex(self.patients, ('id', 'name', 'contact'))
         self.doctors = read_csv('doctors.csv')
         self.appointments = read_csv('appointments.csv')
         self.pharmacy = read_csv('pharmacy.csv')
@@ -458,30 +775,25 @@ class MainDashboard(tk.Tk):
         self.prescriptions = read_csv('prescriptions.csv')
         self.lab_reports = read_csv('lab_reports.csv')
         self.departments = read_csv('departments.csv')
-    
-    def save_all_data(self):
-        """Save all data to CSV files"""
-        write_csv('patients.csv', ['id', 'name', 'age', 'gender', 'contact', 
-                                   'address', 'blood_group', 'admission_date', 
-                                   'department', 'assigned_doctor', 'status', 'photo'], 
-                 self.patients)
-        write_csv('doctors.csv', ['id', 'name', 'specialization', 'contact', 
-                                 'email', 'department', 'photo'], self.doctors)
-        write_csv('appointments.csv', ['id', 'patient_id', 'doctor_id', 'date', 
-                                      'time', 'type', 'status', 'notes'], 
-                 self.appointments)
-        write_csv('pharmacy.csv', ['medicine', 'category', 'quantity', 'price', 
-                                  'expiry_date', 'supplier'], self.pharmacy)
-        write_csv('bills.csv', ['bill_id', 'patient_id', 'amount', 'date', 
-                               'payment_mode', 'status', 'items'], self.bills)
-        write_csv('prescriptions.csv', ['id', 'patient_id', 'doctor_id', 'date', 
-                                       'medicine', 'dosage', 'duration', 'notes'], 
-                 self.prescriptions)
-        write_csv('lab_reports.csv', ['report_id', 'patient_id', 'test_name', 
-                                     'date', 'result', 'status', 'technician'], 
-                 self.lab_reports)
-        write_csv('departments.csv', ['id', 'name', 'head_doctor', 'beds_total', 
-                                     'beds_occupied'], self.departments)
+        
+        self.counters = DashboardCounters()
+        for name in ('patients', 'doctors', 'appointments', 'bills', 
+                     'pharmacy', 'prescriptions', 'lab_reports'):
+            self.counters.count(name, getattr(self, name))
+    
+    def save_all_data(self, *changed):
+        """Save the changed tables to their CSV files.
+        
+        The in-memory lists are authoritative once loaded: a mutation marks
+        its table with save_all_data('<table>') and only the tables marked
+        since the last save are rewritten. With no tables marked at all,
+        everything is written (an explicit full save).
+        """
+        self.dirty.update(changed)
+        tables = [t for t in TABLES if t in self.dirty] if self.dirty else list(TABLES)
+        for name in tables:
+            write_csv(f'{name}.csv', TABLES[name], getattr(self, name))
+            self.dirty.discard(name)
     
     def create_interface(self):
         """Create main interface"""
@@ -675,66 +987,65 @@ class MainDashboard(tk.Tk):
         return card
     
     def get_dashboard_stats(self):
-        """Get statistics based on role"""
+        """Get statistics based on role (read from the running counters)"""
         today = datetime.now().strftime('%Y-%m-%d')
+        counters = self.counters
         
         if self.role == 'Admin':
             return [
-                {'title': 'Total Patients', 'value': len(self.patients), 
+                {'title': 'Total Patients', 'value': counters.get('patients'), 
                  'icon': '👥', 'color': COLORS['info']},
-                {'title': 'Total Doctors', 'value': len(self.doctors), 
+                {'title': 'Total Doctors', 'value': counters.get('doctors'), 
                  'icon': '👨‍⚕️', 'color': COLORS['primary']},
                 {'title': 'Today Appointments', 
-                 'value': len([a for a in self.appointments if a['date'] == today]), 
+                 'value': counters.get('appointments', today), 
                  'icon': '📅', 'color': COLORS['success']},
                 {'title': 'Revenue Today', 
-                 'value': f"₹{sum(float(b['amount']) for b in self.bills if b['date'] == today):.0f}", 
+                 'value': f"₹{counters.get('revenue', today):.0f}", 
                  'icon': '💰', 'color': COLORS['warning']},
             ]
         elif self.role == 'Doctor':
             doctor_id = self.user_data.get('id', '')
             return [
                 {'title': 'My Patients', 
-                 'value': len([p for p in self.patients if p.get('assigned_doctor') == doctor_id]), 
+                 'value': counters.get('patients', doctor_id), 
                  'icon': '👥', 'color': COLORS['info']},
                 {'title': 'Today Appointments', 
-                 'value': len([a for a in self.appointments if a['date'] == today and a['doctor_id'] == doctor_id]), 
+                 'value': counters.get('appointments', today, doctor_id), 
                  'icon': '📅', 'color': COLORS['success']},
                 {'title': 'Pending Cases', 
-                 'value': len([a for a in self.appointments if a['doctor_id'] == doctor_id and a['status'] == 'Scheduled']), 
+                 'value': counters.get('scheduled', doctor_id), 
                  'icon': '⏳', 'color': COLORS['warning']},
             ]
         elif self.role == 'Receptionist':
             return [
-                {'title': 'Total Patients', 'value': len(self.patients), 
+                {'title': 'Total Patients', 'value': counters.get('patients'), 
                  'icon': '👥', 'color': COLORS['info']},
                 {'title': 'Today Appointments', 
-                 'value': len([a for a in self.appointments if a['date'] == today]), 
+                 'value': counters.get('appointments', today), 
                  'icon': '📅', 'color': COLORS['success']},
                 {'title': 'In Queue', 
                  'value': appointment_queue.size(), 
                  'icon': '🔄', 'color': COLORS['warning']},
             ]
         elif self.role == 'Pharmacy':
-            low_stock = len([m for m in self.pharmacy if int(m.get('quantity', 0)) < 20])
             return [
-                {'title': 'Total Medicines', 'value': len(self.pharmacy), 
+                {'title': 'Total Medicines', 'value': counters.get('pharmacy'), 
                  'icon': '💊', 'color': COLORS['success']},
-                {'title': 'Low Stock Alert', 'value': low_stock, 
+                {'title': 'Low Stock Alert', 'value': counters.get('low_stock'), 
                  'icon': '⚠️', 'color': COLORS['danger']},
                 {'title': 'Prescriptions Today', 
-                 'value': len([p for p in self.prescriptions if p['date'] == today]), 
+                 'value': counters.get('prescriptions', today), 
                  'icon': '📝', 'color': COLORS['info']},
             ]
         elif self.role == 'Lab':
-            pending = len([r for r in self.lab_reports if r.get('status') == 'Pending'])
             return [
-                {'title': 'Total Reports', 'value': len(self.lab_reports), 
+                {'title': 'Total Reports', 'value': counters.get('lab_reports'), 
                  'icon': '🔬', 'color': COLORS['info']},
-                {'title': 'Pending Tests', 'value': pending, 
+                {'title': 'Pending Tests', 'value': counters.get('lab_pending'), 
                  'icon': '⏳', 'color': COLORS['warning']},
                 {'title': 'Completed Today', 
-                 'value': len([r for r in self.lab_reports if r['date'] == today and r.get('status') == 'Completed']), 
+                 'value': counters.get('lab_completed', today), 
                  'icon': '✅', 'color': COLORS['success']},
             ]
         
@@ -868,6 +1179,9 @@ class MainDashboard(tk.Tk):
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
+        # Only the visible window of patients is inserted into the tree
+        self.patient_rows = WindowedTree(self.patients_tree, vsb, self.patient_row_values)
+        
         # Populate data
         self.populate_patients_tree()
         
@@ -877,28 +1191,24 @@ class MainDashboard(tk.Tk):
         # Context menu
         self.create_patient_context_menu()
     
+    def patient_row_values(self, patient):
+        """Row values of a patient in the patients table"""
+        return (
+            patient['id'],
+            patient['name'],
+            patient.get('age', ''),
+            patient.get('gender', ''),
+            patient.get('contact', ''),
+            patient.get('blood_group', ''),
+            patient.get('department', ''),
+            patient.get('assigned_doctor', ''),
+            patient.get('status', 'Active')
+        )
+    
     def populate_patients_tree(self, filtered_data=None):
         """Populate patients treeview"""
-        # Clear existing items
-        for item in self.patients_tree.get_children():
-            self.patients_tree.delete(item)
-        
-        # Get data
         data = filtered_data if filtered_data is not None else self.patients
-        
-        # Insert data
-        for patient in data:
-            self.patients_tree.insert('', 'end', values=(
-                patient['id'],
-                patient['name'],
-                patient.get('age', ''),
-                patient.get('gender', ''),
-                patient.get('contact', ''),
-                patient.get('blood_group', ''),
-                patient.get('department', ''),
-                patient.get('assigned_doctor', ''),
-                patient.get('status', 'Active')
-            ))
+        self.patient_rows.set_data(data)
     
     def filter_patients(self):
         """Filter patients based on search"""
@@ -908,10 +1218,10 @@ class MainDashboard(tk.Tk):
             self.populate_patients_tree()
             return
         
-        filtered = [p for p in self.patients if 
-                   search_term in p['id'].lower() or
-                   search_term in p['name'].lower() or
-                   search_term in p.get('contact', '').lower()]
+        filtered = self.patient_index.search(search_term)
+        if not filtered and len(search_term) >= 3:
+            # Probably misspelt: show the closest names instead
+            filtered = self.patient_index.closest(search_term)
         
         self.populate_patients_tree(filtered)
     
@@ -1068,7 +1378,9 @@ class MainDashboard(tk.Tk):
             }
             
             self.patients.append(patient)
-            self.save_all_data()
+            self.patient_index.add(patient)
+            self.counters.add('patients', patient)
+            self.save_all_data('patients')
             
             # Generate QR code
             generate_patient_qr(patient)
@@ -1384,8 +1696,8 @@ class MainDashboard(tk.Tk):
         if not patient:
             return
         
-        # Generate QR code
-        qr_path = generate_patient_qr(patient)
+        # Make sure the QR file exists; the image itself comes from the cache
+        generate_patient_qr(patient)
         
         # Show QR code
         qr_win = tk.Toplevel(self)
@@ -1400,7 +1712,7 @@ class MainDashboard(tk.Tk):
                 font=('Helvetica', 11)).pack()
         
         # Display QR code
-        img = Image.open(qr_path)
+        img = QR_CACHE.image(patient_qr_data(patient))
         img = img.resize((300, 300), Image.Resampling.LANCZOS)
         photo = ImageTk.PhotoImage(img)
         
@@ -1422,8 +1734,12 @@ class MainDashboard(tk.Tk):
         
         if messagebox.askyesno('Confirm Delete', 
                               f'Are you sure you want to delete patient {patient_id}?'):
+            for patient in self.patients:
+                if patient['id'] == patient_id:
+                    self.counters.remove('patients', patient)
             self.patients = [p for p in self.patients if p['id'] != patient_id]
-            self.save_all_data()
+            self.patient_index.remove(patient_id)
+            self.save_all_data('patients')
             self.show_patients()
             messagebox.showinfo('Success', 'Patient deleted successfully')
     
@@ -1439,6 +1755,11 @@ class MainDashboard(tk.Tk):
     
     def sort_treeview(self, tree, col):
         """Sort treeview by column"""
+        if tree is self.patients_tree:
+            # Windowed: sort the whole list, not just the rows on screen
+            self.patient_rows.sort_by(col)
+            return
+        
         items = [(tree.set(item, col), item) for item in tree.get_children('')]
         items.sort()
         
@@ -4,14 +4,22 @@ import pandas as pd
 from datetime import datetime, timedelta
 import tkinter as tk
 import seaborn as sns
+from column_store import ColumnStore
+from chart_service import charts
 
 class AnalyticsManager:
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        # Typed, cached columns of each collection for the group-bys below
+        self.columns = ColumnStore(data_manager)
         # Set style for all plots
         plt.style.use('seaborn')
         sns.set_palette("husl")
     
+    def chart(self, frame, kind, spec, figsize=(6, 4)):
+        """Widget that shows the chart once it is rendered in the background"""
+        return charts.widget(frame, kind, spec, size=figsize, style='seaborn')
+    
     def create_chart_frame(self, parent, figsize=(6, 4)):
         """Create a frame with matplotlib figure"""
         fig = plt.Figure(figsize=figsize, dpi=100)
@@ -22,259 +30,154 @@ class AnalyticsManager:
     
     def get_appointment_stats(self, doctor_id=None, days=30):
         """Get appointment statistics"""
-        appointments = self.data_manager.get_appointments()
-        if doctor_id:
-            appointments = [a for a in appointments if a['doctor_id'] == doctor_id]
+        appointments = self.columns.frame('appointments')
         
-        # Filter for last n days
-        cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        recent_appointments = [a for a in appointments 
-                             if a['date'] >= cutoff_date]
+        # Filter for last n days (and the doctor)
+        cutoff_date = pd.Timestamp((datetime.now() - timedelta(days=days)).date())
+        mask = appointments['date'] >= cutoff_date
+        if doctor_id:
+            mask &= appointments['doctor_id'] == doctor_id
+        recent = appointments.loc[mask, ['date', 'status']]
+        if recent.empty:
+            return {}
         
         # Group by date and status
-        daily_stats = {}
-        for appointment in recent_appointments:
-            date = appointment['date']
-            status = appointment['status']
-            if date not in daily_stats:
-                daily_stats[date] = {'scheduled': 0, 'completed': 0, 'cancelled': 0}
-            daily_stats[date][status] += 1
-        
-        return daily_stats
+        counts = pd.crosstab(recent['date'], recent['status'].astype(object))
+        counts = counts.reindex(columns=counts.columns.union(
+            ['scheduled', 'completed', 'cancelled'], sort=False), fill_value=0)
+        counts.index = counts.index.strftime("%Y-%m-%d")
+        return counts.astype(int).to_dict(orient='index')
     
     def plot_appointment_trends(self, frame, doctor_id=None):
         """Plot appointment trends over time"""
         stats = self.get_appointment_stats(doctor_id)
         dates = sorted(stats.keys())
         
-        scheduled = [stats[d]['scheduled'] for d in dates]
-        completed = [stats[d]['completed'] for d in dates]
-        cancelled = [stats[d]['cancelled'] for d in dates]
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        ax.plot(dates, scheduled, label='Scheduled', marker='o')
-        ax.plot(dates, completed, label='Completed', marker='s')
-        ax.plot(dates, cancelled, label='Cancelled', marker='^')
-        
-        ax.set_title('Appointment Trends')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Number of Appointments')
-        ax.tick_params(axis='x', rotation=45)
-        ax.legend()
-        
-        fig.tight_layout()
-        return widget
+        spec = {
+            'x': dates,
+            'series': [
+                {'label': 'Scheduled', 'y': [stats[d]['scheduled'] for d in dates], 'marker': 'o'},
+                {'label': 'Completed', 'y': [stats[d]['completed'] for d in dates], 'marker': 's'},
+                {'label': 'Cancelled', 'y': [stats[d]['cancelled'] for d in dates], 'marker': '^'}
+            ],
+            'title': 'Appointment Trends',
+            'xlabel': 'Date',
+            'ylabel': 'Number of Appointments',
+            'rotate': 45
+        }
+        return self.chart(frame, 'lines', spec)
     
     def plot_department_workload(self, frame):
         """Plot workload distribution across departments"""
-        users = self.data_manager.get_users()
-        doctors = [u for u in users if u['role'] == 'doctor']
-        
-        dept_appointments = {}
-        for doctor in doctors:
-            dept = doctor.get('department', 'Other')
-            appointments = [a for a in self.data_manager.get_appointments()
-                          if a['doctor_id'] == doctor['id']]
-            dept_appointments[dept] = dept_appointments.get(dept, 0) + len(appointments)
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        departments = list(dept_appointments.keys())
-        counts = list(dept_appointments.values())
-        
-        bars = ax.bar(departments, counts)
-        
-        # Add value labels on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height)}',
-                   ha='center', va='bottom')
-        
-        ax.set_title('Department Workload')
-        ax.set_xlabel('Department')
-        ax.set_ylabel('Number of Appointments')
-        ax.tick_params(axis='x', rotation=45)
-        
-        fig.tight_layout()
-        return widget
+        users = self.columns.frame('users')
+        doctors = users.loc[users['role'] == 'doctor', ['id', 'department']]
+        
+        # Appointments per doctor in one pass, then summed per department
+        per_doctor = self.columns.frame('appointments')['doctor_id'].astype(str).value_counts()
+        workload = doctors['id'].astype(str).map(per_doctor).fillna(0)
+        departments = doctors['department'].astype(object).fillna('Other')
+        dept_appointments = workload.groupby(departments, sort=False).sum()
+        
+        spec = {
+            'labels': [str(d) for d in dept_appointments.index],
+            'values': [float(v) for v in dept_appointments.to_numpy()],
+            'value_labels': True,
+            'title': 'Department Workload',
+            'xlabel': 'Department',
+            'ylabel': 'Number of Appointments',
+            'rotate': 45
+        }
+        return self.chart(frame, 'bars', spec)
     
     def plot_medicine_stock(self, frame):
         """Plot current medicine stock levels"""
-        medicines = self.data_manager.get_medicines()
-        
-        # Sort by quantity
-        medicines = sorted(medicines, key=lambda x: x['quantity'])[:10]
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        names = [m['name'] for m in medicines]
-        quantities = [m['quantity'] for m in medicines]
-        reorder_levels = [m.get('reorder_level', 10) for m in medicines]
-        
-        # Create horizontal bar chart
-        bars = ax.barh(names, quantities)
-        
-        # Add reorder level lines
-        for i, level in enumerate(reorder_levels):
-            ax.axvline(x=level, ymin=i/len(names), 
-                      ymax=(i+1)/len(names), 
-                      color='red', linestyle='--', alpha=0.5)
-        
-        ax.set_title('Medicine Stock Levels')
-        ax.set_xlabel('Quantity')
-        
-        # Add value labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width, bar.get_y() + bar.get_height()/2.,
-                   f'{int(width)}',
-                   ha='left', va='center')
-        
-        fig.tight_layout()
-        return widget
+        medicines = self.columns.frame('medicines')
+        
+        # Lowest 10 by quantity
+        medicines = medicines.nsmallest(10, 'quantity')
+        
+        spec = {
+            'labels': medicines['name'].astype(str).tolist(),
+            'values': medicines['quantity'].tolist(),
+            # Reorder level lines, one per bar
+            'ref_lines': medicines['reorder_level'].fillna(10).tolist(),
+            'horizontal': True,
+            'value_labels': True,
+            'title': 'Medicine Stock Levels',
+            'xlabel': 'Quantity'
+        }
+        return self.chart(frame, 'bars', spec)
     
     def plot_lab_test_distribution(self, frame):
         """Plot distribution of lab tests"""
-        reports = self.data_manager.get_lab_reports()
-        
-        test_counts = {}
-        for report in reports:
-            test_type = report['test']
-            test_counts[test_type] = test_counts.get(test_type, 0) + 1
-        
-        # Sort by count
-        test_counts = dict(sorted(test_counts.items(), 
-                                key=lambda x: x[1], 
-                                reverse=True)[:8])
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        # Create pie chart
-        wedges, texts, autotexts = ax.pie(test_counts.values(),
-                                         labels=test_counts.keys(),
-                                         autopct='%1.1f%%',
-                                         textprops={'fontsize': 8})
-        
-        ax.set_title('Lab Test Distribution')
-        
-        fig.tight_layout()
-        return widget
+        reports = self.columns.frame('lab_reports')
+        
+        # Top 8 tests by count
+        test_counts = reports['test'].value_counts().head(8)
+        test_counts = test_counts[test_counts > 0]
+        
+        spec = {
+            'labels': [str(t) for t in test_counts.index],
+            'sizes': [int(c) for c in test_counts.to_numpy()],
+            'fontsize': 8,
+            'title': 'Lab Test Distribution'
+        }
+        return self.chart(frame, 'pie', spec)
     
     def plot_revenue_trends(self, frame):
         """Plot revenue trends"""
-        bills = self.data_manager.get_bills()
-        
-        # Group by date
-        daily_revenue = {}
-        for bill in bills:
-            date = bill.get('date', bill.get('created_at', '').split()[0])
-            if date:
-                amount = float(bill.get('amount', 0))
-                daily_revenue[date] = daily_revenue.get(date, 0) + amount
-        
-        dates = sorted(daily_revenue.keys())
-        revenue = [daily_revenue[d] for d in dates]
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        # Create line plot with area
-        ax.fill_between(dates, revenue, alpha=0.3)
-        ax.plot(dates, revenue, marker='o')
-        
-        ax.set_title('Revenue Trends')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Revenue')
-        ax.tick_params(axis='x', rotation=45)
-        
-        # Format y-axis as currency
-        ax.yaxis.set_major_formatter(
-            plt.FuncFormatter(lambda x, p: f'${x:,.2f}'))
-        
-        fig.tight_layout()
-        return widget
+        # Daily buckets, pre-summed by the data manager's revenue rollup
+        daily_revenue = self.data_manager.revenue_rollup().series('day')
+        
+        spec = {
+            'x': [day for day, _ in daily_revenue],
+            'series': [{'y': [amount for _, amount in daily_revenue]}],
+            'fill': True,
+            'currency': True,
+            'title': 'Revenue Trends',
+            'xlabel': 'Date',
+            'ylabel': 'Revenue',
+            'rotate': 45
+        }
+        return self.chart(frame, 'lines', spec)
     
     def plot_patient_demographics(self, frame):
         """Plot patient age and gender distribution"""
-        patients = self.data_manager.get_patients()
-        
-        # Calculate age from DOB
-        ages = []
-        genders = []
-        for patient in patients:
-            try:
-                dob = datetime.strptime(patient['dob'], "%Y-%m-%d")
-                age = (datetime.now() - dob).days // 365
-                ages.append(age)
-                genders.append(patient.get('gender', 'Other'))
-            except:
-                continue
-        
-        fig, widget = self.create_chart_frame(frame)
-        
-        # Create two subplots
-        ax1 = fig.add_subplot(121)  # Age distribution
-        ax2 = fig.add_subplot(122)  # Gender distribution
-        
-        # Age distribution
-        ax1.hist(ages, bins=20, edgecolor='black')
-        ax1.set_title('Age Distribution')
-        ax1.set_xlabel('Age')
-        ax1.set_ylabel('Number of Patients')
-        
-        # Gender distribution
-        gender_counts = {}
-        for gender in genders:
-            gender_counts[gender] = gender_counts.get(gender, 0) + 1
-        
-        ax2.pie(gender_counts.values(),
-                labels=gender_counts.keys(),
-                autopct='%1.1f%%')
-        ax2.set_title('Gender Distribution')
-        
-        fig.tight_layout()
-        return widget
+        patients = self.columns.frame('patients')
+        
+        # Calculate age from DOB (patients without a valid DOB are skipped)
+        known = patients[patients['dob'].notna()]
+        ages = ((pd.Timestamp(datetime.now()) - known['dob']).dt.days // 365).tolist()
+        gender_counts = known['gender'].astype(object).fillna('Other').value_counts(sort=False)
+        
+        spec = {
+            'values': ages,
+            'bins': 20,
+            'hist': {'title': 'Age Distribution', 'xlabel': 'Age', 'ylabel': 'Number of Patients'},
+            'pie': {'labels': [str(g) for g in gender_counts.index],
+                    'sizes': [int(c) for c in gender_counts.to_numpy()],
+                    'title': 'Gender Distribution'}
+        }
+        return self.chart(frame, 'histogram_and_pie', spec)
     
     def plot_prescription_analysis(self, frame):
         """Plot prescription patterns"""
-        prescriptions = self.data_manager.get_prescriptions()
-        
-        # Analyze medicine frequency
-        medicine_freq = {}
-        for prescription in prescriptions:
-            for medicine in prescription.get('medicines', []):
-                name = medicine.get('name', '')
-                medicine_freq[name] = medicine_freq.get(name, 0) + 1
-        
-        # Sort and get top medicines
-        top_medicines = dict(sorted(medicine_freq.items(),
-                                  key=lambda x: x[1],
-                                  reverse=True)[:10])
-        
-        fig, widget = self.create_chart_frame(frame)
-        ax = fig.add_subplot(111)
-        
-        names = list(top_medicines.keys())
-        frequencies = list(top_medicines.values())
-        
-        # Create horizontal bar chart
-        bars = ax.barh(names, frequencies)
-        
-        ax.set_title('Most Prescribed Medicines')
-        ax.set_xlabel('Number of Prescriptions')
-        
-        # Add value labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width, bar.get_y() + bar.get_height()/2.,
-                   f'{int(width)}',
-                   ha='left', va='center')
-        
-        fig.tight_layout()
-        return widget
\ No newline at end of file
+        prescriptions = self.columns.frame('prescriptions')
+        
+        # One row per prescribed medicine, then the 10 most frequent names
+        if 'medicines' in prescriptions:
+            medicines = prescriptions['medicines'].explode().dropna()
+            names = pd.Series([m.get('name', '') for m in medicines], dtype=object)
+        else:
+            names = pd.Series([], dtype=object)
+        top_medicines = names.value_counts().head(10)
+        
+        spec = {
+            'labels': [str(n) for n in top_medicines.index],
+            'values': [int(c) for c in top_medicines.to_numpy()],
+            'horizontal': True,
+            'value_labels': True,
+            'title': 'Most Prescribed Medicines',
+            'xlabel': 'Number of Prescriptions'
+        }
+        return self.chart(frame, 'bars', spec)
\ No newline at end of file
@@ -0,0 +1,179 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Union
+
+DAY_MINUTES = 24 * 60
+
+
+def duration_to_minutes(duration_str: str) -> int:
+    """Convert a duration string like '45 min' or '1.5 hours' to minutes"""
+    if 'min' in duration_str:
+        return int(duration_str.split()[0])
+    elif 'hour' in duration_str:
+        hours = float(duration_str.split()[0])
+        return int(hours * 60)
+    return 30  # default to 30 minutes
+
+
+def appointment_span(appointment: Dict[str, Any]) -> Optional[Tuple[str, int, int]]:
+    """(date, start minute, end minute) of an appointment, None if its date
+    or time cannot be read. The end may pass midnight (> DAY_MINUTES)."""
+    try:
+        hour, minute = appointment['time'].split(':')
+        start = int(hour) * 60 + int(minute)
+        return appointment['date'], start, start + duration_to_minutes(appointment.get('duration', '30 min'))
+    except (KeyError, ValueError, AttributeError):
+        return None
+
+
+class DaySlots:
+    """Booked intervals of one doctor on one day.
+
+    Intervals are kept sorted by start with a running maximum of the end
+    times, so "does anything overlap [start, end)?" is one bisect: only
+    intervals starting before ``end`` can overlap, and one of them does
+    iff the largest end among them is after ``start``.
+    """
+
+    def __init__(self):
+        self.slots: List[Tuple[int, int, Any]] = []  # (start, end, appointment id)
+        self._starts: List[int] = []
+        self._max_end: List[Tuple[int, int]] = []  # (running max end, position of that slot)
+        self._dirty = False
+
+    def add(self, start: int, end: int, appointment_id: Any) -> None:
+        insort(self.slots, (start, end, appointment_id), key=lambda slot: slot[:2])
+        self._dirty = True
+
+    def remove(self, start: int, end: int, appointment_id: Any) -> None:
+        for i, slot in enumerate(self.slots):
+            if slot == (start, end, appointment_id):
+                del self.slots[i]
+                self._dirty = True
+                return
+
+    def _refresh(self) -> None:
+        self._starts = [slot[0] for slot in self.slots]
+        self._max_end = []
+        best = (-1, -1)
+        for i, slot in enumerate(self.slots):
+            if slot[1] > best[0]:
+                best = (slot[1], i)
+            self._max_end.append(best)
+        self._dirty = False
+
+    def overlapping(self, start: int, end: int, ignore: Any = None) -> Optional[Any]:
+        """Id of an appointment overlapping [start, end), or None"""
+        if self._dirty:
+            self._refresh()
+        count = bisect_left(self._starts, end)
+        if count == 0:
+            return None
+        max_end, position = self._max_end[count - 1]
+        if max_end <= start:
+            return None
+        if ignore is None or self.slots[position][2] != ignore:
+            return self.slots[position][2]
+        # The best candidate is the appointment being moved; check the rest
+        for slot_start, slot_end, appointment_id in self.slots[:count]:
+            if slot_end > start and appointment_id != ignore:
+                return appointment_id
+        return None
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+class AppointmentSlotIndex:
+    """Per-doctor, per-day interval index of booked appointments.
+
+    Each appointment is parsed once when it is added; conflict checks then
+    only look at the doctor's slots for the day (and the neighbouring days
+    for bookings that run past midnight).
+    """
+
+    def __init__(self, appointments: Iterable[Dict[str, Any]] = ()):
+        self.days: Dict[Tuple[Any, str], DaySlots] = {}
+        self._spans: Dict[Any, Tuple[Any, str, int, int]] = {}  # id -> (doctor, date, start, end)
+        for appointment in appointments:
+            self.add(appointment)
+
+    def add(self, appointment: Dict[str, Any]) -> None:
+        span = appointment_span(appointment)
+        doctor_id = appointment.get('doctor_id')
+        if span is None or doctor_id is None:
+            return
+        appointment_id = appointment.get('id')
+        if appointment_id in self._spans:
+            self.remove(appointment_id)
+        date, start, end = span
+        self.days.setdefault((doctor_id, date), DaySlots()).add(start, end, appointment_id)
+        self._spans[appointment_id] = (doctor_id, date, start, end)
+
+    def remove(self, appointment_id: Any) -> None:
+        span = self._spans.pop(appointment_id, None)
+        if span is None:
+            return
+        doctor_id, date, start, end = span
+        day = self.days[(doctor_id, date)]
+        day.remove(start, end, appointment_id)
+        if not len(day):
+            del self.days[(doctor_id, date)]
+
+    def update(self, appointment: Dict[str, Any]) -> None:
+        """Re-index an appointment after its doctor, date, time or duration changed"""
+        self.remove(appointment.get('id'))
+        self.add(appointment)
+
+    def conflict(self, doctor_id: Any, start: datetime, end: datetime,
+                 ignore: Any = None) -> Optional[Any]:
+        """Id of a booked appointment of doctor_id overlapping [start, end),
+        or None. ``ignore`` skips one appointment (the one being moved)."""
+        day = start.date()
+        offset = (start - datetime.combine(day, datetime.min.time())) // timedelta(minutes=1)
+        length = (end - start) // timedelta(minutes=1)
+        # Previous day's late bookings can run into this one, and a booking
+        # past midnight can run into the next day's
+        for delta, shift in ((0, 0), (-1, DAY_MINUTES), (1, -DAY_MINUTES)):
+            if delta == 1 and offset + length <= DAY_MINUTES:
+                continue
+            slots = self.days.get((doctor_id, (day + timedelta(days=delta)).isoformat()))
+            if slots is None:
+                continue
+            found = slots.overlapping(offset + shift, offset + shift + length, ignore)
+            if found is not None:
+                return found
+        return None
+
+    def validate(self, bookings: List[Dict[str, Any]]) -> List[Optional[Union[Any, int]]]:
+        """Check proposed bookings (appointment-shaped dicts with doctor_id,
+        date, time and duration) in one pass.
+
+        Returns one entry per booking: None if it fits, the id of the booked
+        appointment it clashes with, or the position (int) of an earlier
+        booking in the same batch that it clashes with. Bookings whose date
+        or time cannot be read are reported as ValueError instances.
+        """
+        proposed = AppointmentSlotIndex()
+        results = []
+        for position, booking in enumerate(bookings):
+            span = appointment_span(booking)
+            try:
+                date, start_minute, end_minute = span
+                start = datetime.strptime(date, '%Y-%m-%d') + timedelta(minutes=start_minute)
+            except (TypeError, ValueError):
+                results.append(ValueError(f"Invalid date or time in booking {position}"))
+                continue
+            end = start + timedelta(minutes=end_minute - start_minute)
+            doctor_id = booking.get('doctor_id')
+
+            clash = self.conflict(doctor_id, start, end, ignore=booking.get('id'))
+            if clash is None:
+                clash = proposed.conflict(doctor_id, start, end)
+            results.append(clash)
+            if clash is None:
+                proposed.add({**booking, 'id': position})
+        return results
+
+    def __len__(self) -> int:
+        return len(self._spans)
@@ -0,0 +1,171 @@
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator
+
+from file_lock import file_lock
+
+
+class AuditLog:
+    """Buffered, append-only audit trail.
+
+    Entries are serialized to newline-delimited JSON and kept in a memory
+    buffer that is flushed (and fsync'ed) once it reaches ``max_buffer``
+    bytes or every ``flush_interval`` seconds, whichever comes first.
+    Segments are rotated by day: ``audit-YYYY-MM-DD.jsonl``. Several
+    processes may log to one folder: each flush holds the folder's
+    ``audit.lock``, so their batches never interleave mid-line.
+    """
+
+    def __init__(self, log_dir: Path, max_buffer: int = 64 * 1024,
+                 flush_interval: float = 1.0):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._file_lock = file_lock(self.log_dir / 'audit.lock')
+        self._buffer: List[tuple] = []  # (day, line)
+        self._buffer_bytes = 0
+        self._segment = None
+        self._segment_day = None
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _segment_path(self, day: str) -> Path:
+        return self.log_dir / f'audit-{day}.jsonl'
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Queue one entry; it reaches disk on the next flush"""
+        with self._lock:
+            self._queue_locked(entry)
+            if self._buffer_bytes >= self.max_buffer:
+                self._flush_locked()
+
+    def _queue_locked(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry) + '\n'
+        self._buffer.append((entry.get('timestamp', '')[:10] or 'undated', line))
+        self._buffer_bytes += len(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        with self._file_lock:
+            touched = set()
+            for day, line in self._buffer:
+                if day != self._segment_day:
+                    self._rotate(day)
+                self._segment.write(line)
+                touched.add(self._segment)
+            for segment in touched:
+                segment.flush()
+                os.fsync(segment.fileno())
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def _rotate(self, day: str) -> None:
+        if self._segment is not None:
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._segment.close()
+        self._segment = open(self._segment_path(day), 'a')
+        self._segment_day = day
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit log flush failed: {e}")
+
+    def read(self, since: Optional[str] = None, until: Optional[str] = None,
+             action: Optional[str] = None,
+             user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream entries oldest first, one line at a time.
+
+        since/until are ISO timestamps (or dates) compared against the entry
+        timestamp; segments outside the range are skipped without opening.
+        """
+        self.flush()
+        for path in sorted(self.log_dir.glob('audit-*.jsonl')):
+            day = path.stem[len('audit-'):]
+            if since and day < since[:10]:
+                continue
+            if until and day > until[:10]:
+                continue
+            with open(path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    timestamp = entry.get('timestamp', '')
+                    if since and timestamp < since:
+                        continue
+                    if until and timestamp > until:
+                        continue
+                    if action and entry.get('action') != action:
+                        continue
+                    if user_id and entry.get('user_id') != user_id:
+                        continue
+                    yield entry
+
+    def import_legacy(self, legacy_file: Path) -> int:
+        """Move entries from an old audit_log.json (JSON list) or
+        audit_log.journal into day segments. Returns the number imported.
+
+        The legacy file is renamed to ``<name>.migrated`` afterwards.
+        """
+        legacy_file = Path(legacy_file)
+        # Both locks, so two processes starting together import it only once
+        with self._lock, self._file_lock:
+            if not legacy_file.exists():
+                return 0
+            entries = self._legacy_entries(legacy_file)
+            for entry in entries:
+                self._queue_locked(entry)
+            self._flush_locked()
+            os.replace(legacy_file, legacy_file.with_name(legacy_file.name + '.migrated'))
+        return len(entries)
+
+    @staticmethod
+    def _legacy_entries(legacy_file: Path) -> List[Dict[str, Any]]:
+        if legacy_file.suffix == '.journal':
+            entries = []
+            with open(legacy_file, 'r') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if op.get('op') == 'insert':
+                        entries.append(op['record'])
+            return entries
+        try:
+            with open(legacy_file, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+    def close(self) -> None:
+        # Drop the exit hook, or it would keep every closed log alive until exit
+        atexit.unregister(self.close)
+        self._stop.set()
+        with self._lock:
+            self._flush_locked()
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+                self._segment_day = None
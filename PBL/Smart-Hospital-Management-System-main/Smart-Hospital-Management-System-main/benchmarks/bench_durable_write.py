@@ -0,0 +1,83 @@
+"""Measure what atomic, fsynced saves cost over plain in-place writes.
+
+Usage: python benchmarks/bench_durable_write.py [--sizes 100 1000 10000] [--dir /path]
+
+Saves synthetic patient lists the way DataManager does (json.dump with
+indent=4). Run it with --dir on the disk the data folder lives on: fsync
+cost depends almost entirely on the device.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from durable_write import write_json
+
+
+def make_patients(n, seed=42):
+    rng = random.Random(seed)
+    return [{
+        'id': f"P{i:07d}",
+        'name': f"Patient {i}",
+        'age': rng.randint(1, 95),
+        'gender': rng.choice(['Male', 'Female']),
+        'phone': f"9{rng.randrange(10 ** 9):09d}",
+        'blood_group': rng.choice(['A+', 'B+', 'O+', 'AB+', 'O-']),
+        'registered_date': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    } for i in range(n)]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def plain_write(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def run(n, repeat, directory):
+    records = make_patients(n)
+    path = os.path.join(directory, 'patients.json')
+    plain_write(path, records)
+    size = os.path.getsize(path)
+
+    variants = {
+        'plain (in place)': lambda: plain_write(path, records),
+        'atomic, no fsync': lambda: write_json(path, records, fsync=False),
+        'atomic + fsync': lambda: write_json(path, records),
+        'atomic + fsync + .bak': lambda: write_json(path, records, backup=True),
+    }
+
+    print(f"\n{n:,} records ({size / 1024:.0f} KB)")
+    print(f"{'save':<24}{'ms':>10}{'overhead':>12}")
+    baseline = None
+    for name, save in variants.items():
+        seconds = best_of(save, repeat)
+        baseline = baseline or seconds
+        print(f"{name:<24}{seconds * 1000:>10.2f}{(seconds - baseline) * 1000:>+11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1_000, 10_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dir', help='folder to write in (default: a temp folder)')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for n in args.sizes:
+            run(n, args.repeat, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Compare DataManager.search_records full scans against secondary indexes.
+
+Usage: python benchmarks/bench_search_index.py [--sizes 10000 100000 1000000] [--storage json sqlite]
+
+The first table runs CollectionIndex in memory on synthetic appointments,
+so the numbers reflect the search itself, not JSON parsing. The second
+times DataManager.search_records on a data folder holding the same
+appointments: a full search, including the check that the index is
+still current.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager
+from record_index import CollectionIndex, scan
+
+
+def make_appointments(n, seed=42):
+    rng = random.Random(seed)
+    doctors = [f"D{i:03d}" for i in range(50)]
+    statuses = ['scheduled', 'completed', 'cancelled']
+    return [{
+        'id': f"A{i:07d}",
+        'patient_id': f"P{rng.randrange(n // 4 + 1):07d}",
+        'doctor_id': rng.choice(doctors),
+        'date': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'status': rng.choice(statuses)
+    } for i in range(n)]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(n, repeat):
+    records = make_appointments(n)
+    index = CollectionIndex(['doctor_id', 'patient_id', 'date', 'status'])
+    build, _ = best_of(lambda: index.rebuild(records, 0), 1)
+
+    queries = {
+        'doctor_id': {'doctor_id': 'D007'},
+        'doctor_id+date': {'doctor_id': 'D007', 'date': '2025-03-14'},
+        'doctor+date+status': {'doctor_id': 'D007', 'date': '2025-03-14', 'status': 'scheduled'},
+        'patient_id': {'patient_id': records[n // 2]['patient_id']},
+    }
+
+    print(f"\n{n:,} records (index build {build * 1000:.1f} ms)")
+    print(f"{'query':<22}{'hits':>8}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+    for name, query in queries.items():
+        scan_time, expected = best_of(lambda: scan(records, query), repeat)
+        plan = index.plan(query)
+        index_time, got = best_of(lambda: index.search(query, plan), repeat)
+        assert got == expected, name
+        print(f"{name:<22}{len(got):>8}{scan_time * 1000:>12.2f}{index_time * 1000:>12.3f}"
+              f"{scan_time / index_time:>9.0f}x")
+    return records, queries
+
+
+def run_data_manager(records, queries, storage, repeat):
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, storage=storage)
+        dm._save_data('appointments', records)
+        first, _ = best_of(lambda: dm.search_records('appointments', {'status': 'cancelled'}), 1)
+
+        print(f"DataManager.search_records, {storage} storage (first search {first * 1000:.1f} ms)")
+        print(f"{'query':<22}{'hits':>8}{'scan ms':>12}{'search ms':>12}{'speedup':>10}")
+        for name, query in queries.items():
+            scan_time, expected = best_of(lambda: scan(dm.get_appointments(), query), repeat)
+            search_time, got = best_of(lambda: dm.search_records('appointments', query), repeat)
+            assert got == expected, name
+            print(f"{name:<22}{len(got):>8}{scan_time * 1000:>12.2f}{search_time * 1000:>12.3f}"
+                  f"{scan_time / search_time:>9.0f}x")
+        dm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--storage', nargs='*', default=['json', 'sqlite'],
+                        choices=['json', 'journal', 'sqlite'])
+    args = parser.parse_args()
+    for n in args.sizes:
+        records, queries = run(n, args.repeat)
+        for storage in args.storage:
+            run_data_manager(records, queries, storage, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Check that concurrent DataManager writers from several processes lose nothing.
+
+Usage: python benchmarks/stress_stock_updates.py [--processes 8] [--updates 100]
+                                                 [--storage json sqlite journal app]
+
+N worker processes, each with its own DataManager on one shared data
+folder, call update_medicine_stock(+1) / (-1) on the same medicines. The
+final stock must equal the initial stock plus every change made; a lost
+read-modify-write shows up as a mismatch. It also checks that an update
+based on an old record version is rejected.
+
+'journal' keeps its collections in one process's memory, so for it the
+check is that a second DataManager on the folder is refused. 'app' runs
+the desktop app's DataManager (main.py) instead: each process adds
+patients and adjusts stock the way the dialogs do, retrying on
+StaleRecordError; no patient, stock change or version bump may be lost
+and no two patients may share an ID.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager, StaleRecordError
+from main import DataManager as AppDataManager
+
+INITIAL_STOCK = 1000
+
+
+def worker(data_dir, storage, medicine_ids, updates, seed):
+    """Apply random +1/-1 changes; returns the net change per medicine"""
+    rng = random.Random(seed)
+    dm = DataManager(data_dir, storage=storage)
+    net = {medicine_id: 0 for medicine_id in medicine_ids}
+    for _ in range(updates):
+        medicine_id = rng.choice(medicine_ids)
+        change = rng.choice((1, 1, -1))
+        dm.update_medicine_stock(medicine_id, change, f'worker-{seed}')
+        net[medicine_id] += change
+    dm.close()
+    return net
+
+
+def check_stale_update(data_dir, storage):
+    """Two sessions edit the same patient; the one that read it first loses"""
+    first = DataManager(data_dir, storage=storage)
+    second = DataManager(data_dir, storage=storage)
+    try:
+        patient = first.add_patient({'name': 'Stale Check', 'phone': '1'}, 'setup')
+        seen = next(p for p in second.get_patients() if p['id'] == patient['id'])
+        first.update_patient(patient['id'], {'phone': '2'}, 'first', patient['version'])
+        try:
+            second.update_patient(seen['id'], {'phone': '3'}, 'second', seen['version'])
+        except StaleRecordError:
+            return True
+        return False
+    finally:
+        first.close()
+        second.close()
+
+
+def refuses_second_owner(data_dir, storage):
+    """A second DataManager on the folder fails while the first is open"""
+    first = DataManager(data_dir, storage=storage)
+    try:
+        DataManager(data_dir, storage=storage).close()
+    except RuntimeError:
+        return True
+    finally:
+        first.close()
+    return False
+
+
+def app_worker(medicine_ids, updates, seed):
+    """Add patients and adjust stock through main.DataManager, like the
+    add-patient and update-stock dialogs; returns the net stock change"""
+    rng = random.Random(seed)
+    dm = AppDataManager()
+    net = {medicine_id: 0 for medicine_id in medicine_ids}
+    for i in range(updates):
+        dm.add_patient({'id': dm.generate_id('P', dm.get_patients()),
+                        'name': f'Worker {seed} patient {i}'})
+        medicine_id = rng.choice(medicine_ids)
+        change = rng.choice((1, 1, -1))
+        while True:
+            medicine = next(m for m in dm.get_medicines() if m['id'] == medicine_id)
+            try:
+                dm.update_medicine(medicine_id, {'stock': medicine['stock'] + change},
+                                   medicine.get('version', 0))
+                break
+            except StaleRecordError:
+                continue  # changed by another process since we read it
+        net[medicine_id] += change
+    return net
+
+
+def run_app(processes, updates, medicines):
+    with tempfile.TemporaryDirectory() as home:
+        # main.DataManager keeps its data under ~/hospital_data
+        saved = {name: os.environ.get(name) for name in ('HOME', 'USERPROFILE')}
+        os.environ['HOME'] = os.environ['USERPROFILE'] = home
+        try:
+            dm = AppDataManager()
+            patients_before = len(dm.get_patients())
+            expected = {m['id']: m['stock'] for m in dm.get_medicines()[:medicines]}
+
+            start = time.perf_counter()
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(app_worker, [(list(expected), updates, seed)
+                                                    for seed in range(processes)])
+            elapsed = time.perf_counter() - start
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+        for net in results:
+            for medicine_id, change in net.items():
+                expected[medicine_id] += change
+        patient_ids = [p['id'] for p in dm.get_patients()]
+        stocked = [m for m in dm.get_medicines() if m['id'] in expected]
+        actual = {m['id']: m['stock'] for m in stocked}
+        versions = sum(m.get('version', 0) for m in stocked)
+
+        total = processes * updates
+        print(f"{'app':<8}{processes:>6} processes x {updates} adds + updates: "
+              f"{elapsed:.2f}s ({2 * total / elapsed:,.0f} writes/s), {versions} versions")
+        assert len(patient_ids) - patients_before == total, \
+            f"{total - (len(patient_ids) - patients_before)} added patients lost"
+        assert len(set(patient_ids)) == len(patient_ids), "two patients share an ID"
+        assert versions == total, f"{total - versions} updates lost their version bump"
+        assert actual == expected, f"lost stock changes: expected {expected}, got {actual}"
+
+
+def run(storage, processes, updates, medicines):
+    if storage == 'app':
+        run_app(processes, updates, medicines)
+        return
+    with tempfile.TemporaryDirectory() as data_dir:
+        if storage == 'journal':
+            assert refuses_second_owner(data_dir, storage), "second journal DataManager was opened"
+            print(f"{storage:<8} a second DataManager on the folder is refused")
+            return
+
+        dm = DataManager(data_dir, storage=storage)
+        medicine_ids = [dm.add_medicine({'name': f'Medicine {i}', 'quantity': INITIAL_STOCK},
+                                        'setup')['id'] for i in range(medicines)]
+        dm.close()
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(worker, [(data_dir, storage, medicine_ids, updates, seed)
+                                            for seed in range(processes)])
+        elapsed = time.perf_counter() - start
+
+        expected = {medicine_id: INITIAL_STOCK for medicine_id in medicine_ids}
+        for net in results:
+            for medicine_id, change in net.items():
+                expected[medicine_id] += change
+        dm = DataManager(data_dir, storage=storage)
+        actual = {m['id']: m['quantity'] for m in dm.get_medicines()}
+        versions = sum(m['version'] - 1 for m in dm.get_medicines())
+        dm.close()
+
+        total = processes * updates
+        print(f"{storage:<8}{processes:>6} processes x {updates} updates: "
+              f"{elapsed:.2f}s ({total / elapsed:,.0f} updates/s), {versions} versions")
+        assert versions == total, f"{total - versions} updates lost their version bump"
+        assert actual == expected, f"lost stock changes: expected {expected}, got {actual}"
+        assert check_stale_update(data_dir, storage), "stale update was accepted"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--updates', type=int, default=100, help='updates per process')
+    parser.add_argument('--medicines', type=int, default=3)
+    parser.add_argument('--storage', nargs='+', default=['json', 'sqlite', 'journal', 'app'],
+                        choices=['json', 'sqlite', 'journal', 'app'])
+    args = parser.parse_args()
+    for storage in args.storage:
+        run(storage, args.processes, args.updates, args.medicines)
+    print("no lost updates")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,10 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 import uuid
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from virtual_rows import VirtualRows
+from search_controller import SearchController
+from document_queue import documents
+from record_version import StaleRecordError
 
 class BillingModule:
     def __init__(self, parent, data_manager, user):
@@ -44,6 +44,13 @@ class BillingModule:
                  command=self.load_bills, 
                  padx=15, pady=8).pack(side='left', padx=5)
         
+        tk.Button(btn_frame, text="📄 Today's Invoices", 
+                 font=('Arial', 10, 'bold'),
+                 bg='#9b59b6', fg='white', 
+                 relief='flat', cursor='hand2',
+                 command=self.export_todays_bills, 
+                 padx=15, pady=8).pack(side='left', padx=5)
+        
         # Search Bar
         search_frame = tk.Frame(self.parent, bg='white')
         search_frame.pack(fill='x', padx=20, pady=10)
@@ -53,6 +60,8 @@ class BillingModule:
                 bg='white').pack(side='left', padx=(0, 10))
         
         self.search_var = tk.StringVar()
+        self.search = SearchController(self.parent, self.data_manager.get_bills,
+                                       self._bill_matches, self.show_bills)
         self.search_var.trace('w', lambda *args: self.search_bills())
         
         search_entry = tk.Entry(search_frame, 
@@ -75,7 +84,7 @@ class BillingModule:
                                 values=["All", "Pending", "Paid", "Cancelled"],
                                 width=10)
         status_cb.pack(side='left')
-        status_cb.bind('<<ComboboxSelected>>', lambda e: self.search_bills())
+        status_cb.bind('<<ComboboxSelected>>', lambda e: self.search_bills(immediate=True))
         
         # Bills Table
         table_frame = tk.Frame(self.parent, bg='white')
@@ -108,6 +117,8 @@ class BillingModule:
         self.tree.column('Patient Name', width=150)
         
         self.tree.pack(fill='both', expand=True)
+        # Only the visible window of bills is rendered in Tk
+        self.rows = VirtualRows(self.tree, y_scroll)
         
         # Bind events
         self.tree.bind('<Double-1>', self.view_bill)
@@ -119,17 +130,17 @@ class BillingModule:
         style.configure('Treeview.Heading', font=('Arial', 10, 'bold'))
     
     def load_bills(self):
-        """Load all bills into the table"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        bills = self.data_manager.get_bills()
-        for bill in bills:
-            self.insert_bill_to_tree(bill)
+        """Load all bills into the table (only changed rows are touched)"""
+        self.show_bills(self.data_manager.get_bills())
     
-    def insert_bill_to_tree(self, bill):
-        """Insert a bill into the treeview"""
-        values = (
+    def show_bills(self, bills):
+        """Make the table show exactly these bills"""
+        self.rows.bind(bills, self.bill_values,
+                       tags=lambda bill: (bill['status'].lower(),), key='bill_no')
+    
+    def bill_values(self, bill):
+        """Table row for a bill"""
+        return (
             bill['bill_no'],
             bill['patient_id'],
             bill['patient_name'],
@@ -141,24 +152,22 @@ class BillingModule:
             bill['status'],
             bill.get('payment_method', 'N/A')
         )
-        
-        self.tree.insert('', 'end', values=values, tags=(bill['status'].lower(),))
     
-    def search_bills(self):
-        """Search bills by bill number or patient name"""
-        search_term = self.search_var.get().lower()
-        status_filter = self.status_var.get()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        bills = self.data_manager.get_bills()
-        
-        for bill in bills:
-            if (search_term in bill['bill_no'].lower() or 
-                search_term in bill['patient_name'].lower()):
-                if status_filter == "All" or bill['status'] == status_filter:
-                    self.insert_bill_to_tree(bill)
+    def search_bills(self, immediate=False):
+        """Search bills by bill number or patient name.
+        Debounced while typing; the filtering runs off the Tk thread."""
+        query = (self.search_var.get().lower(), self.status_var.get())
+        if immediate:
+            self.search.run_now(query)
+        else:
+            self.search.request(query)
+    
+    @staticmethod
+    def _bill_matches(bill, query):
+        search_term, status_filter = query
+        return ((search_term in bill['bill_no'].lower() or 
+                 search_term in bill['patient_name'].lower())
+                and (status_filter == "All" or bill['status'] == status_filter))
     
     def create_new_bill(self):
         """Open dialog to create new bill"""
@@ -441,12 +450,14 @@ class BillingModule:
             tk.Button(btn_frame, text="Mark as Paid",
                      command=lambda: self.update_bill_status(bill['bill_no'], 
                                                            'Paid', 
-                                                           dialog)).pack(side='left')
+                                                           dialog,
+                                                           bill.get('version', 0))).pack(side='left')
             
             tk.Button(btn_frame, text="Cancel Bill",
                      command=lambda: self.update_bill_status(bill['bill_no'], 
                                                            'Cancelled', 
-                                                           dialog)).pack(side='left', 
+                                                           dialog,
+                                                           bill.get('version', 0))).pack(side='left', 
                                                                        padx=10)
         
         tk.Button(btn_frame, text="Print",
@@ -455,72 +466,58 @@ class BillingModule:
         tk.Button(btn_frame, text="Close",
                  command=dialog.destroy).pack(side='right')
     
-    def update_bill_status(self, bill_no, status, dialog):
+    def update_bill_status(self, bill_no, status, dialog, version=None):
         """Update bill status"""
-        bills = self.data_manager.get_bills()
-        for i, bill in enumerate(bills):
-            if bill['bill_no'] == bill_no:
-                bills[i]['status'] = status
-                self.data_manager.save_data(self.data_manager.billing_file, bills)
-                break
+        try:
+            self.data_manager.update_bill(bill_no, {'status': status}, version)
+        except StaleRecordError:
+            self.load_bills()
+            if dialog:
+                dialog.destroy()
+            messagebox.showerror("Error", f"Bill {bill_no} was changed by another user.\n"
+                                          "Reopen the bill to see its current status.")
+            return
         
         self.load_bills()
-        dialog.destroy()
+        if dialog:
+            dialog.destroy()
         messagebox.showinfo("Success", f"Bill marked as {status}")
     
     def print_bill(self, bill):
-        """Generate and print bill"""
+        """Generate and print bill (the PDF is written by a document worker)"""
         filename = f"bill_{bill['bill_no']}.pdf"
+        documents.submit('bill_summary', filename, bill,
+                         callback=self._open_pdf, widget=self.parent)
+    
+    @staticmethod
+    def _open_pdf(job):
+        if job.exception() is not None:
+            messagebox.showerror("Error", f"Could not generate {job.filename}: {job.exception()}")
+            return
+        # Open PDF
+        os.startfile(job.result())
+    
+    def export_todays_bills(self):
+        """Write an invoice PDF for every bill dated today, in the background"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        bills = [bill for bill in self.data_manager.get_bills() if bill.get('date') == today]
+        if not bills:
+            messagebox.showinfo("Invoices", "No bills dated today")
+            return
         
-        # Create PDF
-        doc = SimpleDocTemplate(filename, pagesize=letter)
-        elements = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Title'],
-            fontSize=24,
-            spaceAfter=30
-        )
-        
-        # Title
-        elements.append(Paragraph("Hospital Bill", title_style))
-        
-        # Bill details
-        details = [
-            ["Bill No:", bill['bill_no']],
-            ["Date:", bill['date']],
-            ["Patient ID:", bill['patient_id']],
-            ["Patient Name:", bill['patient_name']],
-            ["Services:", bill['services']],
-            ["Subtotal:", f"${bill['subtotal']:.2f}"],
-            ["Tax:", f"${bill['tax']:.2f}"],
-            ["Total:", f"${bill['total']:.2f}"],
-            ["Status:", bill['status']],
-            ["Payment Method:", bill.get('payment_method', 'N/A')]
-        ]
-        
-        # Create table
-        table = Table(details, colWidths=[100, 400])
-        table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
-            ('PADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        elements.append(table)
+        folder = os.path.join(os.path.expanduser('~'), 'Downloads', f"invoices_{today}")
         
-        # Build PDF
-        doc.build(elements)
+        def finished(batch):
+            failed = batch.failed()
+            message = f"{len(batch.files())} invoice(s) saved to {folder}"
+            if failed:
+                message += f"\n{len(failed)} failed: {failed[0].exception()}"
+            messagebox.showinfo("Invoices", message)
         
-        # Open PDF
-        os.startfile(filename)
-    
+        documents.batch('bill', [(os.path.join(folder, f"bill_{bill['bill_no']}.pdf"), bill)
+                                 for bill in bills],
+                        callback=finished, widget=self.parent)
+
     def process_payment(self, updated_bill):
         """Handle payment completion and update bill"""
         self.data_manager.create_bill(updated_bill, self.user['id'])
@@ -551,11 +548,13 @@ class BillingModule:
             menu.add_command(label="Mark as Paid",
                            command=lambda: self.update_bill_status(bill_no, 
                                                                  'Paid', 
-                                                                 None))
+                                                                 None,
+                                                                 bill.get('version', 0)))
             menu.add_command(label="Cancel Bill",
                            command=lambda: self.update_bill_status(bill_no, 
                                                                  'Cancelled', 
-                                                                 None))
+                                                                 None,
+                                                                 bill.get('version', 0)))
         
         menu.add_command(label="Print Bill",
                         command=lambda: self.print_bill(bill))
@@ -0,0 +1,246 @@
+import base64
+import hashlib
+import io
+import json
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# ==================== RENDERERS ====================
+# Each renderer draws one chart kind onto a fresh matplotlib Figure from a
+# plain (JSON-serialisable) spec. They run in the worker, so they must be
+# module-level functions and must not touch Tk.
+
+def _finish_axes(ax, spec: Dict[str, Any]) -> None:
+    if spec.get('title'):
+        ax.set_title(spec['title'])
+    if spec.get('xlabel'):
+        ax.set_xlabel(spec['xlabel'])
+    if spec.get('ylabel'):
+        ax.set_ylabel(spec['ylabel'])
+    if spec.get('rotate'):
+        ax.tick_params(axis='x', rotation=spec['rotate'])
+    if spec.get('grid'):
+        ax.grid(True, alpha=0.3)
+
+
+def _no_data(ax, spec: Dict[str, Any]) -> None:
+    ax.text(0.5, 0.5, spec.get('empty', 'No Data'), ha='center', va='center')
+
+
+def draw_lines(fig, spec: Dict[str, Any]) -> None:
+    """spec: x, series [{label, y, marker, color}], fill (shade under the first)"""
+    ax = fig.add_subplot(111)
+    if not spec.get('x'):
+        _no_data(ax, spec)
+        return
+    for series in spec['series']:
+        ax.plot(spec['x'], series['y'], label=series.get('label'), marker=series.get('marker', 'o'),
+                color=series.get('color'), linewidth=series.get('linewidth', 1.5),
+                markersize=series.get('markersize', 6))
+    if spec.get('fill'):
+        ax.fill_between(spec['x'], spec['series'][0]['y'], alpha=0.3)
+    if spec.get('currency'):
+        from matplotlib.ticker import FuncFormatter
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda value, _: f'${value:,.2f}'))
+    if len(spec['series']) > 1:
+        ax.legend()
+    _finish_axes(ax, spec)
+
+
+def draw_bars(fig, spec: Dict[str, Any]) -> None:
+    """spec: labels, values, colors, horizontal, value_labels, ref_lines"""
+    ax = fig.add_subplot(111)
+    if not spec.get('labels'):
+        _no_data(ax, spec)
+        return
+    if spec.get('horizontal'):
+        bars = ax.barh(spec['labels'], spec['values'], color=spec.get('colors'))
+    else:
+        bars = ax.bar(spec['labels'], spec['values'], color=spec.get('colors'))
+    count = len(spec['labels'])
+    for i, level in enumerate(spec.get('ref_lines') or []):
+        ax.axvline(x=level, ymin=i / count, ymax=(i + 1) / count,
+                   color='red', linestyle='--', alpha=0.5)
+    if spec.get('value_labels'):
+        for bar in bars:
+            if spec.get('horizontal'):
+                ax.text(bar.get_width(), bar.get_y() + bar.get_height() / 2.,
+                        f'{int(bar.get_width())}', ha='left', va='center')
+            else:
+                ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height(),
+                        f'{int(bar.get_height())}', ha='center', va='bottom')
+    _finish_axes(ax, spec)
+
+
+def draw_pie(fig, spec: Dict[str, Any]) -> None:
+    """spec: labels, sizes, colors, startangle, fontsize"""
+    ax = fig.add_subplot(111)
+    if not spec.get('sizes'):
+        _no_data(ax, spec)
+        return
+    textprops = {'fontsize': spec['fontsize']} if spec.get('fontsize') else None
+    ax.pie(spec['sizes'], labels=spec['labels'], autopct='%1.1f%%',
+           startangle=spec.get('startangle', 0), colors=spec.get('colors'),
+           textprops=textprops)
+    ax.axis('equal')
+    _finish_axes(ax, spec)
+
+
+def draw_histogram_and_pie(fig, spec: Dict[str, Any]) -> None:
+    """spec: values, bins, hist {title, xlabel, ylabel}, pie {labels, sizes, title}"""
+    ax1 = fig.add_subplot(121)
+    ax1.hist(spec['values'], bins=spec.get('bins', 20), edgecolor='black')
+    _finish_axes(ax1, spec.get('hist', {}))
+    ax2 = fig.add_subplot(122)
+    pie = spec.get('pie', {})
+    if pie.get('sizes'):
+        ax2.pie(pie['sizes'], labels=pie['labels'], autopct='%1.1f%%')
+    _finish_axes(ax2, pie)
+
+
+RENDERERS: Dict[str, Callable] = {
+    'lines': draw_lines,
+    'bars': draw_bars,
+    'pie': draw_pie,
+    'histogram_and_pie': draw_histogram_and_pie
+}
+
+
+def render_png(kind: str, spec: Dict[str, Any], size: Tuple[float, float],
+               dpi: int, style: Optional[str] = None) -> bytes:
+    """Draw a chart off-screen with the Agg backend and return it as PNG"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.style
+
+    def draw() -> bytes:
+        fig = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(fig)
+        RENDERERS[kind](fig, spec)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+
+    if style:
+        try:
+            with matplotlib.style.context(style):
+                return draw()
+        except OSError:
+            pass  # style not available in this matplotlib version
+    return draw()
+
+
+# ==================== SERVICE ====================
+
+class ChartService:
+    """Renders charts to PNG off the Tk thread and caches the results.
+
+    A chart is described by a kind (a key of RENDERERS) and a spec holding
+    the aggregated data to plot. The PNG bytes are cached (LRU, by a hash
+    of kind, spec, size and style), so an unchanged chart is shown without
+    rendering again; otherwise it is drawn in a worker process (a thread
+    when processes are not available) while the Tk thread only polls for
+    the result and shows the finished image.
+    """
+
+    def __init__(self, cache_size: int = 64, workers: int = 1,
+                 executor: Optional[Executor] = None, poll: int = 50):
+        self.cache_size = cache_size
+        self.workers = workers
+        self.poll = poll
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError, ImportError):
+                # One thread, so matplotlib is never used concurrently
+                self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    @staticmethod
+    def key(kind: str, spec: Dict[str, Any], size: Tuple[float, float], dpi: int,
+            style: Optional[str] = None) -> str:
+        payload = json.dumps([kind, spec, list(size), dpi, style], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def render(self, kind: str, spec: Dict[str, Any], size: Tuple[float, float] = (5, 3),
+               dpi: int = 100, style: Optional[str] = None) -> Future:
+        """Future of the chart's PNG bytes (already done on a cache hit)"""
+        key = self.key(kind, spec, size, dpi, style)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                done = Future()
+                done.set_result(png)
+                return done
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            try:
+                future = self._pool().submit(render_png, kind, spec, tuple(size), dpi, style)
+            except RuntimeError:
+                # The process pool broke (a worker died); fall back to a thread
+                self._executor = ThreadPoolExecutor(max_workers=1)
+                future = self._executor.submit(render_png, kind, spec, tuple(size), dpi, style)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._store(key, f))
+        return future
+
+    def _store(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._cache[key] = future.result()
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def widget(self, parent: tk.Misc, kind: str, spec: Dict[str, Any],
+               size: Tuple[float, float] = (5, 3), dpi: int = 100,
+               style: Optional[str] = None, bg: str = 'white') -> tk.Label:
+        """A Label that shows the chart once it is rendered (not packed)"""
+        label = tk.Label(parent, text='Loading chart…', bg=bg, fg='#7f8c8d')
+        future = self.render(kind, spec, size, dpi, style)
+
+        def show() -> None:
+            if not future.done():
+                try:
+                    label.after(self.poll, show)
+                except tk.TclError:
+                    pass  # the screen was closed meanwhile
+                return
+            try:
+                png = future.result()
+            except Exception as e:
+                print(f"Chart rendering failed: {e}")
+                label.config(text='Chart unavailable')
+                return
+            image = tk.PhotoImage(master=label, data=base64.b64encode(png).decode('ascii'))
+            label.config(image=image, text='')
+            label.image = image  # keep a reference
+
+        try:
+            show()
+        except tk.TclError:
+            pass
+        return label
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared by every screen, so the cache survives switching modules
+charts = ChartService()
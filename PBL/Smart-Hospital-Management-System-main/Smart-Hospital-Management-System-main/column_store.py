@@ -0,0 +1,90 @@
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Typed columns per collection: column -> 'date' (datetime64), 'float'
+# (float64) or 'category'. Other fields are kept as object columns.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    'users': {'id': 'category', 'role': 'category', 'department': 'category'},
+    'patients': {'dob': 'date', 'gender': 'category'},
+    'appointments': {'date': 'date', 'doctor_id': 'category', 'patient_id': 'category',
+                     'status': 'category'},
+    'medicines': {'name': 'category', 'quantity': 'float', 'reorder_level': 'float'},
+    'lab_reports': {'test': 'category', 'status': 'category', 'patient_id': 'category'},
+    'bills': {'date': 'date', 'amount': 'float', 'status': 'category'},
+    'prescriptions': {'patient_id': 'category'}
+}
+
+
+def to_columns(records, schema: Dict[str, str]) -> pd.DataFrame:
+    """Records -> DataFrame with the schema's columns converted to their
+    types (unparseable values become NaT/NaN, missing columns are added)"""
+    frame = pd.DataFrame.from_records(list(records))
+    for column, kind in schema.items():
+        values = frame[column] if column in frame else pd.Series(np.nan, index=frame.index)
+        if kind == 'date':
+            frame[column] = pd.to_datetime(values, errors='coerce', format='%Y-%m-%d')
+        elif kind == 'float':
+            frame[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            frame[column] = values.astype('category')
+    return frame
+
+
+def _bill_dates(records):
+    # Old bills only carry created_at ('YYYY-MM-DD HH:MM:SS')
+    for bill in records:
+        if not bill.get('date'):
+            created = bill.get('created_at', '')
+            bill = {**bill, 'date': created.split()[0] if created else None}
+        yield bill
+
+
+class ColumnStore:
+    """Columnar (pandas) copies of a data manager's collections.
+
+    frame(name) loads the collection with its get_<name>() method once,
+    converts it to typed columns and keeps it until the collection changes.
+    Changes are detected with ``data_manager.storage.version(name)`` when
+    the data manager has one; otherwise every call reloads.
+
+    Frames are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, data_manager, schemas: Optional[Dict[str, Dict[str, str]]] = None):
+        self.data_manager = data_manager
+        self.schemas = schemas or SCHEMAS
+        self._lock = threading.Lock()
+        self._frames: Dict[str, Tuple[Any, pd.DataFrame]] = {}
+
+    def _version(self, name: str) -> Any:
+        storage = getattr(self.data_manager, 'storage', None)
+        if storage is None or not hasattr(storage, 'version'):
+            return None
+        try:
+            return storage.version(name)
+        except (KeyError, ValueError):
+            return None
+
+    def frame(self, name: str) -> pd.DataFrame:
+        version = self._version(name)
+        with self._lock:
+            cached = self._frames.get(name)
+            if cached is not None and version is not None and cached[0] == version:
+                return cached[1]
+        records = getattr(self.data_manager, f'get_{name}')()
+        if name == 'bills':
+            records = _bill_dates(records)
+        frame = to_columns(records, self.schemas.get(name, {}))
+        with self._lock:
+            self._frames[name] = (version, frame)
+        return frame
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._frames.clear()
+            else:
+                self._frames.pop(name, None)
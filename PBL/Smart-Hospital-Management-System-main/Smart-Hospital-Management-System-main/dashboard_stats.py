@@ -0,0 +1,124 @@
+from collections import Counter
+from typing import Dict, List, Any, Callable, Hashable, Iterable, Optional, Tuple
+
+# A record's share of the counters: counter key -> amount
+Contribution = Dict[Hashable, float]
+
+LOW_STOCK = 20
+
+
+def patient_stats(patient: Dict[str, Any]) -> Contribution:
+    return {'total': 1}
+
+
+def doctor_stats(doctor: Dict[str, Any]) -> Contribution:
+    return {'total': 1}
+
+
+def appointment_stats(appointment: Dict[str, Any]) -> Contribution:
+    return {'total': 1, ('on', appointment.get('date')): 1}
+
+
+def medicine_stats(medicine: Dict[str, Any]) -> Contribution:
+    stats = {'total': 1}
+    try:
+        if medicine.get('stock', 0) <= LOW_STOCK:
+            stats['low_stock'] = 1
+    except TypeError:
+        pass
+    return stats
+
+
+def lab_report_stats(report: Dict[str, Any]) -> Contribution:
+    stats = {'total': 1}
+    if report.get('status') == 'Pending':
+        stats['pending'] = 1
+    return stats
+
+
+def bill_stats(bill: Dict[str, Any]) -> Contribution:
+    stats = {'total': 1}
+    if bill.get('status') == 'Paid':
+        try:
+            stats['paid_revenue'] = float(bill.get('total', 0))
+        except (TypeError, ValueError):
+            pass
+    return stats
+
+
+# Collection name -> (key field, contribution of one record)
+STAT_RULES: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Contribution]]] = {
+    'patients': ('id', patient_stats),
+    'doctors': ('id', doctor_stats),
+    'appointments': ('id', appointment_stats),
+    'pharmacy': ('id', medicine_stats),
+    'lab_reports': ('id', lab_report_stats),
+    'billing': ('bill_no', bill_stats)
+}
+
+
+class DashboardStats:
+    """Running dashboard counters, kept current by the data manager's writes.
+
+    Each collection is counted once (recount) and then patched with
+    add/update/remove as records are written, so reading a figure
+    costs a dict lookup however large the collections are. The share each
+    record contributed is remembered by key, which lets updates and
+    deletes subtract exactly what was added even when the record dict was
+    changed in place.
+
+    ``source(name)`` is whatever the owner counted from (the HashIndex of a
+    JSON collection, or a table version), so it can tell when a recount is
+    needed.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Tuple[str, Callable]]] = None):
+        self.rules = rules or STAT_RULES
+        self._counts: Dict[str, Counter] = {name: Counter() for name in self.rules}
+        self._shares: Dict[str, Dict[Any, List[Contribution]]] = {name: {} for name in self.rules}
+        self._sources: Dict[str, Any] = {}
+
+    def source(self, name: str) -> Any:
+        return self._sources.get(name)
+
+    def set_source(self, name: str, source: Any) -> None:
+        self._sources[name] = source
+
+    def recount(self, name: str, records: Iterable[Dict[str, Any]], source: Any = None) -> None:
+        self._counts[name] = Counter()
+        self._shares[name] = {}
+        for record in records:
+            self.add(name, record)
+        self._sources[name] = source
+
+    def add(self, name: str, record: Dict[str, Any]) -> None:
+        key, rule = self.rules[name]
+        share = rule(record)
+        self._counts[name].update(share)
+        self._shares[name].setdefault(record.get(key), []).append(share)
+
+    def update(self, name: str, record: Dict[str, Any]) -> None:
+        """Recount a record that changed (the first one with its key)"""
+        key, rule = self.rules[name]
+        shares = self._shares[name].get(record.get(key))
+        if not shares:
+            self.add(name, record)
+            return
+        self._counts[name].subtract(shares[0])
+        shares[0] = rule(record)
+        self._counts[name].update(shares[0])
+
+    def remove(self, name: str, key_value: Any, first_only: bool = False) -> None:
+        """Forget the records with this key (only the oldest with first_only)"""
+        shares = self._shares[name].pop(key_value, [])
+        if first_only and len(shares) > 1:
+            self._shares[name][key_value] = shares[1:]
+            shares = shares[:1]
+        for share in shares:
+            self._counts[name].subtract(share)
+
+    def value(self, name: str, counter: Hashable = 'total') -> float:
+        return self._counts[name].get(counter, 0)
+
+    def appointments_on(self, date: str) -> int:
+        return self.value('appointments', ('on', date))
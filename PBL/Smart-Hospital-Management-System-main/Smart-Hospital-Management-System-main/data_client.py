@@ -0,0 +1,174 @@
+import functools
+import itertools
+import json
+import queue
+import socket
+import threading
+import tkinter as tk
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from data_manager import StaleRecordError
+from data_server import DEFAULT_PORT, READ_METHODS, WRITE_METHODS
+from revenue_rollup import RevenueRollup
+
+# Server-side exception types raised again as themselves; others become RuntimeError
+ERRORS = {
+    'ValueError': ValueError,
+    'StaleRecordError': StaleRecordError,
+    'KeyError': KeyError,
+    'TypeError': TypeError,
+    'PermissionError': PermissionError,
+}
+
+Change = Dict[str, Any]
+
+
+class DataClient:
+    """Talks to a data_server on behalf of data_manager.DataManager.
+
+    The methods the server serves (data_server.READ_METHODS and
+    WRITE_METHODS: get_patients(), add_patient(...),
+    update_medicine_stock(...), search_records(...), ...) are forwarded to
+    it and block until it answers; get_audit_logs() and revenue_rollup()
+    are provided here too. Anything else of data_manager.DataManager is
+    not available, and the screens in main.py, which use main.DataManager
+    (generate_id, text_index, save_data, ...), cannot run on a client.
+    Server errors are raised again as the same type (ValueError,
+    StaleRecordError, ...). subscribe() delivers the server's change
+    notifications, e.g. to refresh a list another workstation just changed.
+
+    A TCP server wants its token (data_server.read_token(data_dir)).
+    """
+
+    def __init__(self, path: Optional[str] = None, host: str = '127.0.0.1',
+                 port: int = DEFAULT_PORT, timeout: float = 30.0, poll: int = 100,
+                 token: Optional[str] = None):
+        if path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(path)
+        else:
+            self._sock = socket.create_connection((host, port))
+        self.timeout = timeout
+        self.poll = poll
+        self._reader = self._sock.makefile('rb')
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._listeners: List[tuple] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._receive, name='data-client', daemon=True)
+        self._thread.start()
+        if token is not None:
+            try:
+                self.call('auth', token)
+            except BaseException:
+                self.close()
+                raise
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """Run a DataManager method on the server and return its result"""
+        request_id = next(self._ids)
+        future = Future()
+        self._pending[request_id] = future
+        line = json.dumps({'id': request_id, 'method': method, 'args': args, 'kwargs': kwargs},
+                          default=str) + '\n'
+        try:
+            try:
+                with self._send_lock:
+                    self._sock.sendall(line.encode('utf-8'))
+            except OSError:
+                raise ConnectionError("Data server connection is closed")
+            return future.result(self.timeout)
+        finally:
+            # Answered, failed or timed out: a late reply is dropped
+            self._pending.pop(request_id, None)
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name in READ_METHODS or name in WRITE_METHODS:
+            return functools.partial(self.call, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def get_audit_logs(self, since: Optional[str] = None, until: Optional[str] = None,
+                       action: Optional[str] = None,
+                       user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        return iter(self.call('get_audit_logs', since, until, action, user_id))
+
+    def revenue_rollup(self) -> RevenueRollup:
+        """Revenue buckets, recounted here from get_bills()"""
+        rollup = RevenueRollup('id')
+        rollup.recount(self.get_bills())
+        return rollup
+
+    def subscribe(self, callback: Callable[[Change], None],
+                  collections: Optional[Iterable[str]] = None,
+                  widget: Optional[tk.Misc] = None) -> None:
+        """Call callback(change) after each write to these collections (all
+        when None) by any client. Without widget the callback runs on the
+        client's network thread; with one it runs on the Tk thread."""
+        collections = set(collections) if collections else None
+        if widget is None:
+            self._listeners.append((collections, callback))
+        else:
+            changes: "queue.Queue[Change]" = queue.Queue()
+            self._listeners.append((collections, changes.put))
+
+            def poll() -> None:
+                while True:
+                    try:
+                        change = changes.get_nowait()
+                    except queue.Empty:
+                        break
+                    callback(change)
+                try:
+                    widget.after(self.poll, poll)
+                except tk.TclError:
+                    self._listeners = [l for l in self._listeners if l[1] != changes.put]
+
+            poll()
+        # One server subscription covers every listener of this client
+        wanted = [c for c, _ in self._listeners]
+        self.call('subscribe', None if None in wanted else sorted(set().union(*wanted)))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self._thread.join(timeout=1)
+
+    # ---- network thread ----
+    def _receive(self) -> None:
+        try:
+            for line in self._reader:
+                message = json.loads(line)
+                if message.get('event'):
+                    self._dispatch(message)
+                    continue
+                future = self._pending.pop(message.get('id'), None)
+                if future is None:
+                    continue
+                error = message.get('error')
+                if error:
+                    future.set_exception(ERRORS.get(error['type'], RuntimeError)(error['message']))
+                else:
+                    future.set_result(message.get('result'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            for future in list(self._pending.values()):
+                future.set_exception(ConnectionError("Data server connection is closed"))
+            self._pending.clear()
+
+    def _dispatch(self, change: Change) -> None:
+        for collections, callback in list(self._listeners):
+            if collections is None or change.get('collection') in collections:
+                try:
+                    callback(change)
+                except Exception as e:
+                    print(f"Change listener failed: {e}")
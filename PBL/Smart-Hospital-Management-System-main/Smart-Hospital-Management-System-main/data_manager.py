@@ -1,14 +1,45 @@
-import json
-import os
 from datetime import datetime
 import hashlib
 import uuid
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator
 from pathlib import Path
+from file_lock import file_lock
+from storage_engine import JsonFileStorage, JournalStorage
+from sqlite_backend import SQLiteStorage, migrate_json_dir
+from audit_log import AuditLog
+from record_index import CollectionIndex, scan
+from revenue_rollup import RevenueRollup
+from record_version import StaleRecordError, check_version
+
 
 class DataManager:
-    def __init__(self, data_dir: str = "data"):
-        """Initialize DataManager with data directory"""
+    # Secondary indexes used by search_records; add more with create_index()
+    DEFAULT_INDEXES = {
+        'users': ['username', 'role'],
+        'appointments': ['doctor_id', 'patient_id', 'date', 'status'],
+        'lab_reports': ['patient_id', 'status'],
+        'bills': ['patient_id', 'status'],
+        'prescriptions': ['patient_id']
+    }
+    
+    def __init__(self, data_dir: str = "data", storage: str = "json", backup: bool = False):
+        """Initialize DataManager with data directory.
+
+        storage selects the backend: 'json' rewrites one JSON file per
+        collection on every change, 'journal' appends each change to a
+        per-collection journal that is compacted into the JSON snapshot,
+        'sqlite' keeps all collections in data/hospital.db (the JSON files
+        are imported the first time it is created). With backup, the JSON
+        backends keep the previous version of each file as <name>.json.bak.
+
+        Several processes may share a data folder with the 'json' and
+        'sqlite' backends ('journal' refuses a second DataManager on its
+        folder with RuntimeError until the first is closed): every write takes an advisory lock on
+        <name>.lock and re-reads the collection first. Records carry a
+        'version' that each update increments; pass expected_version to
+        the update methods to have stale edits rejected.
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
@@ -20,31 +51,170 @@ class DataManager:
             'prescriptions': self.data_dir / 'prescriptions.json',
             'medicines': self.data_dir / 'medicines.json',
             'lab_reports': self.data_dir / 'lab_reports.json',
-            'bills': self.data_dir / 'bills.json',
-            'audit_log': self.data_dir / 'audit_log.json'
+            'bills': self.data_dir / 'bills.json'
         }
         
-        # Create files if they don't exist
-        for file_path in self.files.values():
-            if not file_path.exists():
-                self._save_data(file_path, [])
+        # Audit trail lives in buffered day segments under data/audit/
+        self.audit_log = AuditLog(self.data_dir / 'audit')
+        for legacy in ('audit_log.json', 'audit_log.journal'):
+            self.audit_log.import_legacy(self.data_dir / legacy)
+        
+        # Storage backend (creates files if they don't exist)
+        if storage == 'json':
+            self.storage = JsonFileStorage(self.files, backup=backup)
+        elif storage == 'journal':
+            self.storage = JournalStorage(self.files, backup=backup)
+        elif storage == 'sqlite':
+            db_path = self.data_dir / 'hospital.db'
+            if not db_path.exists():
+                migrate_json_dir(self.data_dir, db_path,
+                                 key_fields={name: 'id' for name in self.files})
+            self.storage = SQLiteStorage(db_path, self.files)
+        else:
+            raise ValueError(f"Unknown storage backend: {storage}")
+        self._locks = {name: file_lock(path.with_suffix('.lock'))
+                       for name, path in self.files.items()}
+        
+        # Built lazily on first search, then maintained on every write
+        self._indexes = {name: CollectionIndex(fields)
+                         for name, fields in self.DEFAULT_INDEXES.items()}
+        
+        # Revenue per day/month/payment method, with the bills version it reflects
+        self._revenue = RevenueRollup('id')
+        self._revenue_version: Optional[int] = None
     
-    def _load_data(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Load data from JSON file with error handling"""
+    def _load_data(self, collection: str) -> List[Dict[str, Any]]:
+        """Load a collection from the storage backend.
+
+        The returned list is a fresh copy, but the record dicts are shared
+        with the backend, so changes must go through the save/insert/update
+        helpers below.
+        """
+        return self.storage.load(collection)
+    
+    @contextmanager
+    def _locked(self, collection: str) -> Iterator[None]:
+        """Hold the collection's file lock, with the collection re-read from
+        disk, for a read-modify-write cycle (reentrant)"""
+        with self._locks[collection]:
+            self.storage.refresh(collection)
+            yield
+    
+    def _save_data(self, collection: str, data: List[Dict[str, Any]]) -> None:
+        """Overwrite a whole collection with error handling"""
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            with self._locked(collection):
+                self.storage.replace(collection, data)
+        except Exception as e:
+            self._log_error(f"Error saving {collection}: {str(e)}")
+            raise
     
-    def _save_data(self, file_path: Path, data: List[Dict[str, Any]]) -> None:
-        """Save data to JSON file with error handling"""
+    def _insert_record(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append one record to a collection with error handling"""
+        record.setdefault('version', 1)
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=4)
+            with self._locked(collection):
+                before = self.storage.version(collection)
+                inserted = self.storage.insert(collection, record)
         except Exception as e:
-            self._log_error(f"Error saving to {file_path}: {str(e)}")
+            self._log_error(f"Error saving to {collection}: {str(e)}")
             raise
+        
+        index = self._indexes.get(collection)
+        if self._index_follows(index, collection, before):
+            index.add(inserted)
+        if collection == 'bills' and self._revenue_follows(before):
+            self._revenue.add(inserted)
+        return inserted
+    
+    def _update_record(self, collection: str, record_id: str, changes: Dict[str, Any],
+                       expected_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Apply changes to one record, returns None if it does not exist.
+
+        The record's version is incremented. With expected_version, the
+        update is refused with StaleRecordError unless the stored record is
+        still at that version.
+        """
+        with self._locked(collection):
+            current = next((r for r in self._load_data(collection) if r.get('id') == record_id), None)
+            if current is None:
+                return None
+            version = check_version(collection, record_id, current, expected_version)
+            changes = {**changes, 'version': version + 1}
+            
+            before = self.storage.version(collection)
+            index = self._indexes.get(collection)
+            old_values = {}
+            if index is not None and index.version == before:
+                old_values = index.capture(record_id, changes)
+            try:
+                updated = self.storage.update(collection, record_id, changes)
+            except Exception as e:
+                self._log_error(f"Error saving to {collection}: {str(e)}")
+                raise
+        
+        if self._index_follows(index, collection, before):
+            index.updated(record_id, old_values)
+        if collection == 'bills' and updated is not None and self._revenue_follows(before):
+            self._revenue.update(updated)
+        return updated
+    
+    def _index_follows(self, index: Optional[CollectionIndex], collection: str, before: int) -> bool:
+        """True if the index was current before a write and the write was the
+        only change since, so it can be patched instead of rebuilt"""
+        if index is None or index.version != before:
+            return False
+        after = self.storage.version(collection)
+        if after != before + 1:
+            return False
+        index.version = after
+        return True
+    
+    def _revenue_follows(self, before: int) -> bool:
+        """Like _index_follows, for the revenue rollup of the bills"""
+        if self._revenue_version != before:
+            return False
+        after = self.storage.version('bills')
+        if after != before + 1:
+            return False
+        self._revenue_version = after
+        return True
+    
+    def revenue_rollup(self) -> RevenueRollup:
+        """Bill amounts pre-summed per day, month and payment method,
+        kept in step by create_bill and bill updates"""
+        version = self.storage.version('bills')
+        if self._revenue_version != version:
+            self._revenue.recount(self._load_data('bills'))
+            self._revenue_version = version
+        return self._revenue
+    
+    def create_index(self, collection: str, field: str) -> None:
+        """Declare a secondary index on collection.field for search_records"""
+        if collection not in self.files:
+            raise ValueError(f"Unknown collection: {collection}")
+        self._indexes.setdefault(collection, CollectionIndex()).add_field(field)
+    
+    def _current_index(self, collection: str,
+                       records: Optional[List[Dict[str, Any]]] = None) -> Optional[CollectionIndex]:
+        """The collection's index, rebuilt if the storage moved on; the
+        records are only loaded for a rebuild"""
+        index = self._indexes.get(collection)
+        if index is None:
+            return None
+        version = self.storage.version(collection)
+        if index.version != version:
+            index.rebuild(self._load_data(collection) if records is None else records, version)
+        return index
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return storage statistics (record cache hit/miss counters for 'json')"""
+        return self.storage.stats()
+    
+    def close(self) -> None:
+        """Flush and close the storage backend and audit log"""
+        self.storage.close()
+        self.audit_log.close()
     
     def _log_action(self, action: str, details: str, user_id: Optional[str] = None) -> None:
         """Log actions for audit trail"""
@@ -56,9 +226,7 @@ class DataManager:
             'ip_address': '127.0.0.1'  # In production, get actual IP
         }
         
-        logs = self._load_data(self.files['audit_log'])
-        logs.append(log_entry)
-        self._save_data(self.files['audit_log'], logs)
+        self.audit_log.write(log_entry)
     
     def _log_error(self, error_msg: str) -> None:
         """Log error messages"""
@@ -70,7 +238,7 @@ class DataManager:
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Authenticate user and return user data if successful"""
-        users = self._load_data(self.files['users'])
+        users = self._load_data('users')
         hashed_password = self._hash_password(password)
         
         for user in users:
@@ -82,7 +250,7 @@ class DataManager:
     # User Management
     def create_user(self, username: str, password: str, role: str, **kwargs) -> Dict[str, Any]:
         """Create new user with validation"""
-        users = self._load_data(self.files['users'])
+        users = self._load_data('users')
         
         # Validate username uniqueness
         if any(u['username'] == username for u in users):
@@ -99,34 +267,31 @@ class DataManager:
             **kwargs
         }
         
-        users.append(new_user)
-        self._save_data(self.files['users'], users)
+        self._insert_record('users', new_user)
         self._log_action('CREATE_USER', f'Created user {username}', user_id)
         
         return {k: v for k, v in new_user.items() if k != 'password'}
     
-    def update_user(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def update_user(self, user_id: str, data: Dict[str, Any],
+                    expected_version: Optional[int] = None) -> Dict[str, Any]:
         """Update user data with validation"""
-        users = self._load_data(self.files['users'])
+        users = self._load_data('users')
         
-        for i, user in enumerate(users):
+        for user in users:
             if user['id'] == user_id:
                 if 'password' in data:
                     data['password'] = self._hash_password(data['password'])
-                users[i].update(data)
-                self._save_data(self.files['users'], users)
+                updated = self._update_record('users', user_id, data, expected_version)
                 self._log_action('UPDATE_USER', 
                                f'Updated user {user["username"]}', 
                                user_id)
-                return {k: v for k, v in users[i].items() if k != 'password'}
+                return {k: v for k, v in updated.items() if k != 'password'}
         
         raise ValueError("User not found")
     
     # Patient Management
     def add_patient(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Add new patient record"""
-        patients = self._load_data(self.files['patients'])
-        
         patient_id = str(uuid.uuid4())
         new_patient = {
             'id': patient_id,
@@ -134,34 +299,31 @@ class DataManager:
             **data
         }
         
-        patients.append(new_patient)
-        self._save_data(self.files['patients'], patients)
+        self._insert_record('patients', new_patient)
         self._log_action('ADD_PATIENT', 
                         f'Added patient {data.get("name")}', 
                         user_id)
         
         return new_patient
     
-    def update_patient(self, patient_id: str, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    def update_patient(self, patient_id: str, data: Dict[str, Any], user_id: str,
+                       expected_version: Optional[int] = None) -> Dict[str, Any]:
         """Update patient record"""
-        patients = self._load_data(self.files['patients'])
+        patients = self._load_data('patients')
         
-        for i, patient in enumerate(patients):
+        for patient in patients:
             if patient['id'] == patient_id:
-                patients[i].update(data)
-                self._save_data(self.files['patients'], patients)
+                updated = self._update_record('patients', patient_id, data, expected_version)
                 self._log_action('UPDATE_PATIENT', 
                                f'Updated patient {patient["name"]}', 
                                user_id)
-                return patients[i]
+                return updated
         
         raise ValueError("Patient not found")
     
     # Appointment Management
     def create_appointment(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Create new appointment"""
-        appointments = self._load_data(self.files['appointments'])
-        
         appointment_id = str(uuid.uuid4())
         new_appointment = {
             'id': appointment_id,
@@ -170,8 +332,7 @@ class DataManager:
             **data
         }
         
-        appointments.append(new_appointment)
-        self._save_data(self.files['appointments'], appointments)
+        self._insert_record('appointments', new_appointment)
         self._log_action('CREATE_APPOINTMENT', 
                         f'Created appointment for patient {data.get("patient_id")}',
                         user_id)
@@ -181,8 +342,6 @@ class DataManager:
     # Medicine Management
     def add_medicine(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Add new medicine to inventory"""
-        medicines = self._load_data(self.files['medicines'])
-        
         medicine_id = str(uuid.uuid4())
         new_medicine = {
             'id': medicine_id,
@@ -190,8 +349,7 @@ class DataManager:
             **data
         }
         
-        medicines.append(new_medicine)
-        self._save_data(self.files['medicines'], medicines)
+        self._insert_record('medicines', new_medicine)
         self._log_action('ADD_MEDICINE', 
                         f'Added medicine {data.get("name")}',
                         user_id)
@@ -199,31 +357,33 @@ class DataManager:
         return new_medicine
     
     def update_medicine_stock(self, medicine_id: str, quantity_change: int, user_id: str) -> Dict[str, Any]:
-        """Update medicine stock levels"""
-        medicines = self._load_data(self.files['medicines'])
-        
-        for i, medicine in enumerate(medicines):
-            if medicine['id'] == medicine_id:
-                new_quantity = medicine['quantity'] + quantity_change
-                if new_quantity < 0:
-                    raise ValueError("Insufficient stock")
-                
-                medicines[i]['quantity'] = new_quantity
-                medicines[i]['last_updated'] = datetime.now().isoformat()
-                
-                self._save_data(self.files['medicines'], medicines)
-                self._log_action('UPDATE_STOCK',
-                               f'Updated {medicine["name"]} stock by {quantity_change}',
-                               user_id)
-                return medicines[i]
+        """Update medicine stock levels (the change is applied to the current
+        stock under the medicines lock, so concurrent changes add up)"""
+        with self._locked('medicines'):
+            medicines = self._load_data('medicines')
+            
+            for medicine in medicines:
+                if medicine['id'] == medicine_id:
+                    new_quantity = medicine['quantity'] + quantity_change
+                    if new_quantity < 0:
+                        raise ValueError("Insufficient stock")
+                    
+                    updated = self._update_record('medicines', medicine_id, {
+                        'quantity': new_quantity,
+                        'last_updated': datetime.now().isoformat()
+                    }, medicine.get('version', 0))
+                    break
+            else:
+                raise ValueError("Medicine not found")
         
-        raise ValueError("Medicine not found")
+        self._log_action('UPDATE_STOCK',
+                         f'Updated {medicine["name"]} stock by {quantity_change}',
+                         user_id)
+        return updated
     
     # Lab Report Management
     def create_lab_report(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Create new lab report"""
-        reports = self._load_data(self.files['lab_reports'])
-        
         report_id = str(uuid.uuid4())
         new_report = {
             'id': report_id,
@@ -232,8 +392,7 @@ class DataManager:
             **data
         }
         
-        reports.append(new_report)
-        self._save_data(self.files['lab_reports'], reports)
+        self._insert_record('lab_reports', new_report)
         self._log_action('CREATE_LAB_REPORT',
                         f'Created lab report for patient {data.get("patient_id")}',
                         user_id)
@@ -243,8 +402,6 @@ class DataManager:
     # Billing Management
     def create_bill(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Create new bill"""
-        bills = self._load_data(self.files['bills'])
-        
         bill_id = str(uuid.uuid4())
         new_bill = {
             'id': bill_id,
@@ -253,8 +410,7 @@ class DataManager:
             **data
         }
         
-        bills.append(new_bill)
-        self._save_data(self.files['bills'], bills)
+        self._insert_record('bills', new_bill)
         self._log_action('CREATE_BILL',
                         f'Created bill for patient {data.get("patient_id")}',
                         user_id)
@@ -264,8 +420,6 @@ class DataManager:
     # Prescription Management
     def create_prescription(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Create new prescription"""
-        prescriptions = self._load_data(self.files['prescriptions'])
-        
         prescription_id = str(uuid.uuid4())
         new_prescription = {
             'id': prescription_id,
@@ -273,8 +427,7 @@ class DataManager:
             **data
         }
         
-        prescriptions.append(new_prescription)
-        self._save_data(self.files['prescriptions'], prescriptions)
+        self._insert_record('prescriptions', new_prescription)
         self._log_action('CREATE_PRESCRIPTION',
                         f'Created prescription for patient {data.get("patient_id")}',
                         user_id)
@@ -284,50 +437,58 @@ class DataManager:
     # Getters for analytics
     def get_users(self) -> List[Dict[str, Any]]:
         """Get all users"""
-        users = self._load_data(self.files['users'])
+        users = self._load_data('users')
         return [{k: v for k, v in u.items() if k != 'password'} for u in users]
     
     def get_patients(self) -> List[Dict[str, Any]]:
         """Get all patients"""
-        return self._load_data(self.files['patients'])
+        return self._load_data('patients')
     
     def get_appointments(self) -> List[Dict[str, Any]]:
         """Get all appointments"""
-        return self._load_data(self.files['appointments'])
+        return self._load_data('appointments')
     
     def get_medicines(self) -> List[Dict[str, Any]]:
         """Get all medicines"""
-        return self._load_data(self.files['medicines'])
+        return self._load_data('medicines')
     
     def get_lab_reports(self) -> List[Dict[str, Any]]:
         """Get all lab reports"""
-        return self._load_data(self.files['lab_reports'])
+        return self._load_data('lab_reports')
     
     def get_bills(self) -> List[Dict[str, Any]]:
         """Get all bills"""
-        return self._load_data(self.files['bills'])
+        return self._load_data('bills')
     
     def get_prescriptions(self) -> List[Dict[str, Any]]:
         """Get all prescriptions"""
-        return self._load_data(self.files['prescriptions'])
+        return self._load_data('prescriptions')
     
-    def get_audit_logs(self) -> List[Dict[str, Any]]:
-        """Get all audit logs"""
-        return self._load_data(self.files['audit_log'])
+    def get_audit_logs(self, since: Optional[str] = None, until: Optional[str] = None,
+                       action: Optional[str] = None,
+                       user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream audit logs oldest first, optionally filtered by time range,
+        action or user. Use list() on the result if you need them all."""
+        return self.audit_log.read(since, until, action, user_id)
     
     # Search functionality
     def search_records(self, collection: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Search records in a collection based on query parameters"""
-        data = self._load_data(self.files[collection])
-        results = []
-        
-        for record in data:
-            matches = True
-            for key, value in query.items():
-                if key not in record or record[key] != value:
-                    matches = False
-                    break
-            if matches:
-                results.append(record)
-        
-        return results
\ No newline at end of file
+        """Search records in a collection based on query parameters.
+        
+        When some query keys are indexed, the posting lists are intersected
+        smallest first and only the candidates are checked; otherwise the
+        collection is scanned. An index that is current answers without
+        loading the collection.
+        """
+        plan = self.explain(collection, query)
+        if plan['strategy'] == 'index':
+            return self._indexes[collection].search(query, plan)
+        return scan(self._load_data(collection), query)
+    
+    def explain(self, collection: str, query: Dict[str, Any],
+                data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Return the plan search_records would use for a query"""
+        index = self._current_index(collection, data)
+        if index is None or not query:
+            return {'strategy': 'scan', 'indexed': [], 'residual': list(query)}
+        return index.plan(query)
\ No newline at end of file
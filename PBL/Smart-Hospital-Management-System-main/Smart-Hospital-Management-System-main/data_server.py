@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from data_manager import DataManager
+
+DEFAULT_PORT = 8765
+SOCKET_NAME = 'hospital.sock'
+TOKEN_NAME = 'hospital.token'
+# Longest protocol line (one JSON message); whole collections go in one line
+LINE_LIMIT = 256 * 1024 * 1024
+
+# DataManager methods served, and for writes the collection they change
+READ_METHODS = {
+    'authenticate_user', 'get_users', 'get_patients', 'get_appointments', 'get_medicines',
+    'get_lab_reports', 'get_bills', 'get_prescriptions', 'get_audit_logs',
+    'search_records', 'explain', 'cache_stats',
+}
+WRITE_METHODS = {
+    'create_user': 'users',
+    'update_user': 'users',
+    'add_patient': 'patients',
+    'update_patient': 'patients',
+    'create_appointment': 'appointments',
+    'add_medicine': 'medicines',
+    'update_medicine_stock': 'medicines',
+    'create_lab_report': 'lab_reports',
+    'create_bill': 'bills',
+    'create_prescription': 'prescriptions',
+    'create_index': None,
+}
+
+
+def default_socket(data_dir: str) -> Optional[str]:
+    """Unix socket path of a data folder's server, None where there are none"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    return os.path.join(os.path.abspath(data_dir), SOCKET_NAME)
+
+
+def token_path(data_dir: str) -> str:
+    """File a TCP server keeps its access token in"""
+    return os.path.join(os.path.abspath(data_dir), TOKEN_NAME)
+
+
+def read_token(data_dir: str) -> str:
+    """Access token of the TCP server serving a data folder"""
+    with open(token_path(data_dir)) as f:
+        return f.read().strip()
+
+
+def _write_token(path: str, token: str) -> None:
+    # Readable by the server's user only, like the Unix socket
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        os.chmod(path, 0o600)  # in case the file was left behind with another mode
+        f.write(token)
+
+
+class DataServer:
+    """Serves one DataManager to local clients over asyncio streams.
+
+    The protocol is one JSON object per line. A request is
+    {"id": n, "method": name, "args": [...], "kwargs": {...}} and gets
+    {"id": n, "result": ...} or {"id": n, "error": {"type", "message"}}.
+    {"id": n, "method": "subscribe", "args": [collections or null]} makes
+    the server push {"event": "changed", "collection", "method",
+    "record_id"} after every successful write to those collections.
+
+    Only local users may connect: the Unix socket is made 0600 before it
+    accepts anything, and a TCP server is given a token, which every
+    connection must first send as {"id": n, "method": "auth", "args":
+    [token]}; anything else is refused and the connection closed.
+
+    All DataManager calls run one at a time on a single worker thread, so
+    writes are serialized and reads come from the storage's in-memory
+    records. Results are encoded on that thread too, before the next write
+    can touch the records they share with the storage.
+    """
+
+    def __init__(self, data_manager: DataManager, token: Optional[str] = None):
+        self.data_manager = data_manager
+        self.token = token
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='data-server')
+        # writer -> collections it wants to hear about (None: all)
+        self._subscribers: Dict[asyncio.StreamWriter, Optional[Set[str]]] = {}
+        # Open connections and the tasks serving them
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, path: Optional[str] = None, host: str = '127.0.0.1',
+                    port: int = DEFAULT_PORT) -> None:
+        """Listen on a Unix socket when path is given, else on host:port"""
+        if path:
+            if os.path.exists(path):
+                os.remove(path)  # left behind by a server that did not shut down
+            # Bound and restricted to our user before listen(), so no one
+            # else can connect in between
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(path)
+            os.chmod(path, 0o600)
+            self._server = await asyncio.start_unix_server(self._client, sock=sock, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._client, host, port, limit=LINE_LIMIT)
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Hang up on connected clients and let their handlers finish
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(self._worker, self.data_manager.close)
+        self._worker.shutdown()
+
+    # ---- connections ----
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            if self.token is not None and not await self._authenticate(reader, writer):
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                reply = await self._handle(writer, request)
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _authenticate(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> bool:
+        try:
+            request = json.loads(await reader.readline())
+            request_id, method, args = request.get('id'), request.get('method'), request.get('args')
+        except (ValueError, AttributeError):
+            return False
+        if method == 'auth' and args and isinstance(args[0], str) \
+                and hmac.compare_digest(args[0], self.token):
+            writer.write(_encode({'id': request_id, 'result': True}))
+            await writer.drain()
+            return True
+        writer.write(_error(request_id, PermissionError("Authentication required")))
+        await writer.drain()
+        return False
+
+    async def _handle(self, writer: asyncio.StreamWriter, request: Dict[str, Any]) -> bytes:
+        request_id = request.get('id')
+        method = request.get('method')
+        args = request.get('args') or []
+        kwargs = request.get('kwargs') or {}
+        if method == 'subscribe':
+            collections = args[0] if args else None
+            self._subscribers[writer] = set(collections) if collections else None
+            return _encode({'id': request_id, 'result': True})
+        if method not in READ_METHODS and method not in WRITE_METHODS:
+            return _error(request_id, ValueError(f"Unknown method: {method}"))
+
+        loop = asyncio.get_running_loop()
+        reply, changed = await loop.run_in_executor(
+            self._worker, self._call, request_id, method, args, kwargs)
+        if changed is not None:
+            self._publish(changed)
+        return reply
+
+    def _call(self, request_id: Any, method: str, args: List[Any],
+              kwargs: Dict[str, Any]) -> tuple:
+        """Run one DataManager call (worker thread); returns the encoded reply
+        and, for a successful write, the change to announce"""
+        try:
+            result = getattr(self.data_manager, method)(*args, **kwargs)
+            if method == 'get_audit_logs':
+                result = list(result)
+            reply = _encode({'id': request_id, 'result': result})
+        except Exception as e:
+            return _error(request_id, e), None
+        collection = WRITE_METHODS.get(method)
+        if collection is None:
+            return reply, None
+        record_id = result.get('id') if isinstance(result, dict) else None
+        return reply, {'event': 'changed', 'collection': collection,
+                       'method': method, 'record_id': record_id}
+
+    def _publish(self, change: Dict[str, Any]) -> None:
+        message = _encode(change)
+        for writer, collections in list(self._subscribers.items()):
+            if collections is not None and change['collection'] not in collections:
+                continue
+            if writer.is_closing():
+                self._subscribers.pop(writer, None)
+                continue
+            writer.write(message)
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, default=str) + '\n').encode('utf-8')
+
+
+def _error(request_id: Any, error: Exception) -> bytes:
+    return _encode({'id': request_id,
+                    'error': {'type': type(error).__name__, 'message': str(error)}})
+
+
+async def serve(data_dir: str, storage: str = 'json', path: Optional[str] = None,
+                host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> None:
+    # TCP cannot be restricted to one user, so TCP clients need a token
+    token = None if path else secrets.token_hex(16)
+    server = DataServer(DataManager(data_dir, storage=storage), token)
+    await server.start(path, host, port)
+    if token is not None:
+        _write_token(token_path(data_dir), token)
+        print(f"Serving {os.path.abspath(data_dir)} on {host}:{port}, "
+              f"token in {token_path(data_dir)}")
+    else:
+        print(f"Serving {os.path.abspath(data_dir)} on {path}")
+    # Stop cleanly on Ctrl+C / kill, so buffered audit entries are flushed
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+    try:
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+        if path and os.path.exists(path):
+            os.remove(path)
+        if token is not None and os.path.exists(token_path(data_dir)):
+            os.remove(token_path(data_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve a data folder to the hospital clients on this machine')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--storage', choices=['json', 'journal', 'sqlite'], default='json')
+    parser.add_argument('--socket', help=f'Unix socket path (default: <data-dir>/{SOCKET_NAME})')
+    parser.add_argument('--tcp', action='store_true',
+                        help=f'listen on localhost TCP instead; clients need <data-dir>/{TOKEN_NAME}')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    path = None if args.tcp else (args.socket or default_socket(args.data_dir))
+    try:
+        asyncio.run(serve(args.data_dir, args.storage, path, port=args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
+
+from record_cache import RecordCache
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+ALL_DAYS = (1 << 7) - 1
+
+
+def parse_timing(timing: str) -> Optional[Tuple[int, int]]:
+    """'09:00 AM - 05:00 PM' -> (540, 1020), None if it cannot be read"""
+    try:
+        start_str, end_str = (part.strip() for part in timing.split('-'))
+        start = datetime.strptime(start_str, '%I:%M %p')
+        end = datetime.strptime(end_str, '%I:%M %p')
+    except (ValueError, AttributeError):
+        return None
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def weekday_mask(days: Sequence[str]) -> int:
+    """Bit i set for each weekday() i named in days; no days means every day"""
+    if not days:
+        return ALL_DAYS
+    mask = 0
+    for day in days:
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+
+class AvailabilityTable:
+    """Doctor availability from doctors.json, parsed once.
+
+    Each doctor's ``{'days': [...], 'timing': '09:00 AM - 05:00 PM'}`` is
+    reduced to (weekday bitmask, start minute, end minute). The file is
+    re-read only when its modification time or size changes.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._raw: Dict[Any, Dict[str, Any]] = {}
+        # doctor id -> (weekday mask, start minute or None, end minute or None)
+        self._windows: Dict[Any, Tuple[int, Optional[int], Optional[int]]] = {}
+
+    def _refresh(self) -> None:
+        signature = RecordCache.signature(self.path)
+        if signature == self._signature and signature is not None:
+            return
+        raw, windows = {}, {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            doctors = data.get('doctors', []) if isinstance(data, dict) else data
+        except (OSError, ValueError):
+            doctors = []
+        for doctor in doctors:
+            availability = doctor.get('availability')
+            if 'id' not in doctor or not isinstance(availability, dict):
+                continue
+            raw[doctor['id']] = availability
+            start, end = parse_timing(availability.get('timing', '')) or (None, None)
+            windows[doctor['id']] = (weekday_mask(availability.get('days', [])), start, end)
+        self._raw, self._windows, self._signature = raw, windows, signature
+
+    def _current(self) -> Dict[Any, Tuple[int, Optional[int], Optional[int]]]:
+        with self._lock:
+            self._refresh()
+            return self._windows
+
+    def get(self, doctor_id: Any) -> Optional[Dict[str, Any]]:
+        """The availability dict of a doctor ('D1' or 'D1 - Name'), or None"""
+        with self._lock:
+            self._refresh()
+            return self._raw.get(_doctor_key(doctor_id))
+
+    def window(self, doctor_id: Any) -> Optional[Tuple[int, Optional[int], Optional[int]]]:
+        return self._current().get(_doctor_key(doctor_id))
+
+    def is_available(self, doctor_ids: Sequence[Any], datetimes: Sequence[datetime],
+                     durations: Sequence[int]) -> List[bool]:
+        """For each (doctor, start, duration in minutes) triple, whether the
+        appointment fits the doctor's days and hours.
+
+        Doctors without availability, and timings that cannot be read, are
+        allowed (the day must still match), as in the booking dialog.
+        """
+        windows = self._current()
+        results = []
+        for doctor_id, start, duration in zip(doctor_ids, datetimes, durations):
+            window = windows.get(_doctor_key(doctor_id))
+            if window is None:
+                results.append(True)
+                continue
+            days, first, last = window
+            if not days >> start.weekday() & 1:
+                results.append(False)
+            elif first is None:
+                results.append(True)
+            else:
+                minute = start.hour * 60 + start.minute
+                results.append(first <= minute and minute + duration <= last)
+        return results
+
+    def is_within(self, doctor_id: Any, start: datetime, duration: int) -> bool:
+        return self.is_available([doctor_id], [start], [duration])[0]
+
+
+def _doctor_key(doctor_id: Any) -> Any:
+    # Booking forms pass combobox values like 'D001 - Dr. Smith'
+    if isinstance(doctor_id, str):
+        return doctor_id.split(' - ')[0]
+    return doctor_id
@@ -0,0 +1,474 @@
+import io
+import os
+import threading
+import tkinter as tk
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+from qr_service import qr_codes
+
+# ==================== TEMPLATES ====================
+# The builders run in the worker processes. reportlab is imported and the
+# stylesheet built once per worker (see preload), not once per document.
+
+_styles = None
+
+
+def stylesheet():
+    """The sample stylesheet plus the paragraph styles the documents use"""
+    global _styles
+    if _styles is None:
+        from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
+        styles.add(ParagraphStyle(name='Right', alignment=TA_RIGHT))
+        styles.add(ParagraphStyle(name='CustomTitle', parent=styles['Title'],
+                                  fontSize=24, spaceAfter=30))
+        _styles = styles
+    return _styles
+
+
+def preload() -> None:
+    """Worker initializer: import reportlab and build the stylesheet up front"""
+    try:
+        stylesheet()
+        import reportlab.platypus  # noqa: F401
+    except ImportError as e:
+        print(f"reportlab not available: {e}")
+
+
+def page(filename, margin: int = 72):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+    return SimpleDocTemplate(filename, pagesize=letter, rightMargin=margin, leftMargin=margin,
+                             topMargin=margin, bottomMargin=margin)
+
+
+def lab_report_pdf(filename: str, report: Dict[str, Any]) -> None:
+    """Laboratory test report"""
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    
+    styles = stylesheet()
+    story = [Paragraph("LABORATORY TEST REPORT", styles['Center']), Spacer(1, 20)]
+    
+    # Report info
+    info_data = [
+        ['Report ID:', report['id']],
+        ['Date:', report['date']],
+        ['Patient ID:', report['patient_id']],
+        ['Patient Name:', report['patient_name']],
+        ['Test Type:', report['test']]
+    ]
+
+    info_table = Table(info_data, colWidths=[100, 400])
+    info_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    story.append(info_table)
+    story.append(Spacer(1, 20))
+
+    # Parameters
+    story.append(Paragraph("Test Parameters", styles['Heading2']))
+    story.append(Spacer(1, 10))
+
+    if report['parameters']:
+        param_data = [['Parameter', 'Value', 'Unit', 'Reference Range']]
+        for param in report['parameters']:
+            param_data.append([
+                param['name'],
+                param['value'],
+                param['unit'],
+                param['reference']
+            ])
+
+        param_table = Table(param_data, colWidths=[150, 150, 100, 100])
+        param_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+        story.append(param_table)
+    else:
+        story.append(Paragraph("No parameters recorded", styles['Normal']))
+
+    story.append(Spacer(1, 20))
+
+    # Result
+    story.append(Paragraph("Result Summary", styles['Heading2']))
+    story.append(Spacer(1, 10))
+    story.append(Paragraph(report['result'], styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Remarks
+    if report['remarks']:
+        story.append(Paragraph("Remarks/Interpretation", styles['Heading2']))
+        story.append(Spacer(1, 10))
+        story.append(Paragraph(report['remarks'], styles['Normal']))
+
+    page(filename).build(story)
+
+
+def verification_qr(bill: Dict[str, Any]):
+    """The hospital's own QR image (data/user_qr.*) or a generated one"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ('user_qr.png', 'user_qr.jpg', 'user_qr.jpeg'):
+        path = os.path.join(base_dir, 'data', name)
+        if os.path.exists(path):
+            return path
+    # From the shared QR cache, as bytes, so parallel workers never share a temp file
+    return io.BytesIO(qr_codes.png(verification_payload(bill)))
+
+
+def verification_payload(bill: Dict[str, Any]) -> str:
+    return f"BILL:{bill['bill_no']}|AMOUNT:{bill['total']}|DATE:{bill['date']}|STATUS:{bill['status']}"
+
+
+def bill_story(bill: Dict[str, Any]) -> list:
+    """Flowables of one invoice: patient, services, payment details and a
+    verification QR"""
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, Image
+    
+    styles = stylesheet()
+    story = [Paragraph("SMART HOSPITAL", styles['Center']), Spacer(1, 12)]
+    
+    # Hospital address
+    address = """123 Medical Center Drive<br/>
+                City, State 12345<br/>
+                Phone: (555) 123-4567<br/>
+                Email: info@smarthospital.com"""
+    story.append(Paragraph(address, styles['Center']))
+    story.append(Spacer(1, 20))
+
+    # Invoice details
+    invoice_info = [
+        ['INVOICE', f"#{bill['bill_no']}"],
+        ['Date', bill['date']],
+        ['Status', bill['status']],
+    ]
+    t = Table(invoice_info, colWidths=[100, 150])
+    t.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Patient information
+    patient_info = [
+        ['Patient Information'],
+        ['Name:', bill['patient_name']],
+        ['ID:', bill['patient_id']],
+    ]
+    t = Table(patient_info, colWidths=[100, 300])
+    t.setStyle(TableStyle([
+        ('SPAN', (0, 0), (1, 0)),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BACKGROUND', (0, 0), (1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (1, 0), colors.white),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Services
+    services_data = [['Services Description']]
+    services = bill['services'].split('\n')
+    for service in services:
+        services_data.append([service])
+
+    t = Table(services_data, colWidths=[400])
+    t.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Payment details
+    payment_info = [
+        ['Payment Information'],
+        ['Method:', bill['payment_method']],
+    ]
+
+    # Add payment-specific details
+    if bill['payment_method'] == 'Credit Card' or bill['payment_method'] == 'Debit Card':
+        if 'card_details' in bill:
+            payment_info.extend([
+                ['Card Number:', f"XXXX-XXXX-XXXX-{bill['card_details']['number'][-4:]}"],
+                ['Card Holder:', bill['card_details']['holder']],
+            ])
+    elif bill['payment_method'] == 'Insurance':
+        if 'insurance_details' in bill:
+            payment_info.extend([
+                ['Provider:', bill['insurance_details']['provider']],
+                ['Policy Number:', bill['insurance_details']['policy']],
+                ['Claim Status:', bill['insurance_details']['status']],
+            ])
+    elif bill['payment_method'] == 'Online Payment':
+        payment_info.extend([
+            ['Transaction ID:', bill.get('transaction_id', 'Pending')],
+            ['Payment Status:', bill.get('payment_status', 'Pending')],
+        ])
+
+    t = Table(payment_info, colWidths=[100, 300])
+    t.setStyle(TableStyle([
+        ('SPAN', (0, 0), (1, 0)),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BACKGROUND', (0, 0), (1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (1, 0), colors.white),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Amounts
+    amounts_data = [
+        ['', 'Amount'],
+        ['Subtotal:', f"${bill['subtotal']:.2f}"],
+        ['Tax (10%):', f"${bill['tax']:.2f}"],
+        ['Total:', f"${bill['total']:.2f}"],
+    ]
+    t = Table(amounts_data, colWidths=[200, 100])
+    t.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, -1), (1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('LINEBELOW', (0, -2), (1, -2), 1, colors.black),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 30))
+
+    img = Image(verification_qr(bill))
+    img.drawHeight = 1.2*inch
+    img.drawWidth = 1.2*inch
+    
+    qr_table = Table([[img], ['Scan for verification']], colWidths=[1.5*inch])
+    qr_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (0, 1), 8),
+    ]))
+    story.append(qr_table)
+    return story
+
+
+def bill_pdf(filename, bill: Dict[str, Any]) -> None:
+    """Invoice PDF (filename may also be a binary file object)"""
+    page(filename).build(bill_story(bill))
+
+
+def bill_summary_pdf(filename: str, bill: Dict[str, Any]) -> None:
+    """One-table bill printout (BillingModule.print_bill)"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+    
+    details = [
+        ["Bill No:", bill['bill_no']],
+        ["Date:", bill['date']],
+        ["Patient ID:", bill['patient_id']],
+        ["Patient Name:", bill['patient_name']],
+        ["Services:", bill['services']],
+        ["Subtotal:", f"${bill['subtotal']:.2f}"],
+        ["Tax:", f"${bill['tax']:.2f}"],
+        ["Total:", f"${bill['total']:.2f}"],
+        ["Status:", bill['status']],
+        ["Payment Method:", bill.get('payment_method', 'N/A')]
+    ]
+    table = Table(details, colWidths=[100, 400])
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey),
+        ('PADDING', (0, 0), (-1, -1), 6),
+    ]))
+    SimpleDocTemplate(filename, pagesize=letter).build(
+        [Paragraph("Hospital Bill", stylesheet()['CustomTitle']), table])
+
+
+DOCUMENTS: Dict[str, Callable[[str, Dict[str, Any]], None]] = {
+    'lab_report': lab_report_pdf,
+    'bill': bill_pdf,
+    'bill_summary': bill_summary_pdf
+}
+
+
+def build(kind: str, filename: str, data: Dict[str, Any]) -> str:
+    """Write one document (in a worker); returns its file name"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    DOCUMENTS[kind](filename, data)
+    return filename
+
+
+# ==================== QUEUE ====================
+
+class DocumentJob:
+    """Handle of one queued document"""
+
+    def __init__(self, kind: str, filename: str, future: Future):
+        self.kind = kind
+        self.filename = filename
+        self.future = future
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """The file name once written (raises what the builder raised)"""
+        return self.future.result(timeout)
+
+    def exception(self) -> Optional[BaseException]:
+        return self.future.exception() if self.future.done() else None
+
+
+class DocumentBatch:
+    """Handle of a group of documents queued together"""
+
+    def __init__(self, jobs: List[DocumentJob]):
+        self.jobs = jobs
+
+    def done(self) -> bool:
+        return all(job.done() for job in self.jobs)
+
+    def finished(self) -> int:
+        return sum(1 for job in self.jobs if job.done())
+
+    def failed(self) -> List[DocumentJob]:
+        return [job for job in self.jobs if job.exception() is not None]
+
+    def files(self) -> List[str]:
+        return [job.filename for job in self.jobs if job.done() and job.exception() is None]
+
+
+class DocumentQueue:
+    """PDF jobs for bills and lab reports, written by a process pool.
+
+    submit() and batch() return at once with a handle. Workers are started
+    with preload(), so reportlab and the stylesheet are ready before the
+    first job arrives. Completion callbacks get the handle; pass ``widget``
+    to have them called on the Tk thread (polled with after), otherwise
+    they run on the pool's result thread. A failed job without a callback
+    is reported with print().
+    """
+
+    def __init__(self, workers: int = 2, executor: Optional[Executor] = None, poll: int = 100):
+        self.workers = workers
+        self.poll = poll
+        self._executor = executor
+        self._lock = threading.Lock()
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=preload)
+            except (OSError, NotImplementedError, ImportError):
+                self._executor = ThreadPoolExecutor(max_workers=1, initializer=preload)
+        return self._executor
+
+    def _submit(self, kind: str, filename: str, data: Dict[str, Any]) -> DocumentJob:
+        if kind not in DOCUMENTS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        with self._lock:
+            try:
+                future = self._pool().submit(build, kind, filename, data)
+            except RuntimeError:
+                # The process pool broke (a worker died); fall back to a thread
+                self._executor = ThreadPoolExecutor(max_workers=1, initializer=preload)
+                future = self._executor.submit(build, kind, filename, data)
+        return DocumentJob(kind, filename, future)
+
+    def submit(self, kind: str, filename: str, data: Dict[str, Any],
+               callback: Optional[Callable[[DocumentJob], None]] = None,
+               widget: Optional[tk.Misc] = None) -> DocumentJob:
+        """Queue one document (a key of DOCUMENTS) to be written to filename"""
+        job = self._submit(kind, filename, data)
+        self._notify(job, [job], callback, widget)
+        return job
+
+    def batch(self, kind: str, items: Iterable[Tuple[str, Dict[str, Any]]],
+              callback: Optional[Callable[[DocumentBatch], None]] = None,
+              widget: Optional[tk.Misc] = None) -> DocumentBatch:
+        """Queue (filename, data) pairs; callback runs once all are written"""
+        batch = DocumentBatch([self._submit(kind, filename, data) for filename, data in items])
+        self._notify(batch, batch.jobs, callback, widget)
+        return batch
+
+    def _notify(self, handle, jobs: List[DocumentJob], callback, widget) -> None:
+        def finish() -> None:
+            if callback is not None:
+                callback(handle)
+                return
+            for job in jobs:
+                if job.exception() is not None:
+                    print(f"Document generation failed ({job.filename}): {job.exception()}")
+
+        if widget is not None:
+            def poll() -> None:
+                if not all(job.done() for job in jobs):
+                    try:
+                        widget.after(self.poll, poll)
+                    except tk.TclError:
+                        pass  # the window was closed meanwhile
+                    return
+                finish()
+
+            poll()
+            return
+        if not jobs:
+            finish()
+            return
+        remaining = [len(jobs)]
+
+        def one_done(_) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                finish()
+
+        for job in jobs:
+            job.future.add_done_callback(one_done)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+# Shared by every screen
+documents = DocumentQueue()
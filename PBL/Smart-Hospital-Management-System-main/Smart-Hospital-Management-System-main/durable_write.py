@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+import shutil
+import stat
+from typing import Any, Callable, IO, Iterable, Sequence, Tuple
+
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+
+def _fsync_dir(directory: str) -> None:
+    """Persist a rename: fsync the directory entry (POSIX only)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _create_temp(path: str) -> Tuple[int, str]:
+    """Create a new, uniquely named temp file next to path.
+
+    Unlike mkstemp (always 0o600) it is created with mode 0o666, which the
+    process umask narrows the way it would for the file itself.
+    """
+    directory, name = os.path.split(path)
+    while True:
+        temp = os.path.join(directory, f'.{name}.{os.getpid()}.{os.urandom(4).hex()}.tmp')
+        try:
+            return os.open(temp, _TEMP_FLAGS, 0o666), temp
+        except FileExistsError:
+            continue
+
+
+def _keep_backup(path: str) -> None:
+    """Keep the current file as <path>.bak (a hard link where possible)"""
+    backup = path + '.bak'
+    temp = backup + '.tmp'
+    try:
+        if os.path.exists(temp):
+            os.remove(temp)
+        os.link(path, temp)
+    except OSError:
+        shutil.copy2(path, temp)
+    os.replace(temp, backup)
+
+
+def atomic_write(path: str, write: Callable[[IO], None], mode: str = 'w',
+                 encoding: str = 'utf-8', newline: Any = None,
+                 backup: bool = False, fsync: bool = True) -> None:
+    """Replace ``path`` with what ``write(file)`` writes, all or nothing.
+
+    The data goes to a temp file in the same directory, is flushed and
+    fsynced, and is then renamed over the target, so a crash leaves either
+    the old or the new file, never a truncated one. With ``backup`` the
+    previous version is kept as ``<path>.bak``. ``fsync=False`` skips the
+    syncs (still atomic, not durable across power loss).
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    fd, temp = _create_temp(path)
+    try:
+        if 'b' in mode:
+            f = os.fdopen(fd, mode)
+        else:
+            f = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+        with f:
+            write(f)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        try:
+            os.chmod(temp, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass  # a new file keeps the umask's mode
+        if backup and os.path.exists(path):
+            _keep_backup(path)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(directory)
+
+
+def write_json(path: str, data: Any, indent: int = 4, **options) -> None:
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent), **options)
+
+
+def write_csv(path: str, fieldnames: Sequence[str], rows: Iterable[dict], **options) -> None:
+    def write(f):
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    atomic_write(path, write, newline='', **options)
@@ -0,0 +1,145 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Set, Union
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _lock_file(f) -> None:
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # retries for ~10s, then raises
+                return
+            except OSError:
+                continue
+
+    def _try_lock_file(f) -> bool:
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_file(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f) -> None:
+        # POSIX record locks also work on NFS shares, unlike flock on some systems
+        fcntl.lockf(f.fileno(), fcntl.LOCK_EX)
+
+    def _try_lock_file(f) -> bool:
+        try:
+            fcntl.lockf(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:  # EACCES or EAGAIN: another process holds it
+            return False
+
+    def _unlock_file(f) -> None:
+        fcntl.lockf(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by processes and threads.
+
+    Use it as a context manager around a read-modify-write cycle. The lock
+    is reentrant within a thread, so a locked method may call another one.
+    Get instances through file_lock() - POSIX record locks belong to the
+    process, so two FileLock objects on one path would not exclude each
+    other within a process.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'a+')
+                _lock_file(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class OwnerLock:
+    """Exclusive lock that one object holds for its whole lifetime.
+
+    acquire() does not wait: it raises RuntimeError if another process, or
+    another OwnerLock in this process, holds the path. Unlike FileLock it
+    is not reentrant and not tied to a thread, so any thread may release
+    it (e.g. from a close() method).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._key = os.path.realpath(path)
+        self._file = None
+
+    def acquire(self) -> None:
+        with _registry_lock:
+            # POSIX record locks do not exclude the process that holds them
+            if self._key in _owned:
+                raise RuntimeError(f"{self.path} is already locked by this process")
+            f = open(self.path, 'a+')
+            if not _try_lock_file(f):
+                f.close()
+                raise RuntimeError(f"{self.path} is locked by another process")
+            _owned.add(self._key)
+            self._file = f
+
+    def release(self) -> None:
+        with _registry_lock:
+            if self._file is None:
+                return
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+                _owned.discard(self._key)
+
+
+_locks: Dict[str, FileLock] = {}
+_owned: Set[str] = set()
+_registry_lock = threading.Lock()
+
+
+def file_lock(path: Union[str, Path]) -> FileLock:
+    """The process-wide FileLock for a path"""
+    key = os.path.realpath(path)
+    with _registry_lock:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(path)
+        return lock
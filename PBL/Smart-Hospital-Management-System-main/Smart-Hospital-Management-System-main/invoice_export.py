@@ -0,0 +1,191 @@
+import argparse
+import io
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from document_queue import bill_story, page, preload, verification_payload
+from durable_write import atomic_write
+from qr_service import qr_codes
+from revenue_rollup import bill_day, bill_method
+
+Bill = Dict[str, Any]
+
+
+def bill_filter(start: Optional[str] = None, end: Optional[str] = None,
+                status: Optional[str] = None, method: Optional[str] = None) -> Callable[[Bill], bool]:
+    """Predicate for bills dated in [start, end] ('YYYY-MM-DD') with this
+    status and payment method; None leaves that condition out"""
+    def matches(bill: Bill) -> bool:
+        day = bill_day(bill)
+        if start and (day is None or day < start):
+            return False
+        if end and (day is None or day > end):
+            return False
+        if status and bill.get('status') != status:
+            return False
+        if method and bill_method(bill) != method:
+            return False
+        return True
+    return matches
+
+
+# ==================== WORKERS ====================
+
+def render_bill(bill: Bill) -> bytes:
+    """One invoice as PDF bytes (the same document as the billing screen's)"""
+    buffer = io.BytesIO()
+    page(buffer).build(bill_story(bill))
+    return buffer.getvalue()
+
+
+def render_bills(bills: List[Bill]) -> bytes:
+    """Several invoices as one PDF, each starting on a new page"""
+    from reportlab.platypus import PageBreak
+    story = []
+    for bill in bills:
+        if story:
+            story.append(PageBreak())
+        story.extend(bill_story(bill))
+    buffer = io.BytesIO()
+    page(buffer).build(story)
+    return buffer.getvalue()
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pool(workers: int) -> Executor:
+    try:
+        return ProcessPoolExecutor(max_workers=workers, initializer=preload)
+    except (OSError, NotImplementedError, ImportError):
+        return ThreadPoolExecutor(max_workers=1, initializer=preload)
+
+
+def _ordered(executor: Executor, render: Callable, items: Iterable[Any],
+             window: int) -> Iterator[Tuple[Any, bytes]]:
+    """(item, render(item)) in input order, rendered on the executor with at
+    most ``window`` results pending, so memory does not grow with the input"""
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(render, item)))
+        if len(pending) >= window:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+# ==================== EXPORTS ====================
+
+def export_zip(bills: Iterable[Bill], path: str, workers: int = 2,
+               window: Optional[int] = None,
+               progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write one invoice PDF per bill (bill_<no>.pdf) into a zip at path.
+    Bills are consumed lazily and each PDF goes into the archive as soon
+    as it is rendered, so memory stays at about ``window`` invoices however
+    many are exported; returns how many were written."""
+    executor = _pool(workers)
+    count = 0
+    try:
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for bill, pdf in _ordered(executor, render_bill, bills, window or workers * 2):
+                count += 1
+                archive.writestr(f"bill_{bill.get('bill_no', count)}.pdf", pdf)
+                if progress:
+                    progress(count)
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return count
+
+
+def export_pdf(bills: Iterable[Bill], path: str, workers: int = 2, chunk: int = 25,
+               window: Optional[int] = None,
+               progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write all invoices into one multi-page PDF at path.
+
+    Chunks of ``chunk`` bills are rendered in parallel and appended in
+    order as they arrive. Unlike export_zip, memory grows with the export:
+    pypdf keeps every merged page (a few KB per invoice) until the file is
+    written, so very large exports are better done as a zip. Needs pypdf.
+    """
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ValueError("Merging invoices into one PDF needs pypdf (pip install pypdf); "
+                         "export a zip instead")
+    writer = PdfWriter()
+    executor = _pool(workers)
+    count = 0
+    try:
+        for group, pdf in _ordered(executor, render_bills, chunked(bills, chunk),
+                                   window or workers * 2):
+            writer.append(io.BytesIO(pdf))
+            count += len(group)
+            if progress:
+                progress(count)
+    finally:
+        executor.shutdown(cancel_futures=True)
+    atomic_write(path, writer.write, mode='wb')
+    return count
+
+
+def load_bills(data_dir: str, storage: str = 'json') -> List[Bill]:
+    """Bills of a data folder (billing.json, or the billing table of hospital.db)"""
+    if storage == 'sqlite':
+        from sqlite_backend import SQLiteDataManager
+        return SQLiteDataManager(data_dir).get_bills()
+    path = Path(data_dir) / 'billing.json'
+    if not path.exists():
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export the invoices of matching bills as one PDF or a zip of PDFs')
+    parser.add_argument('output', help='.pdf for one multi-page file, .zip for one PDF per bill')
+    parser.add_argument('--data-dir', default=os.path.join('~', 'hospital_data'))
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--from', dest='start', help='first bill date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', help='last bill date (YYYY-MM-DD)')
+    parser.add_argument('--today', action='store_true', help='only bills dated today')
+    parser.add_argument('--status', help="e.g. 'Paid'")
+    parser.add_argument('--method', help="payment method, e.g. 'Cash'")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    start, end = args.start, args.end
+    if args.today:
+        from datetime import date
+        start = end = date.today().isoformat()
+    matches = bill_filter(start, end, args.status, args.method)
+    bills = [bill for bill in load_bills(os.path.expanduser(args.data_dir), args.storage)
+             if matches(bill)]
+    # QR codes first, in parallel, so the invoice workers find them cached
+    qr_codes.prerender((verification_payload(bill) for bill in bills), workers=args.workers)
+
+    export = export_zip if args.output.lower().endswith('.zip') else export_pdf
+    try:
+        count = export(bills, args.output, workers=args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{args.output}: {count} invoice(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,42 @@
+import sys
+from startup_profile import StartupProfile
+
+# Started before the other imports so --profile-startup can time them.
+# matplotlib, reportlab, qrcode and PIL are not imported here: the modules
+# that use them import them when they are opened.
+startup = StartupProfile()
+if '--profile-startup' in sys.argv:
+    startup.install()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkinter import font as tkfont
 import json
 import csv
 import os
+import argparse
+import threading
 from datetime import datetime, timedelta
 import random
 import string
 from collections import deque
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import qrcode
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from date_picker import DatePicker
 from notification_manager import NotificationManager
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-import seaborn as sns
-from analytics_manager import AnalyticsManager
 from billing_module import BillingModule
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import qrcode
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from sqlite_backend import SQLiteDataManager
+from appointment_index import AppointmentSlotIndex, duration_to_minutes
+from slot_finder import SlotFinder
+from doctor_availability import AvailabilityTable
+from tree_binder import TreeBinder
+from virtual_rows import VirtualRows
+from search_controller import SearchController
+from trigram_index import TrigramIndex
+from dashboard_stats import DashboardStats
+from revenue_rollup import RevenueRollup
+from chart_service import charts
+from document_queue import documents
+from durable_write import write_json
+from file_lock import file_lock
+from record_version import StaleRecordError, check_version
 
 # ==================== DATA STRUCTURES ====================
 
@@ -88,14 +88,53 @@ class Queue:
     def size(self):
         return len(self.items)
 
+class HashIndex:
+    """Hash Table (primary key -> record) over a collection for O(1) lookups"""
+    def __init__(self, records, key='id'):
+        self.key = key
+        self.records = records
+        self.table = {}
+        for record in records:
+            if record.get(key) is not None:
+                # Keep the first record for a key, like the old linear scans did
+                self.table.setdefault(record[key], record)
+    
+    def get(self, key_value):
+        return self.table.get(key_value)
+    
+    def add(self, record):
+        self.records.append(record)
+        if record.get(self.key) is not None:
+            self.table.setdefault(record[self.key], record)
+    
+    def remove(self, key_value):
+        self.records = [r for r in self.records if r.get(self.key) != key_value]
+        self.table.pop(key_value, None)
+    
+    def size(self):
+        return len(self.records)
+
 # ==================== DATA MANAGER ====================
 
 class DataManager:
-    """Centralized data management with CSV/JSON support"""
-    
-    def __init__(self):
+    """Centralized data management with CSV/JSON support
+
+    Record operations (add/update/delete and add_user) hold the file's
+    lock (see file_lock) across their read-modify-write, so several
+    instances on one data folder do not lose each other's changes. An
+    added record whose ID is missing or already taken (another instance
+    saved first) gets the next free ID under that lock. Every
+    record carries a version, bumped by each update; an edit dialog passes
+    the version it showed as expected_version, and the update (or delete)
+    is refused with StaleRecordError if another instance changed the
+    record since.
+    """
+    
+    def __init__(self, backup=False):
         # Set data directory in the user's home folder
         self.data_dir = os.path.join(os.path.expanduser('~'), 'hospital_data')
+        # Keep the previous version of each data file as <name>.json.bak
+        self.backup = backup
         self.ensure_data_directory()
         
         # Initialize data files
@@ -107,6 +146,53 @@ class DataManager:
         self.billing_file = os.path.join(self.data_dir, "billing.json")
         self.users_file = os.path.join(self.data_dir, "users.json")
         
+        # Prefix of the IDs generate_id hands out per collection file
+        self.id_prefixes = {
+            self.patients_file: 'P',
+            self.doctors_file: 'D',
+            self.appointments_file: 'A',
+            self.pharmacy_file: 'M',
+            self.lab_file: 'L',
+            self.billing_file: 'B'
+        }
+        
+        # Primary-key index per collection file: filepath -> (file signature, HashIndex)
+        self._indexes = {}
+        
+        # Booked-slot interval index, tied to the appointments HashIndex it was built from
+        self._slot_index = None
+        
+        # Fields covered by text search, and the trigram index per collection
+        # file: filepath -> (HashIndex it was built from, TrigramIndex)
+        self.text_fields = {
+            self.patients_file: ('name', 'id', 'contact'),
+            self.doctors_file: ('name', 'id', 'specialization', 'contact'),
+            self.pharmacy_file: ('name', 'id', 'category'),
+            self.lab_file: ('patient_name', 'id', 'test'),
+            self.billing_file: ('bill_no', 'patient_name')
+        }
+        self._text_indexes = {}
+        # Record operations run under _lock and count themselves in _changes,
+        # so a text index built meanwhile on the search worker is not kept
+        self._lock = threading.RLock()
+        self._changes = 0
+        
+        # Running dashboard counters; each collection's part is tied to the
+        # HashIndex it was counted from
+        self.stats = DashboardStats()
+        self._stat_names = {
+            self.patients_file: 'patients',
+            self.doctors_file: 'doctors',
+            self.appointments_file: 'appointments',
+            self.pharmacy_file: 'pharmacy',
+            self.lab_file: 'lab_reports',
+            self.billing_file: 'billing'
+        }
+        
+        # Daily/monthly/payment-method revenue, tied to the billing HashIndex
+        # it was summed from
+        self._revenue = None
+        
         # Initialize default data
         self.initialize_default_data()
         
@@ -214,8 +300,23 @@ class DataManager:
     
     def save_data(self, filepath, data):
         """Save data to JSON file"""
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+        try:
+            # Temp file + fsync + rename: a crash never leaves a truncated file
+            write_json(filepath, data, backup=self.backup)
+        except Exception:
+            self._indexes.pop(filepath, None)
+            raise
+        
+        if filepath == self.users_file:
+            return
+        # Keep the index in step with the file: reuse it when we were handed
+        # its own record list, otherwise rebuild from the saved data
+        cached = self._indexes.get(filepath)
+        if cached is not None and cached[1].records is data:
+            index = cached[1]
+        else:
+            index = HashIndex(list(data), self._primary_key(filepath))
+        self._indexes[filepath] = (self._file_signature(filepath), index)
     
     def load_data(self, filepath):
         """Load data from JSON file"""
@@ -224,147 +325,252 @@ class DataManager:
                 return json.load(f)
         return [] if filepath != self.users_file else {}
     
+    def _file_signature(self, filepath):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        # Files are replaced, never rewritten in place: a new inode marks a new version
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _collection_name(self, filepath):
+        return os.path.splitext(os.path.basename(filepath))[0]
+    
+    def _primary_key(self, filepath):
+        return 'bill_no' if filepath == self.billing_file else 'id'
+    
+    def _collection(self, filepath):
+        """Return the HashIndex for a collection file.
+        Loaded once and re-read only when the file changes on disk."""
+        signature = self._file_signature(filepath)
+        cached = self._indexes.get(filepath)
+        if cached is None or cached[0] != signature:
+            index = HashIndex(self.load_data(filepath), self._primary_key(filepath))
+            cached = (signature, index)
+            self._indexes[filepath] = cached
+        return cached[1]
+    
+    def _add_record(self, filepath, record):
+        record.setdefault('version', 1)
+        key = self._primary_key(filepath)
+        with self._lock, file_lock(filepath + '.lock'):
+            index = self._collection(filepath)
+            # The ID shown in the add dialog was picked from an earlier read
+            if record.get(key) is None or index.get(record[key]) is not None:
+                record[key] = self.generate_id(self.id_prefixes[filepath], index.records, key)
+            index.add(record)
+            self.save_data(filepath, index.records)
+            self._patch_derived(filepath, 'add', record)
+    
+    def _update_record(self, filepath, record_id, updated_data, expected_version=None):
+        """Apply updated_data to one record and bump its version; False if
+        there is no such record. With expected_version, raise
+        StaleRecordError unless the stored record is still at that version."""
+        with self._lock, file_lock(filepath + '.lock'):
+            index = self._collection(filepath)
+            record = index.get(record_id)
+            if record is None:
+                return False
+            version = check_version(self._collection_name(filepath), record_id, record,
+                                    expected_version)
+            record.update(updated_data)
+            record['version'] = version + 1
+            self.save_data(filepath, index.records)
+            self._patch_derived(filepath, 'update', record)
+            return True
+    
+    def _delete_record(self, filepath, record_id, expected_version=None):
+        with self._lock, file_lock(filepath + '.lock'):
+            index = self._collection(filepath)
+            record = index.get(record_id)
+            if record is not None:
+                check_version(self._collection_name(filepath), record_id, record, expected_version)
+            index.remove(record_id)
+            self.save_data(filepath, index.records)
+            self._patch_derived(filepath, 'remove', record_id)
+    
+    def _patch_derived(self, filepath, change, value):
+        """Apply one record change (add/update/remove) to the text index and
+        dashboard counters of a collection, if they were built from it"""
+        self._changes += 1
+        cached = self._indexes.get(filepath)
+        if cached is None:
+            return
+        text = self._text_indexes.get(filepath)
+        if text is not None and text[0] is cached[1]:
+            getattr(text[1], change)(value)
+        name = self._stat_names.get(filepath)
+        if name is not None and self.stats.source(name) is cached[1]:
+            getattr(self.stats, change)(name, value)
+        if filepath == self.billing_file and self._revenue is not None \
+                and self._revenue[0] is cached[1]:
+            getattr(self._revenue[1], change)(value)
+    
+    def text_index(self, filepath):
+        """Trigram index over the text fields of a collection.
+        Built on first use and kept in step by the record operations.
+        The first build does not hold the lock, so the search worker can
+        run it while the Tk thread keeps saving; if a record operation ran
+        meanwhile it is built again, this time under the lock."""
+        with self._lock:
+            collection = self._collection(filepath)
+            cached = self._text_indexes.get(filepath)
+            if cached is not None and cached[0] is collection:
+                return cached[1]
+            built_from, changes = collection, self._changes
+            records = list(collection.records)
+        index = TrigramIndex(self.text_fields[filepath], records, self._primary_key(filepath))
+        with self._lock:
+            collection = self._collection(filepath)
+            cached = self._text_indexes.get(filepath)
+            if cached is not None and cached[0] is collection:
+                return cached[1]
+            if collection is not built_from or self._changes != changes:
+                index = TrigramIndex(self.text_fields[filepath], collection.records,
+                                     self._primary_key(filepath))
+            self._text_indexes[filepath] = (collection, index)
+            return index
+    
+    def search_records(self, filepath, term, prefix=False):
+        """Records with term in one of the collection's text fields"""
+        return self.text_index(filepath).search(term, prefix)
+    
+    def fuzzy_search(self, filepath, term, limit=10, fields=None):
+        """Closest matches for a possibly misspelt term, best first"""
+        return self.text_index(filepath).fuzzy(term, limit, fields=fields)
+    
+    def dashboard_stats(self):
+        """Dashboard counters, recounting only collections changed on disk"""
+        for filepath, name in self._stat_names.items():
+            collection = self._collection(filepath)
+            if self.stats.source(name) is not collection:
+                self.stats.recount(name, collection.records, collection)
+        return self.stats
+    
+    def revenue_rollup(self):
+        """Revenue summed per day, month and payment method.
+        Built on first use and kept in step by add_bill/undo_last_bill."""
+        collection = self._collection(self.billing_file)
+        if self._revenue is None or self._revenue[0] is not collection:
+            rollup = RevenueRollup('bill_no')
+            rollup.recount(collection.records)
+            self._revenue = (collection, rollup)
+        return self._revenue[1]
+    
     # Patient operations
     def get_patients(self):
-        return self.load_data(self.patients_file)
+        return list(self._collection(self.patients_file).records)
     
     def add_patient(self, patient):
-        patients = self.get_patients()
-        patients.append(patient)
-        self.save_data(self.patients_file, patients)
-    
-    def update_patient(self, patient_id, updated_data):
-        patients = self.get_patients()
-        for i, patient in enumerate(patients):
-            if patient['id'] == patient_id:
-                patients[i].update(updated_data)
-                self.save_data(self.patients_file, patients)
-                return True
-        return False
+        self._add_record(self.patients_file, patient)
+    
+    def update_patient(self, patient_id, updated_data, expected_version=None):
+        return self._update_record(self.patients_file, patient_id, updated_data, expected_version)
     
-    def delete_patient(self, patient_id):
-        patients = self.get_patients()
-        patients = [p for p in patients if p['id'] != patient_id]
-        self.save_data(self.patients_file, patients)
+    def delete_patient(self, patient_id, expected_version=None):
+        self._delete_record(self.patients_file, patient_id, expected_version)
     
     def get_patient_by_id(self, patient_id):
-        """Dictionary lookup for O(n) search"""
-        patients = self.get_patients()
-        patient_dict = {p['id']: p for p in patients}
-        return patient_dict.get(patient_id)
+        """Hash index lookup, O(1)"""
+        return self._collection(self.patients_file).get(patient_id)
     
     # Doctor operations
     def get_doctors(self):
-        return self.load_data(self.doctors_file)
+        return list(self._collection(self.doctors_file).records)
     
     def add_doctor(self, doctor):
-        doctors = self.get_doctors()
-        doctors.append(doctor)
-        self.save_data(self.doctors_file, doctors)
-    
-    def update_doctor(self, doctor_id, updated_data):
-        doctors = self.get_doctors()
-        for i, doctor in enumerate(doctors):
-            if doctor['id'] == doctor_id:
-                doctors[i].update(updated_data)
-                self.save_data(self.doctors_file, doctors)
-                return True
-        return False
+        self._add_record(self.doctors_file, doctor)
+    
+    def update_doctor(self, doctor_id, updated_data, expected_version=None):
+        return self._update_record(self.doctors_file, doctor_id, updated_data, expected_version)
     
-    def delete_doctor(self, doctor_id):
-        doctors = self.get_doctors()
-        doctors = [d for d in doctors if d['id'] != doctor_id]
-        self.save_data(self.doctors_file, doctors)
+    def delete_doctor(self, doctor_id, expected_version=None):
+        self._delete_record(self.doctors_file, doctor_id, expected_version)
     
     # Appointment operations
     def get_appointments(self):
-        return self.load_data(self.appointments_file)
+        return list(self._collection(self.appointments_file).records)
     
     def add_appointment(self, appointment):
-        appointments = self.get_appointments()
-        appointments.append(appointment)
-        self.save_data(self.appointments_file, appointments)
+        self._add_record(self.appointments_file, appointment)
         self.appointment_queue.enqueue(appointment)
-    
-    def update_appointment(self, appointment_id, updated_data):
-        appointments = self.get_appointments()
-        for i, appt in enumerate(appointments):
-            if appt['id'] == appointment_id:
-                appointments[i].update(updated_data)
-                self.save_data(self.appointments_file, appointments)
-                return True
-        return False
-    
-    def delete_appointment(self, appointment_id):
-        appointments = self.get_appointments()
-        appointments = [a for a in appointments if a['id'] != appointment_id]
-        self.save_data(self.appointments_file, appointments)
+        slots = self._current_slot_index()
+        if slots is not None:
+            slots.add(appointment)
+    
+    def update_appointment(self, appointment_id, updated_data, expected_version=None):
+        updated = self._update_record(self.appointments_file, appointment_id, updated_data,
+                                      expected_version)
+        slots = self._current_slot_index()
+        if updated and slots is not None:
+            slots.update(self._collection(self.appointments_file).get(appointment_id))
+        return updated
+    
+    def delete_appointment(self, appointment_id, expected_version=None):
+        self._delete_record(self.appointments_file, appointment_id, expected_version)
+        slots = self._current_slot_index()
+        if slots is not None:
+            slots.remove(appointment_id)
+    
+    def appointment_slots(self):
+        """Per-doctor, per-day interval index of booked appointments.
+        Built on first use and kept in step by add/update/delete_appointment."""
+        collection = self._collection(self.appointments_file)
+        if self._slot_index is None or self._slot_index[0] is not collection:
+            self._slot_index = (collection, AppointmentSlotIndex(collection.records))
+        return self._slot_index[1]
+    
+    def _current_slot_index(self):
+        """The slot index if it was built from the current appointments, else None"""
+        cached = self._indexes.get(self.appointments_file)
+        if self._slot_index is None or cached is None or self._slot_index[0] is not cached[1]:
+            return None
+        return self._slot_index[1]
     
     # Pharmacy operations
     def get_medicines(self):
-        return self.load_data(self.pharmacy_file)
+        return list(self._collection(self.pharmacy_file).records)
     
     def add_medicine(self, medicine):
-        medicines = self.get_medicines()
-        medicines.append(medicine)
-        self.save_data(self.pharmacy_file, medicines)
-    
-    def update_medicine(self, medicine_id, updated_data):
-        medicines = self.get_medicines()
-        for i, med in enumerate(medicines):
-            if med['id'] == medicine_id:
-                medicines[i].update(updated_data)
-                self.save_data(self.pharmacy_file, medicines)
-                return True
-        return False
+        self._add_record(self.pharmacy_file, medicine)
+    
+    def update_medicine(self, medicine_id, updated_data, expected_version=None):
+        return self._update_record(self.pharmacy_file, medicine_id, updated_data, expected_version)
     
-    def delete_medicine(self, medicine_id):
-        medicines = self.get_medicines()
-        medicines = [m for m in medicines if m['id'] != medicine_id]
-        self.save_data(self.pharmacy_file, medicines)
+    def delete_medicine(self, medicine_id, expected_version=None):
+        self._delete_record(self.pharmacy_file, medicine_id, expected_version)
     
     # Lab operations
     def get_lab_reports(self):
-        return self.load_data(self.lab_file)
+        return list(self._collection(self.lab_file).records)
     
     def add_lab_report(self, report):
-        reports = self.get_lab_reports()
-        reports.append(report)
-        self.save_data(self.lab_file, reports)
-    
-    def update_lab_report(self, report_id, updated_data):
-        reports = self.get_lab_reports()
-        for i, report in enumerate(reports):
-            if report['id'] == report_id:
-                reports[i].update(updated_data)
-                self.save_data(self.lab_file, reports)
-                return True
-        return False
+        self._add_record(self.lab_file, report)
+    
+    def update_lab_report(self, report_id, updated_data, expected_version=None):
+        return self._update_record(self.lab_file, report_id, updated_data, expected_version)
     
-    def delete_lab_report(self, report_id):
-        reports = self.get_lab_reports()
-        reports = [r for r in reports if r['id'] != report_id]
-        self.save_data(self.lab_file, reports)
+    def delete_lab_report(self, report_id, expected_version=None):
+        self._delete_record(self.lab_file, report_id, expected_version)
     
     # Billing operations
     def get_bills(self):
-        return self.load_data(self.billing_file)
+        return list(self._collection(self.billing_file).records)
+    
+    def update_bill(self, bill_no, updated_data, expected_version=None):
+        return self._update_record(self.billing_file, bill_no, updated_data, expected_version)
     
     def add_bill(self, bill):
-        bills = self.get_bills()
         # Push to undo stack
         self.billing_undo_stack.push(('add', bill))
-        bills.append(bill)
-        self.save_data(self.billing_file, bills)
+        self._add_record(self.billing_file, bill)
     
     def undo_last_bill(self):
         """Undo last billing operation using Stack"""
         if not self.billing_undo_stack.is_empty():
             operation, bill = self.billing_undo_stack.pop()
             if operation == 'add':
-                bills = self.get_bills()
-                bills = [b for b in bills if b['bill_no'] != bill['bill_no']]
-                self.save_data(self.billing_file, bills)
+                self._delete_record(self.billing_file, bill['bill_no'])
                 return True
         return False
     
@@ -399,27 +605,28 @@ class DataManager:
         to remain compatible with the existing simple verifier. If you prefer hashed
         passwords we can migrate to hashed storage (recommended).
         """
-        data = self.load_data(self.users_file)
-        if not isinstance(data, dict):
-            data = {}
-        if username in data:
-            raise ValueError('Username already exists')
-        data[username] = {'password': password, 'role': role, 'name': name}
-        # Merge extra fields
-        for k, v in kwargs.items():
-            data[username][k] = v
-        self.save_data(self.users_file, data)
+        with file_lock(self.users_file + '.lock'):
+            data = self.load_data(self.users_file)
+            if not isinstance(data, dict):
+                data = {}
+            if username in data:
+                raise ValueError('Username already exists')
+            data[username] = {'password': password, 'role': role, 'name': name}
+            # Merge extra fields
+            for k, v in kwargs.items():
+                data[username][k] = v
+            self.save_data(self.users_file, data)
         return {'id': username, **data[username]}
     
-    def generate_id(self, prefix, existing_list):
-        """Generate unique ID"""
+    def generate_id(self, prefix, existing_list, key='id'):
+        """Generate unique ID (key is 'bill_no' for bills)"""
         if not existing_list:
             return f"{prefix}001"
         
         max_num = 0
         for item in existing_list:
-            if 'id' in item:
-                num_part = int(item['id'][len(prefix):])
+            if key in item:
+                num_part = int(item[key][len(prefix):])
                 max_num = max(max_num, num_part)
         
         return f"{prefix}{str(max_num + 1).zfill(3)}"
@@ -842,21 +1049,15 @@ class DashboardModule:
         stats_frame = tk.Frame(self.parent, bg='white')
         stats_frame.pack(fill='x', padx=20, pady=10)
         
-        # Get statistics
-        patients = self.data_manager.get_patients()
-        doctors = self.data_manager.get_doctors()
-        appointments = self.data_manager.get_appointments()
-        bills = self.data_manager.get_bills()
-        
-        total_revenue = sum(bill['total'] for bill in bills if bill.get('status') == 'Paid')
-        
+        # Get statistics (running counters kept by the data manager)
+        counters = self.data_manager.dashboard_stats()
+        total_revenue = counters.value('billing', 'paid_revenue')
         today = datetime.now().strftime("%Y-%m-%d")
-        today_appointments = [a for a in appointments if a.get('date') == today]
         
         stats = [
-            {'title': 'Total Patients', 'value': len(patients), 'icon': '🏥', 'color': '#3498db'},
-            {'title': 'Doctors', 'value': len(doctors), 'icon': '👨‍⚕️', 'color': '#2ecc71'},
-            {'title': 'Today Appointments', 'value': len(today_appointments), 'icon': '📅', 'color': '#e74c3c'},
+            {'title': 'Total Patients', 'value': counters.value('patients'), 'icon': '🏥', 'color': '#3498db'},
+            {'title': 'Doctors', 'value': counters.value('doctors'), 'icon': '👨‍⚕️', 'color': '#2ecc71'},
+            {'title': 'Today Appointments', 'value': counters.appointments_on(today), 'icon': '📅', 'color': '#e74c3c'},
             {'title': 'Total Revenue', 'value': f'${total_revenue:,.2f}', 'icon': '💰', 'color': '#f39c12'}
         ]
         
@@ -903,29 +1104,22 @@ class DashboardModule:
         self.create_pie_chart(right_chart_frame)
     
     def create_line_chart(self, parent):
-        """Create line chart for patient trends"""
-        fig = Figure(figsize=(5, 3), dpi=100)
-        ax = fig.add_subplot(111)
-        
+        """Create line chart for patient trends (rendered off the Tk thread)"""
         # Sample data - last 7 days
         days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         patients = [15, 23, 18, 28, 32, 25, 20]
         
-        ax.plot(days, patients, marker='o', linewidth=2, markersize=8, color='#3498db')
-        ax.set_ylabel('Number of Patients')
-        ax.set_title('Weekly Patient Visits')
-        ax.grid(True, alpha=0.3)
-        fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+        spec = {
+            'x': days,
+            'series': [{'y': patients, 'linewidth': 2, 'markersize': 8, 'color': '#3498db'}],
+            'ylabel': 'Number of Patients',
+            'title': 'Weekly Patient Visits',
+            'grid': True
+        }
+        charts.widget(parent, 'lines', spec, size=(5, 3)).pack(fill='both', expand=True, padx=10, pady=10)
     
     def create_pie_chart(self, parent):
-        """Create pie chart for disease distribution"""
-        fig = Figure(figsize=(5, 3), dpi=100)
-        ax = fig.add_subplot(111)
-        
+        """Create pie chart for disease distribution (rendered off the Tk thread)"""
         # Get disease data
         patients = self.data_manager.get_patients()
         disease_count = {}
@@ -933,21 +1127,14 @@ class DashboardModule:
             disease = patient.get('disease', 'Unknown')
             disease_count[disease] = disease_count.get(disease, 0) + 1
         
-        if disease_count:
-            labels = list(disease_count.keys())
-            sizes = list(disease_count.values())
-            colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6']
-            
-            ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')
-        else:
-            ax.text(0.5, 0.5, 'No Data Available', ha='center', va='center')
-        
-        fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+        spec = {
+            'labels': list(disease_count.keys()),
+            'sizes': list(disease_count.values()),
+            'colors': ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6'],
+            'startangle': 90,
+            'empty': 'No Data Available'
+        }
+        charts.widget(parent, 'pie', spec, size=(5, 3)).pack(fill='both', expand=True, padx=10, pady=10)
     
     def create_quick_actions(self):
         """Create quick action buttons"""
@@ -1014,6 +1201,12 @@ class PatientsModule:
                 bg='white').pack(side='left', padx=(0, 10))
         
         self.search_var = tk.StringVar()
+        # The trigram index is built on the search worker, not on the Tk thread
+        self.search = SearchController(
+            self.parent, lambda: self.data_manager.patients_file, None, self._show_patients,
+            narrow=lambda filepath, search_term: self._find_patients(
+                self.data_manager.text_index(filepath), search_term))
+        self.search.warm(lambda: self.data_manager.text_index(self.data_manager.patients_file))
         self.search_var.trace('w', lambda *args: self.search_patients())
         
         search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=('Arial', 11), width=40)
@@ -1044,6 +1237,8 @@ class PatientsModule:
             self.tree.column(col, width=120, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        # Only the visible window of patients is rendered in Tk
+        self.rows = VirtualRows(self.tree, v_scroll)
         
         # Style
         style = ttk.Style()
@@ -1055,51 +1250,37 @@ class PatientsModule:
         self.tree.bind('<Button-3>', self.show_context_menu)
         self.tree.bind('<Double-1>', self.view_patient)
     
+    def _patient_values(self, patient):
+        return (
+            patient['id'],
+            patient['name'],
+            patient['age'],
+            patient['gender'],
+            patient['disease'],
+            patient['doctor'],
+            patient['admit_date'],
+            patient['contact'],
+            patient.get('blood_group', 'N/A')
+        )
+    
     def load_patients(self):
-        """Load all patients into table"""
-        # Clear existing
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        patients = self.data_manager.get_patients()
-        
-        for patient in patients:
-            self.tree.insert('', 'end', values=(
-                patient['id'],
-                patient['name'],
-                patient['age'],
-                patient['gender'],
-                patient['disease'],
-                patient['doctor'],
-                patient['admit_date'],
-                patient['contact'],
-                patient.get('blood_group', 'N/A')
-            ))
+        """Load all patients into table (only changed rows are touched)"""
+        self.rows.bind(self.data_manager.get_patients(), self._patient_values)
+    
+    def _show_patients(self, patients):
+        self.rows.bind(patients, self._patient_values)
     
     def search_patients(self):
-        """Search patients by name or ID"""
-        search_term = self.search_var.get().lower()
-        
-        # Clear existing
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        patients = self.data_manager.get_patients()
-        
-        for patient in patients:
-            if (search_term in patient['name'].lower() or 
-                search_term in patient['id'].lower()):
-                self.tree.insert('', 'end', values=(
-                    patient['id'],
-                    patient['name'],
-                    patient['age'],
-                    patient['gender'],
-                    patient['disease'],
-                    patient['doctor'],
-                    patient['admit_date'],
-                    patient['contact'],
-                    patient.get('blood_group', 'N/A')
-                ))
+        """Search patients by name, ID or contact (debounced, looked up off the Tk thread)"""
+        self.search.request(self.search_var.get().strip())
+    
+    @staticmethod
+    def _find_patients(index, search_term):
+        # Nothing contains the term: offer the closest names, for misspellings
+        found = index.search(search_term)
+        if not found and len(search_term) >= 3:
+            found = index.fuzzy(search_term, fields=('name',))
+        return found
     
     def add_patient(self):
         """Open dialog to add new patient"""
@@ -1178,7 +1359,7 @@ class PatientsModule:
                 patient_data[key] = value
             
             self.data_manager.add_patient(patient_data)
-            messagebox.showinfo("Success", "Patient added successfully!")
+            messagebox.showinfo("Success", f"Patient {patient_data['id']} added successfully!")
             dialog.destroy()
             self.load_patients()
         
@@ -1256,7 +1437,8 @@ class PatientsModule:
         
         tk.Button(btn_frame, text="🗑️ Delete", font=('Arial', 10, 'bold'),
                  bg='#e74c3c', fg='white', relief='flat', cursor='hand2',
-                 command=lambda: self.delete_patient(patient_id, dialog), padx=20, pady=8).pack(side='left', padx=5)
+                 command=lambda: self.delete_patient(patient_id, dialog, patient.get('version', 0)),
+                 padx=20, pady=8).pack(side='left', padx=5)
         
         tk.Button(btn_frame, text="❌ Close", font=('Arial', 10, 'bold'),
                  bg='#95a5a6', fg='white', relief='flat', cursor='hand2',
@@ -1268,6 +1450,7 @@ class PatientsModule:
         if not patient:
             return
         
+        version = patient.get('version', 0)
         parent_dialog.destroy()
         
         dialog = tk.Toplevel(self.parent)
@@ -1337,7 +1520,12 @@ class PatientsModule:
                 if value:
                     updated_data[key] = value
             
-            self.data_manager.update_patient(patient_id, updated_data)
+            try:
+                self.data_manager.update_patient(patient_id, updated_data, version)
+            except StaleRecordError:
+                messagebox.showerror("Error", "This patient was changed by another user while you were editing.\n"
+                                              "Reopen the patient to see the latest details.")
+                return
             messagebox.showinfo("Success", "Patient updated successfully!")
             dialog.destroy()
             self.load_patients()
@@ -1350,10 +1538,15 @@ class PatientsModule:
                  bg='#e74c3c', fg='white', relief='flat', cursor='hand2',
                  command=dialog.destroy, padx=20, pady=10).pack(side='left', padx=10)
     
-    def delete_patient(self, patient_id, parent_dialog):
+    def delete_patient(self, patient_id, parent_dialog, version=None):
         """Delete patient"""
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this patient?"):
-            self.data_manager.delete_patient(patient_id)
+            try:
+                self.data_manager.delete_patient(patient_id, version)
+            except StaleRecordError:
+                messagebox.showerror("Error", "This patient was changed by another user since it was opened.\n"
+                                              "Reopen the patient before deleting it.")
+                return
             messagebox.showinfo("Success", "Patient deleted successfully!")
             parent_dialog.destroy()
             self.load_patients()
@@ -1446,24 +1639,19 @@ class DoctorsModule:
             self.tree.column(col, width=150, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        self.rows = TreeBinder(self.tree)
         
         self.tree.bind('<Double-1>', self.view_doctor)
     
     def load_doctors(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        doctors = self.data_manager.get_doctors()
-        
-        for doctor in doctors:
-            self.tree.insert('', 'end', values=(
-                doctor['id'],
-                doctor['name'],
-                doctor['specialization'],
-                doctor['contact'],
-                doctor.get('email', 'N/A'),
-                doctor['availability']
-            ))
+        self.rows.bind(self.data_manager.get_doctors(), lambda doctor: (
+            doctor['id'],
+            doctor['name'],
+            doctor['specialization'],
+            doctor['contact'],
+            doctor.get('email', 'N/A'),
+            doctor['availability']
+        ))
     
     def add_doctor(self):
         dialog = tk.Toplevel(self.parent)
@@ -1518,7 +1706,7 @@ class DoctorsModule:
                 doctor_data[key] = value
             
             self.data_manager.add_doctor(doctor_data)
-            messagebox.showinfo("Success", "Doctor added successfully!")
+            messagebox.showinfo("Success", f"Doctor {doctor_data['id']} added successfully!")
             dialog.destroy()
             self.load_doctors()
         
@@ -1590,6 +1778,9 @@ class DoctorsModule:
 # ==================== REMAINING MODULES (Abbreviated for space) ====================
 
 class AppointmentsModule:
+    # Parsed on first use and re-read only when data/doctors.json changes
+    availability = AvailabilityTable(os.path.join(os.path.dirname(__file__), 'data', 'doctors.json'))
+    
     def __init__(self, parent, data_manager, user):
         self.parent = parent
         self.data_manager = data_manager
@@ -1630,107 +1821,73 @@ class AppointmentsModule:
             self.tree.column(col, width=width, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        self.rows = TreeBinder(self.tree)
     
     def _convert_duration_to_minutes(self, duration_str):
         """Convert duration string to minutes"""
-        if 'min' in duration_str:
-            return int(duration_str.split()[0])
-        elif 'hour' in duration_str:
-            hours = float(duration_str.split()[0])
-            return int(hours * 60)
-        return 30  # default to 30 minutes
-    
-    def _check_appointment_conflict(self, appointments, start_time, end_time, doctor_id):
-        """Check if the appointment time conflicts with existing appointments"""
+        return duration_to_minutes(duration_str)
+    
+    def _check_appointment_conflict(self, start_time, end_time, doctor_id):
+        """Check if the appointment time conflicts with existing appointments.
+        Uses the data manager's per-doctor, per-day slot index."""
         doctor_id = doctor_id.split(' - ')[0]  # Extract doctor ID from the combobox value
-        for appt in appointments:
-            if appt['doctor_id'] == doctor_id:
-                # Convert appointment time to datetime
-                appt_date = datetime.strptime(f"{appt['date']} {appt['time']}", "%Y-%m-%d %H:%M")
-                # Calculate appointment end time based on duration
-                duration = self._convert_duration_to_minutes(appt.get('duration', '30 min'))
-                appt_end = appt_date + timedelta(minutes=duration)
-                
-                # Check for overlap
-                if not (end_time <= appt_date or start_time >= appt_end):
-                    return True
-        return False
+        return self.data_manager.appointment_slots().conflict(doctor_id, start_time, end_time) is not None
 
     def _get_doctor_availability(self, doctor_id):
-        """Load doctor availability from data/doctors.json if present.
+        """Doctor availability from data/doctors.json if present.
 
         Returns availability dict like { 'days': [...], 'timing': '09:00 AM - 05:00 PM' }
         or None if not found.
         """
-        try:
-            import json
-            with open(os.path.join(os.path.dirname(__file__), 'data', 'doctors.json'), 'r') as f:
-                data = json.load(f)
-                doctors = data.get('doctors', []) if isinstance(data, dict) else data
-                for d in doctors:
-                    if d.get('id') == doctor_id or d.get('id') == doctor_id.split(' - ')[0]:
-                        return d.get('availability')
-        except Exception:
-            return None
-
-    def _is_within_doctor_availability(self, availability, appt_datetime, duration_minutes):
-        """Check whether a datetime and duration fits into doctor's availability.
-
-        availability: {'days': ['Monday', ...], 'timing': '09:00 AM - 05:00 PM'}
-        """
-        if not availability:
-            return True  # If unknown, allow and rely on conflict checks
+        return self.availability.get(doctor_id)
 
-        # Check day
-        appt_day = appt_datetime.strftime('%A')
-        days = availability.get('days', [])
-        if days and appt_day not in days:
-            return False
+    def _is_within_doctor_availability(self, doctor_id, appt_datetime, duration_minutes):
+        """Check whether a datetime and duration fits into doctor's availability"""
+        return self.availability.is_within(doctor_id, appt_datetime, duration_minutes)
 
-        # Parse timing
-        timing = availability.get('timing', '')
+    def find_free_slots(self, doctor_ids, start_date, end_date, duration_minutes, limit=5):
+        """Earliest free slots for the given doctors, honouring availability,
+        schedule breaks (when the data manager keeps schedules) and bookings"""
+        finder = SlotFinder(self.data_manager.appointment_slots(), self.availability,
+                            getattr(self.data_manager, 'get_doctor_schedule', None))
+        return finder.find(doctor_ids, start_date, end_date, duration_minutes, limit)
+    
+    def _fill_earliest_slot(self):
+        """Put the earliest free slot of the selected doctor within a week
+        of the selected date into the form"""
+        doctor = self.doctor_var.get()
+        if not doctor:
+            messagebox.showerror("Error", "Please select a doctor first")
+            return
         try:
-            parts = timing.split('-')
-            start_str = parts[0].strip()
-            end_str = parts[1].strip()
-
-            # Convert like '09:00 AM' to 24h time
-            start_dt = datetime.strptime(start_str, '%I:%M %p')
-            end_dt = datetime.strptime(end_str, '%I:%M %p')
-
-            appt_time_only = appt_datetime.replace(year=start_dt.year, month=start_dt.month, day=start_dt.day)
-            # Construct todays start/end with the appt date
-            start_today = appt_datetime.replace(hour=start_dt.hour, minute=start_dt.minute, second=0, microsecond=0)
-            end_today = appt_datetime.replace(hour=end_dt.hour, minute=end_dt.minute, second=0, microsecond=0)
-
-            appt_end = appt_datetime + timedelta(minutes=duration_minutes)
-
-            # If end time crosses the end_today, it's not allowed
-            if appt_datetime < start_today or appt_end > end_today:
-                return False
-        except Exception:
-            # If parsing fails, be permissive and allow booking (but conflict checks still apply)
-            return True
-
-        return True
-
-    def load_appointments(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+            start_date = datetime.strptime(self.date_var.get(), "%Y-%m-%d").date()
+        except ValueError:
+            messagebox.showerror("Error", "Invalid date format")
+            return
         
-        appointments = self.data_manager.get_appointments()
+        duration_minutes = self._convert_duration_to_minutes(self.duration_var.get())
+        slots = self.find_free_slots([doctor.split(' - ')[0]], start_date,
+                                     start_date + timedelta(days=6), duration_minutes, limit=1)
+        if not slots:
+            messagebox.showinfo("No Free Slot", "No free slot in the 7 days from the selected date")
+            return
         
-        for appt in appointments:
-            # Display appointment info using stored names
-            self.tree.insert('', 'end', values=(
-                appt['id'],
-                f"{appt['patient_name']} ({appt['patient_id']})",
-                f"{appt['doctor']} ({appt['doctor_id']})",
-                appt['date'],
-                appt['time'],
-                appt.get('duration', '30 min'),
-                'EMERGENCY' if appt.get('emergency') else appt['status']
-            ))
+        slot = slots[0]
+        self.date_var.set(slot['date'])
+        self.hour_var.set(slot['time'][:2])
+        self.minute_var.set(slot['time'][3:])
+    
+    def load_appointments(self):
+        # Display appointment info using stored names
+        self.rows.bind(self.data_manager.get_appointments(), lambda appt: (
+            appt['id'],
+            f"{appt['patient_name']} ({appt['patient_id']})",
+            f"{appt['doctor']} ({appt['doctor_id']})",
+            appt['date'],
+            appt['time'],
+            appt.get('duration', '30 min'),
+            'EMERGENCY' if appt.get('emergency') else appt['status']
+        ))
     
     def add_appointment(self):
         # Create appointment dialog
@@ -1802,6 +1959,7 @@ class AppointmentsModule:
                             font=('Arial', 11), width=30)
         date_entry.pack(side='left', padx=(5, 5))
         
+        from date_picker import DatePicker
         self.date_picker = DatePicker(self.parent, self.date_var)
         tk.Button(date_frame, text="📅", command=self.date_picker.show_calendar,
                  font=('Arial', 11)).pack(side='left')
@@ -1848,6 +2006,9 @@ class AppointmentsModule:
                                   values=durations, width=15)
         duration_cb.pack(side='left')
         
+        tk.Button(form_frame, text="⚡ Earliest Free Slot", font=('Arial', 10),
+                 command=self._fill_earliest_slot).pack(anchor='w', pady=(0, 15))
+        
         # Purpose/Notes
         tk.Label(form_frame, text="Purpose:", font=('Arial', 11)).pack(anchor='w')
         self.purpose_text = tk.Text(form_frame, height=4, font=('Arial', 11))
@@ -1910,7 +2071,7 @@ class AppointmentsModule:
         # Check doctor availability (if defined in data/doctors.json)
         doctor_id = doctor.split(' - ')[0]
         availability = self._get_doctor_availability(doctor_id)
-        if availability and not self._is_within_doctor_availability(availability, appt_datetime, duration_minutes):
+        if availability and not self._is_within_doctor_availability(doctor_id, appt_datetime, duration_minutes):
             timing = availability.get('timing', 'N/A')
             days = ', '.join(availability.get('days', [])) if availability.get('days') else 'N/A'
             messagebox.showerror("Not Available", 
@@ -1919,7 +2080,7 @@ class AppointmentsModule:
             return
 
         # Check for conflicts with existing appointments
-        if self._check_appointment_conflict(appointments, appt_datetime, appt_end, doctor):
+        if self._check_appointment_conflict(appt_datetime, appt_end, doctor):
             messagebox.showerror("Error", "This time slot conflicts with an existing appointment")
             return
 
@@ -1945,7 +2106,7 @@ class AppointmentsModule:
         try:
             self.data_manager.add_appointment(appointment_data)
             messagebox.showinfo("Success", 
-                              f"Appointment {new_id} scheduled successfully!\n" + 
+                              f"Appointment {appointment_data['id']} scheduled successfully!\n" + 
                               f"Patient: {patient_name}\n" +
                               f"Doctor: {doctor_name}\n" +
                               f"Date: {date_str}\n" +
@@ -1999,6 +2160,13 @@ class PharmacyModule:
                 bg='white').pack(side='left', padx=(0, 10))
         
         self.search_var = tk.StringVar()
+        self.search = SearchController(self.parent,
+                                       lambda: self.data_manager.pharmacy_file,
+                                       self._medicine_matches,
+                                       lambda meds: self.rows.bind(meds, self._medicine_values),
+                                       narrow=lambda filepath, search_term:
+                                           self.data_manager.text_index(filepath).search(search_term))
+        self.search.warm(lambda: self.data_manager.text_index(self.data_manager.pharmacy_file))
         self.search_var.trace('w', lambda *args: self.search_medicines())
         
         search_entry = tk.Entry(search_frame, textvariable=self.search_var, 
@@ -2038,34 +2206,31 @@ class PharmacyModule:
             self.tree.column(col, width=width, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        self.rows = TreeBinder(self.tree)
         
         # Bind events
         self.tree.bind('<Double-1>', self.view_medicine)
         self.tree.bind('<Button-3>', self.show_context_menu)
     
+    def _medicine_values(self, med):
+        stock = med['stock']
+        status = "🟢 In Stock" if stock > 20 else "🟡 Low Stock" if stock > 0 else "🔴 Out of Stock"
+        return (
+            med['id'],
+            med['name'],
+            med['category'],
+            stock,
+            f"${med['price']:.2f}",
+            status
+        )
+    
     def load_medicines(self):
         """Load medicines and update low stock alerts"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         medicines = self.data_manager.get_medicines()
-        low_stock_items = []
+        self.rows.bind(medicines, self._medicine_values)
         
-        for med in medicines:
-            stock = med['stock']
-            status = "🟢 In Stock" if stock > 20 else "🟡 Low Stock" if stock > 0 else "🔴 Out of Stock"
-            
-            if stock <= 20:  # Low stock threshold
-                low_stock_items.append(f"⚠️ {med['name']}: {stock} units remaining")
-            
-            self.tree.insert('', 'end', values=(
-                med['id'],
-                med['name'],
-                med['category'],
-                stock,
-                f"${med['price']:.2f}",
-                status
-            ))
+        low_stock_items = [f"⚠️ {med['name']}: {med['stock']} units remaining"
+                           for med in medicines if med['stock'] <= 20]  # Low stock threshold
         
         # Update alerts
         self.alert_list.delete('1.0', 'end')
@@ -2075,28 +2240,13 @@ class PharmacyModule:
             self.alert_list.insert('1.0', "✅ All items sufficiently stocked")
     
     def search_medicines(self):
-        """Search medicines by name or category"""
-        search_term = self.search_var.get().lower()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        medicines = self.data_manager.get_medicines()
-        
-        for med in medicines:
-            if (search_term in med['name'].lower() or 
-                search_term in med['category'].lower()):
-                stock = med['stock']
-                status = "🟢 In Stock" if stock > 20 else "🟡 Low Stock" if stock > 0 else "🔴 Out of Stock"
-                
-                self.tree.insert('', 'end', values=(
-                    med['id'],
-                    med['name'],
-                    med['category'],
-                    stock,
-                    f"${med['price']:.2f}",
-                    status
-                ))
+        """Search medicines by name or category (debounced, filtered off the Tk thread)"""
+        self.search.request(self.search_var.get().lower())
+    
+    @staticmethod
+    def _medicine_matches(med, search_term):
+        return (search_term in med['name'].lower() or 
+                search_term in med['category'].lower())
     
     def add_medicine(self):
         """Add new medicine to inventory"""
@@ -2188,7 +2338,7 @@ class PharmacyModule:
             }
             
             self.data_manager.add_medicine(medicine_data)
-            messagebox.showinfo("Success", "Medicine added successfully!")
+            messagebox.showinfo("Success", f"Medicine {medicine_data['id']} added successfully!")
             dialog.destroy()
             self.load_medicines()
         
@@ -2213,7 +2363,13 @@ class PharmacyModule:
         
         item = self.tree.item(selected[0])
         medicine_id = item['values'][0]
-        current_stock = item['values'][3]
+        medicine = next((m for m in self.data_manager.get_medicines() if m['id'] == medicine_id), None)
+        if not medicine:
+            messagebox.showerror("Error", "This medicine no longer exists!")
+            self.load_medicines()
+            return
+        current_stock = int(medicine.get('stock', 0))
+        version = medicine.get('version', 0)
         
         dialog = tk.Toplevel(self.parent)
         dialog.title("Update Stock")
@@ -2274,13 +2430,7 @@ class PharmacyModule:
                     return
                 
                 # Update in database
-                medicines = self.data_manager.get_medicines()
-                for med in medicines:
-                    if med['id'] == medicine_id:
-                        med['stock'] = new_stock
-                        break
-                
-                self.data_manager.save_data(self.data_manager.pharmacy_file, medicines)
+                self.data_manager.update_medicine(medicine_id, {'stock': new_stock}, version)
                 
                 messagebox.showinfo("Success", 
                                   f"Stock updated successfully!\n"
@@ -2288,6 +2438,11 @@ class PharmacyModule:
                 dialog.destroy()
                 self.load_medicines()
                 
+            except StaleRecordError:
+                messagebox.showerror("Error", "The stock of this medicine was changed by another user.\n"
+                                              "Reopen the dialog to adjust the current stock.")
+                dialog.destroy()
+                self.load_medicines()
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid number!")
         
@@ -2408,6 +2563,13 @@ class LabModule:
                 bg='white').pack(side='left', padx=(0, 10))
         
         self.search_var = tk.StringVar()
+        self.search = SearchController(self.parent,
+                                       lambda: self.data_manager.lab_file,
+                                       self._report_matches,
+                                       lambda reports: self.rows.bind(reports, self._report_values),
+                                       narrow=lambda filepath, query:
+                                           self.data_manager.text_index(filepath).search(query[0]))
+        self.search.warm(lambda: self.data_manager.text_index(self.data_manager.lab_file))
         self.search_var.trace('w', lambda *args: self.search_reports())
         
         search_entry = tk.Entry(search_frame, textvariable=self.search_var,
@@ -2456,6 +2618,7 @@ class LabModule:
             self.tree.column(col, width=width, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        self.rows = TreeBinder(self.tree)
         
         # Bind events
         self.tree.bind('<Double-1>', self.view_report)
@@ -2634,7 +2797,7 @@ class LabModule:
             
             messagebox.showinfo("Success", 
                               f"Lab report created successfully!\n"
-                              f"Report ID: {new_id}")
+                              f"Report ID: {report_data['id']}")
             dialog.destroy()
             self.load_reports()
         
@@ -2651,86 +2814,9 @@ class LabModule:
                  command=dialog.destroy, padx=20, pady=10).pack(side='left', padx=10)
     
     def generate_report_pdf(self, report_data):
-        """Generate PDF lab report"""
+        """Queue the PDF lab report (written by a document worker)"""
         filename = f"{self.data_manager.data_dir}/lab_report_{report_data['id']}.pdf"
-        
-        doc = SimpleDocTemplate(filename, pagesize=letter,
-                              rightMargin=72, leftMargin=72,
-                              topMargin=72, bottomMargin=72)
-        
-        # Prepare story elements
-        story = []
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
-        
-        # Header
-        header_text = "LABORATORY TEST REPORT"
-        story.append(Paragraph(header_text, styles['Center']))
-        story.append(Spacer(1, 20))
-        
-        # Report info
-        info_data = [
-            ['Report ID:', report_data['id']],
-            ['Date:', report_data['date']],
-            ['Patient ID:', report_data['patient_id']],
-            ['Patient Name:', report_data['patient_name']],
-            ['Test Type:', report_data['test']]
-        ]
-        
-        info_table = Table(info_data, colWidths=[100, 400])
-        info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        story.append(info_table)
-        story.append(Spacer(1, 20))
-        
-        # Parameters
-        story.append(Paragraph("Test Parameters", styles['Heading2']))
-        story.append(Spacer(1, 10))
-        
-        if report_data['parameters']:
-            param_data = [['Parameter', 'Value', 'Unit', 'Reference Range']]
-            for param in report_data['parameters']:
-                param_data.append([
-                    param['name'],
-                    param['value'],
-                    param['unit'],
-                    param['reference']
-                ])
-            
-            param_table = Table(param_data, colWidths=[150, 150, 100, 100])
-            param_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(param_table)
-        else:
-            story.append(Paragraph("No parameters recorded", styles['Normal']))
-        
-        story.append(Spacer(1, 20))
-        
-        # Result
-        story.append(Paragraph("Result Summary", styles['Heading2']))
-        story.append(Spacer(1, 10))
-        story.append(Paragraph(report_data['result'], styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Remarks
-        if report_data['remarks']:
-            story.append(Paragraph("Remarks/Interpretation", styles['Heading2']))
-            story.append(Spacer(1, 10))
-            story.append(Paragraph(report_data['remarks'], styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
+        return documents.submit('lab_report', filename, report_data)
     
     def view_report(self, event):
         """View lab report details"""
@@ -2817,46 +2903,41 @@ class LabModule:
             self.parent.clipboard_append(report_id)
     
     def search_reports(self):
-        """Search reports by patient name or test type"""
-        search_term = self.search_var.get().lower()
-        filter_option = self.filter_var.get()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        reports = self.data_manager.get_lab_reports()
+        """Search reports by patient name or test type (debounced, filtered off the Tk thread)"""
+        self.search.request((self.search_var.get().lower(), self.filter_var.get(), datetime.now()))
+    
+    @staticmethod
+    def _report_matches(report, query):
+        search_term, filter_option, today = query
         
         # Apply date filter
-        if filter_option != "All":
-            today = datetime.now()
-            if filter_option == "Today":
-                reports = [r for r in reports if r['date'] == today.strftime("%Y-%m-%d")]
-            elif filter_option == "This Week":
-                week_ago = today - timedelta(days=7)
-                reports = [r for r in reports if datetime.strptime(r['date'], "%Y-%m-%d") >= week_ago]
-            elif filter_option == "This Month":
-                month_ago = today - timedelta(days=30)
-                reports = [r for r in reports if datetime.strptime(r['date'], "%Y-%m-%d") >= month_ago]
+        if filter_option == "Today":
+            if report['date'] != today.strftime("%Y-%m-%d"):
+                return False
+        elif filter_option == "This Week":
+            if datetime.strptime(report['date'], "%Y-%m-%d") < today - timedelta(days=7):
+                return False
+        elif filter_option == "This Month":
+            if datetime.strptime(report['date'], "%Y-%m-%d") < today - timedelta(days=30):
+                return False
         
         # Apply search filter
-        for report in reports:
-            if (search_term in report['patient_name'].lower() or
-                search_term in report['test'].lower()):
-                self.tree.insert('', 'end', values=(
-                    report['id'],
-                    report['patient_name'],
-                    report['test'],
-                    report.get('result', 'N/A'),
-                    report['date'],
-                    report.get('status', 'Completed'),
-                    report.get('remarks', '')[:50] + '...' if report.get('remarks', '') else ''
-                ))
+        return (search_term in report['patient_name'].lower() or
+                search_term in report['test'].lower())
+    
+    def _report_values(self, report):
+        return (
+            report['id'],
+            report['patient_name'],
+            report['test'],
+            report.get('result', 'N/A'),
+            report['date'],
+            report.get('status', 'Completed'),
+            report.get('remarks', '')[:50] + '...' if report.get('remarks', '') else ''
+        )
     
     def load_reports(self):
         """Load all lab reports"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         reports = self.data_manager.get_lab_reports()
 
         # Apply patient filter if available
@@ -2868,16 +2949,7 @@ class LabModule:
             pid = patient_filter.split(' - ')[0]
             reports = [r for r in reports if r.get('patient_id') == pid]
 
-        for report in reports:
-            self.tree.insert('', 'end', values=(
-                report['id'],
-                report['patient_name'],
-                report['test'],
-                report.get('result', 'N/A'),
-                report['date'],
-                report.get('status', 'Completed'),
-                report.get('remarks', '')[:50] + '...' if report.get('remarks', '') else ''
-            ))
+        self.rows.bind(reports, self._report_values)
     
     def create_widgets(self):
         title_frame = tk.Frame(self.parent, bg='white')
@@ -2908,25 +2980,20 @@ class LabModule:
             self.tree.column(col, width=120, anchor='center')
         
         self.tree.pack(fill='both', expand=True)
+        self.rows = TreeBinder(self.tree)
         
         self.tree.bind('<Double-1>', self.view_bill)
     
     def load_bills(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        bills = self.data_manager.get_bills()
-        
-        for bill in bills:
-            self.tree.insert('', 'end', values=(
-                bill['bill_no'],
-                bill['patient_name'],
-                bill['services'],
-                f"${bill['total']:.2f}",
-                bill['payment_method'],
-                bill['date'],
-                bill['status']
-            ))
+        self.rows.bind(self.data_manager.get_bills(), lambda bill: (
+            bill['bill_no'],
+            bill['patient_name'],
+            bill['services'],
+            f"${bill['total']:.2f}",
+            bill['payment_method'],
+            bill['date'],
+            bill['status']
+        ), key='bill_no')
     
     def create_bill(self):
         """Create new bill with payment options"""
@@ -2947,7 +3014,7 @@ class LabModule:
         
         # Bill number
         bills = self.data_manager.get_bills()
-        new_bill_no = self.data_manager.generate_id('B', bills)
+        new_bill_no = self.data_manager.generate_id('B', bills, 'bill_no')
         
         tk.Label(form_frame, text=f"Bill Number: {new_bill_no}", font=('Arial', 14, 'bold')).pack(pady=10)
         
@@ -3056,7 +3123,7 @@ class LabModule:
             else:  # Unix/Linux/Mac
                 downloads_path = os.path.expanduser('~/Downloads')
                 
-            messagebox.showinfo("Success", f"Bill {new_bill_no} created successfully!\nPDF saved to {downloads_path}")
+            messagebox.showinfo("Success", f"Bill {bill_data['bill_no']} created successfully!\nPDF is being saved to {downloads_path}")
             dialog.destroy()
             self.load_bills()
         
@@ -3069,7 +3136,7 @@ class LabModule:
                  command=dialog.destroy, padx=20, pady=10).pack(side='left', padx=10)
     
     def generate_bill_pdf(self, bill_data):
-        """Generate PDF bill with QR code"""
+        """Queue the PDF bill with QR code (written by a document worker)"""
         # Get downloads folder path based on OS
         if os.name == 'nt':  # Windows
             downloads_path = os.path.expanduser('~\\Downloads')
@@ -3077,196 +3144,7 @@ class LabModule:
             downloads_path = os.path.expanduser('~/Downloads')
             
         filename = os.path.join(downloads_path, f"bill_{bill_data['bill_no']}.pdf")
-        
-        # Use SimpleDocTemplate for better formatting
-        doc = SimpleDocTemplate(filename, pagesize=letter,
-                              rightMargin=72, leftMargin=72,
-                              topMargin=72, bottomMargin=72)
-        
-        # Prepare story elements
-        story = []
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
-        styles.add(ParagraphStyle(name='Right', alignment=TA_RIGHT))
-        
-        # Create header
-        header_text = "SMART HOSPITAL"
-        story.append(Paragraph(header_text, styles['Center']))
-        story.append(Spacer(1, 12))
-        
-        # Hospital address
-        address = """123 Medical Center Drive<br/>
-                    City, State 12345<br/>
-                    Phone: (555) 123-4567<br/>
-                    Email: info@smarthospital.com"""
-        story.append(Paragraph(address, styles['Center']))
-        story.append(Spacer(1, 20))
-        
-        # Invoice details
-        invoice_info = [
-            ['INVOICE', f"#{bill_data['bill_no']}"],
-            ['Date', bill_data['date']],
-            ['Status', bill_data['status']],
-        ]
-        t = Table(invoice_info, colWidths=[100, 150])
-        t.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 20))
-        
-        # Patient information
-        patient_info = [
-            ['Patient Information'],
-            ['Name:', bill_data['patient_name']],
-            ['ID:', bill_data['patient_id']],
-        ]
-        t = Table(patient_info, colWidths=[100, 300])
-        t.setStyle(TableStyle([
-            ('SPAN', (0, 0), (1, 0)),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (1, 0), colors.white),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 20))
-        
-        # Services
-        services_data = [['Services Description']]
-        services = bill_data['services'].split('\n')
-        for service in services:
-            services_data.append([service])
-        
-        t = Table(services_data, colWidths=[400])
-        t.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 20))
-        
-        # Payment details
-        payment_info = [
-            ['Payment Information'],
-            ['Method:', bill_data['payment_method']],
-        ]
-        
-        # Add payment-specific details
-        if bill_data['payment_method'] == 'Credit Card' or bill_data['payment_method'] == 'Debit Card':
-            if 'card_details' in bill_data:
-                payment_info.extend([
-                    ['Card Number:', f"XXXX-XXXX-XXXX-{bill_data['card_details']['number'][-4:]}"],
-                    ['Card Holder:', bill_data['card_details']['holder']],
-                ])
-        elif bill_data['payment_method'] == 'Insurance':
-            if 'insurance_details' in bill_data:
-                payment_info.extend([
-                    ['Provider:', bill_data['insurance_details']['provider']],
-                    ['Policy Number:', bill_data['insurance_details']['policy']],
-                    ['Claim Status:', bill_data['insurance_details']['status']],
-                ])
-        elif bill_data['payment_method'] == 'Online Payment':
-            payment_info.extend([
-                ['Transaction ID:', bill_data.get('transaction_id', 'Pending')],
-                ['Payment Status:', bill_data.get('payment_status', 'Pending')],
-            ])
-        
-        t = Table(payment_info, colWidths=[100, 300])
-        t.setStyle(TableStyle([
-            ('SPAN', (0, 0), (1, 0)),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (1, 0), colors.white),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 20))
-        
-        # Amounts
-        amounts_data = [
-            ['', 'Amount'],
-            ['Subtotal:', f"${bill_data['subtotal']:.2f}"],
-            ['Tax (10%):', f"${bill_data['tax']:.2f}"],
-            ['Total:', f"${bill_data['total']:.2f}"],
-        ]
-        t = Table(amounts_data, colWidths=[200, 100])
-        t.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -1), (1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('LINEBELOW', (0, -2), (1, -2), 1, colors.black),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 30))
-        
-        # Prefer using a user-provided QR image (data/user_qr.png). If not present,
-        # fall back to generating a verification QR code dynamically.
-        base_dir = os.path.dirname(__file__)
-        possible_qr = [
-            os.path.join(base_dir, 'data', 'user_qr.png'),
-            os.path.join(base_dir, 'data', 'user_qr.jpg'),
-            os.path.join(base_dir, 'data', 'user_qr.jpeg')
-        ]
-
-        qr_path = None
-        for p in possible_qr:
-            if os.path.exists(p):
-                qr_path = p
-                break
-
-        if not qr_path:
-            # Generate QR code for verification
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(f"BILL:{bill_data['bill_no']}|AMOUNT:{bill_data['total']}|DATE:{bill_data['date']}|STATUS:{bill_data['status']}")
-            qr.make(fit=True)
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            # Get system temp directory for QR code
-            qr_path = os.path.join(os.path.expanduser('~'), '.cache', 'hospital_qr_temp.png')
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(qr_path), exist_ok=True)
-            qr_image.save(qr_path)
-        
-        # Add QR code with caption
-        img = Image(qr_path)
-        img.drawHeight = 1.2*inch
-        img.drawWidth = 1.2*inch
-        
-        qr_table = Table([[img], ['Scan for verification']], colWidths=[1.5*inch])
-        qr_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (0, 1), 8),
-        ]))
-        story.append(qr_table)
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Clean up QR temp file
-        if os.path.exists(qr_path):
-            os.remove(qr_path)
+        return documents.submit('bill', filename, bill_data)
     
     def view_bill(self, event):
         """View bill details"""
@@ -3339,39 +3217,22 @@ class AnalyticsModule:
         self.create_status_chart(status_frame)
     
     def create_revenue_chart(self, parent):
-        """Bar chart for revenue by payment method"""
-        fig = Figure(figsize=(5, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        
-        bills = self.data_manager.get_bills()
-        revenue_by_method = {}
-        
-        for bill in bills:
-            method = bill.get('payment_method', 'Unknown')
-            revenue_by_method[method] = revenue_by_method.get(method, 0) + bill.get('total', 0)
-        
-        if revenue_by_method:
-            methods = list(revenue_by_method.keys())
-            amounts = list(revenue_by_method.values())
-            
-            ax.bar(methods, amounts, color=['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6'])
-            ax.set_ylabel('Revenue ($)')
-            ax.set_title('Revenue Distribution')
-            ax.tick_params(axis='x', rotation=45)
-        else:
-            ax.text(0.5, 0.5, 'No Data', ha='center', va='center')
-        
-        fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+        """Bar chart for revenue by payment method (rendered off the Tk thread)"""
+        # Pre-summed per payment method by the data manager
+        revenue_by_method = self.data_manager.revenue_rollup().by_method()
+        
+        spec = {
+            'labels': list(revenue_by_method.keys()),
+            'values': list(revenue_by_method.values()),
+            'colors': ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6'],
+            'ylabel': 'Revenue ($)',
+            'title': 'Revenue Distribution',
+            'rotate': 45
+        }
+        charts.widget(parent, 'bars', spec, size=(5, 4)).pack(fill='both', expand=True, padx=10, pady=10)
     
     def create_status_chart(self, parent):
-        """Pie chart for appointment status"""
-        fig = Figure(figsize=(5, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        
+        """Pie chart for appointment status (rendered off the Tk thread)"""
         appointments = self.data_manager.get_appointments()
         status_count = {}
         
@@ -3379,21 +3240,13 @@ class AnalyticsModule:
             status = appt.get('status', 'Unknown')
             status_count[status] = status_count.get(status, 0) + 1
         
-        if status_count:
-            labels = list(status_count.keys())
-            sizes = list(status_count.values())
-            colors = ['#2ecc71', '#f39c12', '#e74c3c']
-            
-            ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')
-        else:
-            ax.text(0.5, 0.5, 'No Data', ha='center', va='center')
-        
-        fig.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+        spec = {
+            'labels': list(status_count.keys()),
+            'sizes': list(status_count.values()),
+            'colors': ['#2ecc71', '#f39c12', '#e74c3c'],
+            'startangle': 90
+        }
+        charts.widget(parent, 'pie', spec, size=(5, 4)).pack(fill='both', expand=True, padx=10, pady=10)
 
 class EmergencyModule:
     def __init__(self, parent, data_manager, user):
@@ -3489,12 +3342,31 @@ class EmergencyModule:
 
 def main():
     """Main application entry point"""
+    parser = argparse.ArgumentParser(description="Smart Hospital Management System")
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default='json',
+                        help="'sqlite' keeps the data in ~/hospital_data/hospital.db")
+    parser.add_argument('--backup', action='store_true',
+                        help="keep the previous version of each data file as <name>.json.bak")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each import and startup stage took")
+    args = parser.parse_args()
+    startup.stage('imports')
+    
     # Initialize data manager
-    data_manager = DataManager()
+    data_manager = DataManager(backup=args.backup)
+    if args.storage == 'sqlite':
+        # Imports the JSON files (seeded above on first run) the first time
+        data_manager = SQLiteDataManager(data_manager.data_dir)
+    startup.stage('data manager')
     
     # Create login window
     root = tk.Tk()
     LoginWindow(root, data_manager)
+    if args.profile_startup:
+        root.update_idletasks()
+        startup.stage('login window')
+        startup.uninstall()
+        startup.report()
     root.mainloop()
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import json
 import os
+from durable_write import write_json
 
 class NotificationManager:
     def __init__(self, data_manager):
@@ -33,8 +34,7 @@ class NotificationManager:
     
     def save_config(self):
         os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=4)
+        write_json(self.config_path, self.config)
     
     def send_email_notification(self, to_email, subject, message):
         if not self.config.get('email', {}).get('username'):
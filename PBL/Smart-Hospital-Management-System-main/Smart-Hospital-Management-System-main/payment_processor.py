@@ -1,11 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import qrcode
 from PIL import Image, ImageTk
 import json
 import os
 from datetime import datetime
 import random
+from qr_service import qr_codes
 
 class PaymentProcessor:
     def __init__(self, parent, bill_data, callback):
@@ -118,11 +118,8 @@ class PaymentProcessor:
             # Create UPI payment string
             upi_string = f"upi://pay?pa={upi_pa}&pn={merchant}&am={amount}&tr={reference}&cu=INR"
 
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(upi_string)
-            qr.make(fit=True)
-
-            qr_image = qr.make_image(fill_color="black", back_color="white").convert('RGBA')
+            # Rendered once per payment string, then served from the QR cache
+            qr_image = qr_codes.image(upi_string).convert('RGBA')
             qr_image = qr_image.resize((300, 300))
 
         # Convert to PhotoImage
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+
+def render_qr(data: str, box_size: int = 10, border: int = 5) -> bytes:
+    """PNG bytes of a black-on-white QR code (runs in prerender workers)"""
+    import qrcode
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRService:
+    """Rendered QR codes, cached by a hash of their content.
+
+    A PNG is looked up in an in-memory LRU, then in a folder of
+    ``<hash>.png`` files, and only rendered when both miss. Both levels are
+    bounded: the memory LRU by entry count, the folder by file count (the
+    least recently used files are removed). Several processes may share
+    the folder; files are written to a temp name and renamed into place.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, memory_items: int = 256,
+                 disk_items: int = 2000, box_size: int = 10, border: int = 5):
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.cache', 'hospital_qr')
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.box_size = box_size
+        self.border = border
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk_count: Optional[int] = None
+
+    def key(self, data: str) -> str:
+        payload = f"{self.box_size}|{self.border}|{data}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def png(self, data: str) -> bytes:
+        """PNG bytes of the QR code for ``data``"""
+        key = self.key(data)
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return png
+        png = self._read(key)
+        if png is None:
+            png = render_qr(data, self.box_size, self.border)
+            self._write(key, png)
+        self._remember(key, png)
+        return png
+
+    def image(self, data: str):
+        """The QR code as a PIL image (a new image each call, safe to modify)"""
+        from PIL import Image
+        image = Image.open(io.BytesIO(self.png(data)))
+        image.load()
+        return image
+
+    def path(self, data: str) -> str:
+        """File of the QR code in the cache folder, for APIs that need a path"""
+        png = self.png(data)
+        key = self.key(data)
+        path = self._path(key)
+        if not os.path.exists(path):
+            self._write(key, png)
+        return path
+
+    def cached(self, data: str) -> bool:
+        key = self.key(data)
+        return key in self._memory or os.path.exists(self._path(key))
+
+    def prerender(self, payloads: Iterable[str], workers: int = 2,
+                  executor: Optional[Executor] = None) -> int:
+        """Render the QR codes not cached yet in a worker pool (e.g. ahead of
+        a batch invoice run); returns how many were rendered"""
+        missing = list(dict.fromkeys(data for data in payloads if not self.cached(data)))
+        if not missing:
+            return 0
+        own = executor is None
+        if own:
+            try:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            except (OSError, NotImplementedError):
+                executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            sizes = [self.box_size] * len(missing)
+            borders = [self.border] * len(missing)
+            for data, png in zip(missing, executor.map(render_qr, missing, sizes, borders)):
+                key = self.key(data)
+                self._write(key, png)
+                self._remember(key, png)
+        finally:
+            if own:
+                executor.shutdown()
+        return len(missing)
+
+    def _remember(self, key: str, png: bytes) -> None:
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return png
+
+    def _write(self, key: str, png: bytes) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp, 'wb') as f:
+                f.write(png)
+            os.replace(temp, path)
+        except OSError as e:
+            print(f"QR cache write failed: {e}")
+            return
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = self._count_files()
+            else:
+                self._disk_count += 1
+            prune = self._disk_count > self.disk_items
+        if prune:
+            self._prune()
+
+    def _count_files(self) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.cache_dir) if name.endswith('.png'))
+        except OSError:
+            return 0
+
+    def _prune(self) -> None:
+        """Remove the least recently used files, down to 90% of disk_items"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.png')]
+        except OSError:
+            return
+        used = []
+        for entry in entries:
+            try:
+                used.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass  # removed by another process meanwhile
+        used.sort()
+        excess = len(used) - int(self.disk_items * 0.9)
+        for _, path in used[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_count = self._count_files()
+
+
+# Shared by the payment dialog and the document workers
+qr_codes = QRService()
@@ -0,0 +1,87 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+
+class RecordCache:
+    """In-memory cache of parsed JSON collections keyed by file path.
+
+    Each entry remembers the file's (mtime, size, inode) signature at the
+    time it was read or written. A lookup only hits when the file on disk
+    still has the same signature, so edits made by another process are
+    picked up on the next read. Writers replace the file with a new one
+    (see durable_write), so the inode tells apart two rewrites that land in
+    the same timestamp tick with the same size.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Path, Tuple[Tuple[int, int, int], List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def signature(file_path: Path) -> Optional[Tuple[int, int, int]]:
+        """Return (mtime_ns, size, inode) for a file, or None if it does not exist"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, file_path: Path) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached records for a file if they are still current"""
+        current = self.signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and current is not None and entry[0] == current:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def current(self, file_path: Path) -> bool:
+        """True if the cached records for a file are still current (not
+        counted as a hit or miss)"""
+        signature = self.signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            return entry is not None and signature is not None and entry[0] == signature
+
+    def put(self, file_path: Path, data: List[Dict[str, Any]],
+            signature: Optional[Tuple[int, int, int]] = None) -> None:
+        """Store records for a file.
+
+        Pass the signature taken *before* reading the file so that a write
+        racing with the read is detected on the next lookup.
+        """
+        if signature is None:
+            signature = self.signature(file_path)
+        with self._lock:
+            if signature is None:
+                self._entries.pop(file_path, None)
+            else:
+                self._entries[file_path] = (signature, data)
+
+    def invalidate(self, file_path: Optional[Path] = None) -> None:
+        """Drop one cached file, or everything when no path is given"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(file_path, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and per-file record counts"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached': {path.stem: len(data) for path, (_, data) in self._entries.items()}
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
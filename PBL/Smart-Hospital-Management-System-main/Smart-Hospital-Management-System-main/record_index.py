@@ -0,0 +1,141 @@
+from typing import Dict, List, Any, Optional, Iterable
+
+_MISSING = object()
+
+
+class CollectionIndex:
+    """Secondary indexes over one collection.
+
+    Each declared field maps value -> set of record ids (a posting list).
+    ``version`` records which storage version the index reflects; the
+    owner rebuilds it when the storage has moved on in a way the index did
+    not see (e.g. the file was edited by another process).
+    """
+
+    def __init__(self, fields: Iterable[str] = ()):
+        self.fields = set(fields)
+        self.postings: Dict[str, Dict[Any, set]] = {}
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.order: Dict[Any, int] = {}
+        self.version: Optional[int] = None
+        # False when some record has no id, or an indexed value is unhashable
+        self.usable = True
+        self._next_seq = 0
+
+    def add_field(self, field: str) -> None:
+        self.fields.add(field)
+        self.version = None  # force a rebuild
+
+    def rebuild(self, records: List[Dict[str, Any]], version: int) -> None:
+        self.postings = {field: {} for field in self.fields}
+        self.by_id = {}
+        self.order = {}
+        self.usable = True
+        self._next_seq = 0
+        for record in records:
+            self.add(record)
+        self.version = version
+
+    def add(self, record: Dict[str, Any]) -> None:
+        record_id = record.get('id')
+        if record_id is None or record_id in self.by_id:
+            self.usable = False
+            return
+        self.by_id[record_id] = record
+        self.order[record_id] = self._next_seq
+        self._next_seq += 1
+        for field in self.fields:
+            self._post(field, record.get(field, _MISSING), record_id)
+
+    def capture(self, record_id: Any, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Old values of the indexed fields that an update is about to change"""
+        record = self.by_id.get(record_id)
+        if record is None:
+            return {}
+        return {field: record.get(field, _MISSING)
+                for field in self.fields if field in changes}
+
+    def updated(self, record_id: Any, old_values: Dict[str, Any]) -> None:
+        """Move postings for a record after its fields in old_values changed"""
+        record = self.by_id.get(record_id)
+        if record is None:
+            return
+        for field, old in old_values.items():
+            new = record.get(field, _MISSING)
+            if old is new or old == new:
+                continue
+            self._unpost(field, old, record_id)
+            self._post(field, new, record_id)
+
+    def _post(self, field: str, value: Any, record_id: Any) -> None:
+        if value is _MISSING:
+            return
+        try:
+            self.postings[field].setdefault(value, set()).add(record_id)
+        except TypeError:
+            self.usable = False
+
+    def _unpost(self, field: str, value: Any, record_id: Any) -> None:
+        if value is _MISSING:
+            return
+        try:
+            posting = self.postings[field].get(value)
+        except TypeError:
+            return
+        if posting is not None:
+            posting.discard(record_id)
+            if not posting:
+                del self.postings[field][value]
+
+    def plan(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick indexed keys ordered by posting-list size (most selective
+        first); the remaining keys are checked record by record."""
+        if not self.usable:
+            return {'strategy': 'scan', 'indexed': [], 'residual': list(query)}
+        sizes = {}
+        for key, value in query.items():
+            if key not in self.fields:
+                continue
+            try:
+                sizes[key] = len(self.postings[key].get(value, ()))
+            except TypeError:
+                continue
+        if not sizes:
+            return {'strategy': 'scan', 'indexed': [], 'residual': list(query)}
+        indexed = sorted(sizes, key=sizes.get)
+        return {
+            'strategy': 'index',
+            'indexed': indexed,
+            'estimates': {key: sizes[key] for key in indexed},
+            'residual': [key for key in query if key not in sizes]
+        }
+
+    def search(self, query: Dict[str, Any], plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run an 'index' plan: intersect posting lists, then filter"""
+        candidates = None
+        for key in plan['indexed']:
+            posting = self.postings[key].get(query[key], set())
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return []
+
+        results = []
+        for record_id in sorted(candidates, key=self.order.__getitem__):
+            record = self.by_id[record_id]
+            if all(key in record and record[key] == query[key] for key in plan['residual']):
+                results.append(record)
+        return results
+
+
+def scan(records: List[Dict[str, Any]], query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Full scan with per-key equality tests"""
+    results = []
+    for record in records:
+        matches = True
+        for key, value in query.items():
+            if key not in record or record[key] != value:
+                matches = False
+                break
+        if matches:
+            results.append(record)
+    return results
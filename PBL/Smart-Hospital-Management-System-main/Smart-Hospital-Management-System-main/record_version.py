@@ -0,0 +1,18 @@
+from typing import Any, Dict, Optional
+
+
+class StaleRecordError(ValueError):
+    """An update was based on an older version of the record than the stored one"""
+
+
+def check_version(collection: str, record_id: Any, record: Dict[str, Any],
+                  expected_version: Optional[int]) -> int:
+    """Return the stored record's version (0 for records saved before
+    versions existed); raise StaleRecordError if expected_version is given
+    and differs from it"""
+    version = record.get('version', 0)
+    if expected_version is not None and version != expected_version:
+        raise StaleRecordError(
+            f"{collection} record {record_id} was changed by someone else "
+            f"(version {version}, expected {expected_version})")
+    return version
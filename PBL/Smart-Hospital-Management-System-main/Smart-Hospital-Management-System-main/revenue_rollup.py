@@ -0,0 +1,121 @@
+import bisect
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+BUCKETS = ('day', 'month', 'method')
+
+
+def bill_total(bill: Dict[str, Any]) -> float:
+    """Amount of a bill: 'total' (billing module) or 'amount' (data_manager)"""
+    try:
+        return float(bill.get('total', bill.get('amount', 0)) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def bill_day(bill: Dict[str, Any]) -> Optional[str]:
+    """'YYYY-MM-DD' of a bill, from 'date' or the ISO 'created_at'"""
+    date = bill.get('date') or bill.get('created_at') or ''
+    date = str(date)[:10]
+    return date if len(date) == 10 else None
+
+
+def bill_method(bill: Dict[str, Any]) -> str:
+    return bill.get('payment_method') or bill.get('mode') or 'Unknown'
+
+
+class RevenueRollup:
+    """Revenue pre-summed into daily, monthly and payment-method buckets.
+
+    Bills are added and removed one at a time (by key, as the data managers
+    write them), and what each bill contributed is remembered so removing
+    it subtracts exactly that. Day and month buckets keep a sorted key list,
+    so a range query bisects to its ends and returns only those buckets.
+    """
+
+    def __init__(self, key: str = 'bill_no',
+                 amount: Callable[[Dict[str, Any]], float] = bill_total,
+                 day: Callable[[Dict[str, Any]], Optional[str]] = bill_day,
+                 method: Callable[[Dict[str, Any]], str] = bill_method):
+        self.key = key
+        self._amount = amount
+        self._day = day
+        self._method = method
+        self.recount(())
+
+    def recount(self, bills: Iterable[Dict[str, Any]]) -> None:
+        """Start over from a full list of bills"""
+        self._sums: Dict[str, Dict[str, float]] = {bucket: {} for bucket in BUCKETS}
+        self._counts: Dict[str, Dict[str, int]] = {bucket: {} for bucket in BUCKETS}
+        self._sorted: Dict[str, List[str]] = {'day': [], 'month': []}
+        self._shares: Dict[Any, List[Tuple[Dict[str, str], float]]] = {}
+        for bill in bills:
+            self.add(bill)
+
+    def _buckets(self, bill: Dict[str, Any]) -> Dict[str, str]:
+        buckets = {'method': self._method(bill)}
+        day = self._day(bill)
+        if day:
+            buckets['day'] = day
+            buckets['month'] = day[:7]
+        return buckets
+
+    def _apply(self, buckets: Dict[str, str], amount: float, sign: int) -> None:
+        for bucket, label in buckets.items():
+            sums, counts = self._sums[bucket], self._counts[bucket]
+            counts[label] = counts.get(label, 0) + sign
+            if counts[label] == 0:
+                del counts[label], sums[label]
+                if bucket in self._sorted:
+                    labels = self._sorted[bucket]
+                    del labels[bisect.bisect_left(labels, label)]
+                continue
+            if label not in sums:
+                sums[label] = 0.0
+                if bucket in self._sorted:
+                    bisect.insort(self._sorted[bucket], label)
+            sums[label] += sign * amount
+
+    def add(self, bill: Dict[str, Any]) -> None:
+        share = (self._buckets(bill), self._amount(bill))
+        self._shares.setdefault(bill.get(self.key), []).append(share)
+        self._apply(share[0], share[1], 1)
+
+    def update(self, bill: Dict[str, Any]) -> None:
+        """Re-bucket a bill that changed (the first one with its key)"""
+        shares = self._shares.get(bill.get(self.key))
+        if not shares:
+            self.add(bill)
+            return
+        self._apply(shares[0][0], shares[0][1], -1)
+        shares[0] = (self._buckets(bill), self._amount(bill))
+        self._apply(shares[0][0], shares[0][1], 1)
+
+    def remove(self, key_value: Any, first_only: bool = False) -> None:
+        """Forget the bills with this key (only the oldest with first_only)"""
+        shares = self._shares.pop(key_value, [])
+        if first_only and len(shares) > 1:
+            self._shares[key_value] = shares[1:]
+            shares = shares[:1]
+        for buckets, amount in shares:
+            self._apply(buckets, amount, -1)
+
+    def series(self, bucket: str = 'day', start: Optional[str] = None,
+               end: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(label, revenue) for the day or month buckets in [start, end],
+        oldest first. Bounds are labels of the same bucket ('2025-01-16' or
+        '2025-01'); None leaves that side open."""
+        labels = self._sorted[bucket]
+        lo = 0 if start is None else bisect.bisect_left(labels, start)
+        hi = len(labels) if end is None else bisect.bisect_right(labels, end)
+        sums = self._sums[bucket]
+        return [(label, sums[label]) for label in labels[lo:hi]]
+
+    def total(self, bucket: str = 'day', start: Optional[str] = None,
+              end: Optional[str] = None) -> float:
+        return sum(amount for _, amount in self.series(bucket, start, end))
+
+    def on(self, day: str) -> float:
+        return self._sums['day'].get(day, 0.0)
+
+    def by_method(self) -> Dict[str, float]:
+        return dict(self._sums['method'])
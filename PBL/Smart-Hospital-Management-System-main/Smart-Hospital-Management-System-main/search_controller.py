@@ -0,0 +1,142 @@
+import queue
+import threading
+import tkinter as tk
+from typing import Dict, List, Any, Callable, Optional, Sequence
+
+# One daemon thread runs the filtering for every screen
+_jobs: "queue.Queue[tuple]" = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run_jobs() -> None:
+    while True:
+        controller, generation, records, query = _jobs.get()
+        if controller is None:
+            try:
+                records()  # a warm-up task
+            except Exception as e:
+                print(f"Search warm-up failed: {e}")
+            continue
+        controller._run(generation, records, query)
+
+
+def _submit(job: tuple) -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_jobs, name='search-worker', daemon=True)
+            _worker.start()
+    _jobs.put(job)
+
+
+class SearchController:
+    """Debounced live filter that keeps typing off the Tk thread.
+
+    request(query) waits ``delay`` ms for typing to settle, takes the
+    records from ``load()`` (the data manager's cached list) and filters
+    them with ``matches(record, query)`` on a worker thread. Only the
+    newest query counts: older ones stop at their next checkpoint and
+    their results are dropped. Results are handed to ``show(results)`` on
+    the Tk thread, picked up by polling with after().
+
+    With ``narrow(source, query)``, load() may return anything cheap
+    that leads to the records, e.g. the collection a search index is kept
+    for; narrow runs on the worker, so it may build or fetch the index
+    there, and returns the candidate records that ``matches`` still has to
+    confirm (matches may then be None if the candidates are the answer).
+    warm(task) runs such a build ahead of the first search.
+    """
+
+    # Records filtered between checks for a newer query
+    CHECK_EVERY = 2048
+
+    def __init__(self, widget: tk.Misc, load: Callable[[], Any],
+                 matches: Optional[Callable[[Dict[str, Any], Any], bool]],
+                 show: Callable[[List[Dict[str, Any]]], None],
+                 delay: int = 250, poll: int = 25,
+                 narrow: Optional[Callable[[Any, Any], Sequence[Dict[str, Any]]]] = None):
+        self.widget = widget
+        self.load = load
+        self.matches = matches
+        self.show = show
+        self.delay = delay
+        self.poll = poll
+        self.narrow = narrow
+
+        self._generation = 0
+        self._answered = 0
+        self._pending = None
+        self._polling = False
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+
+    def request(self, query: Any) -> None:
+        """Search for query once input has been quiet for ``delay`` ms"""
+        self._cancel_pending()
+        self._pending = self.widget.after(self.delay, self._start, query)
+
+    def run_now(self, query: Any) -> None:
+        """Search immediately (e.g. for a filter picked from a combobox)"""
+        self._cancel_pending()
+        self._start(query)
+
+    def warm(self, task: Callable[[], Any]) -> None:
+        """Run task() on the worker now, e.g. to build the index narrow
+        will need, so the first search does not wait for it"""
+        _submit((None, 0, task, None))
+
+    def _cancel_pending(self) -> None:
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _start(self, query: Any) -> None:
+        self._pending = None
+        self._generation += 1
+        _submit((self, self._generation, self.load(), query))
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll, self._poll)
+
+    def _run(self, generation: int, records: Any, query: Any) -> None:
+        """Worker thread: filter, giving up as soon as a newer query exists"""
+        try:
+            if self.narrow is not None:
+                records = self.narrow(records, query)
+            if self.matches is None:
+                results = list(records)
+            else:
+                results = []
+                for i, record in enumerate(records):
+                    if i % self.CHECK_EVERY == 0 and generation != self._generation:
+                        return
+                    if self.matches(record, query):
+                        results.append(record)
+        except Exception as e:
+            results = e
+        self._results.put((generation, results))
+
+    def _poll(self) -> None:
+        latest = None
+        while True:
+            try:
+                generation, results = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                latest = results
+                self._answered = generation
+
+        if isinstance(latest, Exception):
+            print(f"Search failed: {latest}")
+        elif latest is not None:
+            self.show(latest)
+
+        if self._answered == self._generation:
+            self._polling = False
+            return
+        try:
+            self.widget.after(self.poll, self._poll)
+        except tk.TclError:
+            # The screen was closed while a search was running
+            self._polling = False
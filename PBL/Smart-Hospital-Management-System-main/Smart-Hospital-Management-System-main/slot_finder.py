@@ -0,0 +1,178 @@
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Callable, Tuple, Union
+
+from appointment_index import AppointmentSlotIndex, DAY_MINUTES
+from doctor_availability import AvailabilityTable, ALL_DAYS
+
+# Occupancy is tracked in 5-minute blocks: bit i of a day mask covers
+# minutes [5i, 5i + 5)
+BLOCK_MINUTES = 5
+DAY_BLOCKS = DAY_MINUTES // BLOCK_MINUTES
+FULL_DAY = (1 << DAY_BLOCKS) - 1
+
+
+def _blocks(start: int, end: int) -> int:
+    """Mask of the blocks touched by minutes [start, end)"""
+    first = max(start, 0) // BLOCK_MINUTES
+    last = min(-(-end // BLOCK_MINUTES), DAY_BLOCKS)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def _minutes(hhmm: str) -> int:
+    hour, minute = hhmm.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+class SlotFinder:
+    """Finds the earliest free appointment slots for one or more doctors.
+
+    Each doctor-day is reduced to an occupancy bitmap (a Python int, one
+    bit per 5-minute block) combining the working hours from the doctor's
+    availability, breaks from the doctor's schedule and the bookings in an
+    AppointmentSlotIndex. Every start that leaves ``duration`` minutes free
+    is then found with a handful of shifts and ANDs instead of trying times
+    one by one.
+
+    availability is the AvailabilityTable of doctors.json; doctors without
+    a readable timing get ``default_hours``. schedules, if given, is get_doctor_schedule(doctor_id, 'YYYY-MM-DD') as used by
+    doctor_management (a list of {'start_time', 'end_time', 'breaks',
+    'available'}), which overrides the availability for that date.
+    """
+
+    def __init__(self, slot_index: AppointmentSlotIndex,
+                 availability: AvailabilityTable,
+                 schedules: Optional[Callable[[Any, str], Any]] = None,
+                 default_hours: Tuple[int, int] = (9 * 60, 18 * 60)):
+        self.slot_index = slot_index
+        self.availability = availability
+        self.schedules = schedules
+        self.default_hours = default_hours
+        # (doctor_id, date) -> mask of blocks outside working hours or in breaks
+        self._base: Dict[Tuple[Any, str], int] = {}
+
+    def invalidate(self) -> None:
+        """Forget cached working hours after availability or schedules change"""
+        self._base.clear()
+
+    def _base_mask(self, doctor_id: Any, day: date) -> int:
+        key = (doctor_id, day.isoformat())
+        mask = self._base.get(key)
+        if mask is not None:
+            return mask
+
+        schedule = self.schedules(doctor_id, key[1]) if self.schedules else None
+        if isinstance(schedule, list):
+            schedule = schedule[0] if schedule else None
+        if schedule:
+            if not schedule.get('available', True):
+                mask = FULL_DAY
+            else:
+                start, end = _minutes(schedule['start_time']), _minutes(schedule['end_time'])
+                mask = FULL_DAY & ~_blocks(start, end)
+                for break_start, break_end in schedule.get('breaks', []):
+                    mask |= _blocks(_minutes(break_start), _minutes(break_end))
+        else:
+            days, start, end = self.availability.window(doctor_id) or (ALL_DAYS, None, None)
+            if not days >> day.weekday() & 1:
+                mask = FULL_DAY
+            else:
+                if start is None:
+                    start, end = self.default_hours
+                mask = FULL_DAY & ~_blocks(start, end)
+
+        self._base[key] = mask
+        return mask
+
+    def occupancy(self, doctor_id: Any, day: date) -> int:
+        """Busy-block bitmap of one doctor-day"""
+        mask = self._base_mask(doctor_id, day)
+        days = self.slot_index.days
+        booked = days.get((doctor_id, day.isoformat()))
+        if booked is not None:
+            for start, end, _ in booked.slots:
+                mask |= _blocks(start, end)
+        # Late bookings from the day before that run past midnight
+        spill = days.get((doctor_id, (day - timedelta(days=1)).isoformat()))
+        if spill is not None:
+            for start, end, _ in spill.slots:
+                if end > DAY_MINUTES:
+                    mask |= _blocks(start - DAY_MINUTES, end - DAY_MINUTES)
+        return mask
+
+    def free_starts(self, doctor_id: Any, day: date, duration: int,
+                    step: int = 15) -> List[int]:
+        """Start minutes (multiples of step) with duration free minutes after"""
+        free = FULL_DAY & ~self.occupancy(doctor_id, day)
+        # Bit i of runs is set when blocks i .. i+length-1 are all free
+        runs = free
+        length = -(-duration // BLOCK_MINUTES)
+        covered = 1
+        while covered < length and runs:
+            shift = min(covered, length - covered)
+            runs &= runs >> shift
+            covered += shift
+        runs &= _aligned(step)
+
+        starts = []
+        while runs:
+            low = runs & -runs
+            starts.append((low.bit_length() - 1) * BLOCK_MINUTES)
+            runs ^= low
+        return starts
+
+    def find(self, doctor_ids: Iterable[Any], start_date: Union[date, str],
+             end_date: Union[date, str], duration: int, limit: int = 5,
+             step: int = 15, not_before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Earliest ``limit`` free slots of ``duration`` minutes for any of
+        doctor_ids between start_date and end_date (inclusive).
+
+        Slots are returned as appointment-shaped dicts (doctor_id, date,
+        time, duration) ordered by time, ready for AppointmentSlotIndex.validate.
+        not_before defaults to now, so past slots are never offered.
+        """
+        if isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date)
+        if isinstance(end_date, str):
+            end_date = date.fromisoformat(end_date)
+        if not_before is None:
+            not_before = datetime.now()
+        doctor_ids = list(doctor_ids)
+
+        found = []
+        day = start_date
+        # Days are visited in order, so once a day fills the quota no later
+        # day can contribute an earlier slot
+        while day <= end_date and len(found) < limit:
+            day_slots = []
+            midnight = datetime.combine(day, datetime.min.time())
+            for position, doctor_id in enumerate(doctor_ids):
+                for minute in self.free_starts(doctor_id, day, duration, step):
+                    if midnight + timedelta(minutes=minute) >= not_before:
+                        day_slots.append((minute, position, doctor_id))
+            day_slots.sort()
+            for minute, _, doctor_id in day_slots:
+                found.append({
+                    'doctor_id': doctor_id,
+                    'date': day.isoformat(),
+                    'time': f"{minute // 60:02d}:{minute % 60:02d}",
+                    'duration': f"{duration} min"
+                })
+            day += timedelta(days=1)
+        return found[:limit]
+
+
+_ALIGNED: Dict[int, int] = {}
+
+
+def _aligned(step: int) -> int:
+    """Mask of the blocks whose start minute is a multiple of step"""
+    mask = _ALIGNED.get(step)
+    if mask is None:
+        mask = 0
+        for block in range(DAY_BLOCKS):
+            if (block * BLOCK_MINUTES) % step == 0:
+                mask |= 1 << block
+        _ALIGNED[step] = mask
+    return mask
@@ -0,0 +1,740 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Union
+
+from appointment_index import AppointmentSlotIndex
+from file_lock import file_lock
+from record_version import check_version
+from trigram_index import TrigramIndex
+from dashboard_stats import DashboardStats
+from revenue_rollup import RevenueRollup
+
+# Version of the table layout below, stored in PRAGMA user_version
+SCHEMA_VERSION = 1
+
+# Fields copied out of the JSON document into indexed columns
+INDEXED_COLUMNS = ('patient_id', 'doctor_id', 'date')
+
+# Collections whose primary key is not 'id'
+KEY_FIELDS = {'billing': 'bill_no'}
+
+_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _column_value(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+class SQLiteStorage:
+    """Stores every collection as a table in one SQLite database.
+
+    Each row keeps the full record as a JSON document next to copies of
+    its key, patient_id, doctor_id and date, which are indexed. The
+    database runs in WAL mode, so other processes can read while one
+    writes, and every write is its own transaction.
+
+    Implements the same load/insert/update/replace/version interface as
+    the backends in storage_engine, plus get() and delete().
+    """
+
+    def __init__(self, db_path: Union[str, Path], collections: Iterable[str] = (),
+                 key_fields: Optional[Dict[str, str]] = None):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+
+        self._keys = dict(self._conn.execute('SELECT name, key_field FROM _collections'))
+        self._versions = {name: 0 for name in self._keys}
+        # collection -> (version, records, by_id)
+        self._cache: Dict[str, tuple] = {}
+        self._data_version = self._poll_data_version()
+
+        key_fields = {**KEY_FIELDS, **(key_fields or {})}
+        for name in collections:
+            self.create_collection(name, key_fields.get(name, 'id'))
+
+    # ---- schema ----
+    def _migrate(self) -> None:
+        """Bring an older database up to SCHEMA_VERSION, one step at a time"""
+        with self._lock, self._conn:
+            current = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if current > SCHEMA_VERSION:
+                raise ValueError(f"{self.db_path} uses schema {current}, "
+                                 f"newer than supported ({SCHEMA_VERSION})")
+            for version in range(current + 1, SCHEMA_VERSION + 1):
+                MIGRATIONS[version](self._conn)
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def create_collection(self, name: str, key_field: str = 'id') -> None:
+        """Create the table and indexes for a collection if missing"""
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid collection name: {name}")
+        with self._lock:
+            if name not in self._keys:
+                with self._conn:
+                    _create_table(self._conn, name)
+                    self._conn.execute('INSERT INTO _collections (name, key_field) VALUES (?, ?)',
+                                       (name, key_field))
+                self._keys[name] = key_field
+            self._versions.setdefault(name, 0)
+
+    def collections(self) -> List[str]:
+        return list(self._keys)
+
+    def key_field(self, collection: str) -> str:
+        return self._keys[collection]
+
+    def _table(self, collection: str) -> str:
+        if collection not in self._keys:
+            raise ValueError(f"Unknown collection: {collection}")
+        return f'"{collection}"'
+
+    def _row(self, collection: str, record: Dict[str, Any]) -> tuple:
+        return (_column_value(record.get(self._keys[collection])),
+                *(_column_value(record.get(field)) for field in INDEXED_COLUMNS),
+                json.dumps(record))
+
+    def _by_id(self, collection: str, records: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        # First record wins on duplicate keys, matching get()'s ORDER BY seq
+        key = self._keys[collection]
+        by_id = {}
+        for record in records:
+            if key in record:
+                by_id.setdefault(record[key], record)
+        return by_id
+
+    # ---- change tracking ----
+    def _poll_data_version(self) -> int:
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def version(self, collection: str) -> int:
+        """Change counter for a collection, used to validate derived indexes.
+
+        Commits from other connections change PRAGMA data_version; since
+        it does not say which table changed, every collection is bumped.
+        """
+        with self._lock:
+            data_version = self._poll_data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                for name in self._versions:
+                    self._versions[name] += 1
+            return self._versions[collection]
+
+    def _written(self, collection: str, before: int) -> Optional[tuple]:
+        """Bump the version after a write; returns the cache entry if it was
+        current before the write (so it can be patched), else drops it"""
+        self._versions[collection] += 1
+        cached = self._cache.get(collection)
+        if cached is None or cached[0] != before:
+            self._cache.pop(collection, None)
+            return None
+        cached = (self._versions[collection], cached[1], cached[2])
+        self._cache[collection] = cached
+        return cached
+
+    # ---- reads ----
+    def load(self, collection: str) -> List[Dict[str, Any]]:
+        """Return the records of a collection (a fresh list, shared dicts)"""
+        with self._lock:
+            version = self.version(collection)
+            cached = self._cache.get(collection)
+            if cached is not None and cached[0] == version:
+                return list(cached[1])
+
+            rows = self._conn.execute(f'SELECT data FROM {self._table(collection)} ORDER BY seq')
+            records = [json.loads(data) for (data,) in rows]
+            self._cache[collection] = (version, records, self._by_id(collection, records))
+            return list(records)
+
+    def get(self, collection: str, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Look up one record by key through the primary key index"""
+        with self._lock:
+            version = self.version(collection)
+            cached = self._cache.get(collection)
+            if cached is not None and cached[0] == version:
+                return cached[2].get(record_id)
+            row = self._conn.execute(
+                f'SELECT data FROM {self._table(collection)} WHERE id = ? ORDER BY seq LIMIT 1',
+                (_column_value(record_id),)).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def select(self, collection: str, **columns: Any) -> List[Dict[str, Any]]:
+        """Records whose indexed columns (id, patient_id, doctor_id, date)
+        equal the given values, answered by SQLite from its indexes"""
+        unknown = set(columns) - {'id', *INDEXED_COLUMNS}
+        if unknown:
+            raise ValueError(f"Not an indexed column: {', '.join(sorted(unknown))}")
+        where = ' AND '.join(f'{column} = ?' for column in columns) or '1'
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT data FROM {self._table(collection)} WHERE {where} ORDER BY seq',
+                [_column_value(value) for value in columns.values()])
+            return [json.loads(data) for (data,) in rows]
+
+    # ---- writes ----
+    def refresh(self, collection: str) -> None:
+        """Nothing to do: version() already sees commits by other processes"""
+
+    def replace(self, collection: str, records: List[Dict[str, Any]]) -> None:
+        """Overwrite a whole collection in one transaction"""
+        table = self._table(collection)
+        with self._lock:
+            before = self.version(collection)
+            with self._conn:
+                self._conn.execute(f'DELETE FROM {table}')
+                self._conn.executemany(
+                    f'INSERT INTO {table} (id, patient_id, doctor_id, date, data) VALUES (?, ?, ?, ?, ?)',
+                    [self._row(collection, record) for record in records])
+            self._written(collection, before)
+            records = list(records)
+            self._cache[collection] = (self._versions[collection], records,
+                                       self._by_id(collection, records))
+
+    def insert(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append one record to a collection"""
+        table = self._table(collection)
+        with self._lock:
+            before = self.version(collection)
+            with self._conn:
+                self._conn.execute(
+                    f'INSERT INTO {table} (id, patient_id, doctor_id, date, data) VALUES (?, ?, ?, ?, ?)',
+                    self._row(collection, record))
+            cached = self._written(collection, before)
+            if cached is not None:
+                cached[1].append(record)
+                key = self._keys[collection]
+                if key in record:
+                    cached[2].setdefault(record[key], record)
+            return record
+
+    def update(self, collection: str, record_id: Any,
+               changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to the record with the given key, None if not found"""
+        table = self._table(collection)
+        with self._lock:
+            before = self.version(collection)
+            record = self.get(collection, record_id)
+            if record is None:
+                return None
+            updated = {**record, **changes}
+            with self._conn:
+                self._conn.execute(
+                    f'UPDATE {table} SET id = ?, patient_id = ?, doctor_id = ?, date = ?, data = ? '
+                    f'WHERE seq = (SELECT seq FROM {table} WHERE id = ? ORDER BY seq LIMIT 1)',
+                    (*self._row(collection, updated), _column_value(record_id)))
+            if self._written(collection, before) is not None:
+                # Patch the cached dict in place, as the other backends do
+                record.update(changes)
+                return record
+            return updated
+
+    def delete(self, collection: str, record_id: Any) -> bool:
+        """Remove the record with the given key, False if not found"""
+        table = self._table(collection)
+        with self._lock:
+            before = self.version(collection)
+            with self._conn:
+                cursor = self._conn.execute(
+                    f'DELETE FROM {table} WHERE seq = '
+                    f'(SELECT seq FROM {table} WHERE id = ? ORDER BY seq LIMIT 1)',
+                    (_column_value(record_id),))
+            if cursor.rowcount == 0:
+                return False
+            cached = self._written(collection, before)
+            if cached is not None:
+                record = cached[2].pop(record_id, None)
+                if record is not None:
+                    records = cached[1]
+                    del records[next(i for i, r in enumerate(records) if r is record)]
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {name: self._conn.execute(f'SELECT COUNT(*) FROM {self._table(name)}').fetchone()[0]
+                      for name in self._keys}
+            return {
+                'records': counts,
+                'cached': [name for name in self._cache],
+                'schema_version': SCHEMA_VERSION
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _create_table(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS "{name}" (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT,
+        patient_id TEXT,
+        doctor_id TEXT,
+        date TEXT,
+        data TEXT NOT NULL
+    )''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}_id" ON "{name}" (id)')
+    for column in INDEXED_COLUMNS:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}_{column}" ON "{name}" ({column})')
+
+
+def _migration_1(conn: sqlite3.Connection) -> None:
+    """Initial layout: a registry of collections and their key fields"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS _collections (
+        name TEXT PRIMARY KEY,
+        key_field TEXT NOT NULL
+    )''')
+
+
+# schema version -> step that upgrades from the previous version
+MIGRATIONS = {
+    1: _migration_1,
+}
+
+
+# ==================== JSON IMPORT ====================
+
+def _records_from_json(name: str, data: Any) -> Optional[List[Dict[str, Any]]]:
+    """Normalize the JSON layouts found in the data folders to a record list:
+    plain lists, {"<name>": [...]} wrappers and username -> info mappings."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        if isinstance(data.get(name), list):
+            return data[name]
+        if data and all(isinstance(v, dict) for v in data.values()):
+            return [{'id': key, **value} for key, value in data.items()]
+    return None
+
+
+def _guess_key_field(name: str, records: List[Dict[str, Any]]) -> str:
+    if name in KEY_FIELDS:
+        return KEY_FIELDS[name]
+    first = records[0] if records else {}
+    if 'id' in first or not first:
+        return 'id'
+    # e.g. bills.json uses bill_id, lab_reports.json report_id
+    for field in first:
+        if field.endswith('_id'):
+            return field
+    return 'id'
+
+
+def migrate_json_dir(json_dir: Union[str, Path], db_path: Union[str, Path, None] = None,
+                     key_fields: Optional[Dict[str, str]] = None,
+                     overwrite: bool = False) -> Dict[str, int]:
+    """Import every <name>.json in json_dir into table <name> of db_path
+    (default <json_dir>/hospital.db). Returns imported record counts.
+
+    Tables that already hold records are left alone unless overwrite is
+    set, so running the import twice does not duplicate data. Files that
+    are not record collections (e.g. config.json) are skipped. The key
+    field of a new table comes from key_fields, or is guessed from the
+    first record ('id', else its first '*_id' field).
+    """
+    json_dir = Path(json_dir).expanduser()
+    storage = SQLiteStorage(db_path or json_dir / 'hospital.db')
+    imported = {}
+    try:
+        for path in sorted(json_dir.glob('*.json')):
+            name = path.stem
+            if not _NAME.match(name):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    records = _records_from_json(name, json.load(f))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Skipping {path}: {e}")
+                continue
+            if records is None:
+                continue
+
+            if name in storage.collections():
+                if storage.load(name) and not overwrite:
+                    continue
+            else:
+                key = (key_fields or {}).get(name) or _guess_key_field(name, records)
+                storage.create_collection(name, key)
+            storage.replace(name, records)
+            imported[name] = len(records)
+    finally:
+        storage.close()
+    return imported
+
+
+# ==================== main.py DATA MANAGER ====================
+
+class SQLiteDataManager:
+    """SQLite-backed drop-in for main.DataManager.
+
+    Keeps the same attributes and methods (the *_file paths are accepted by
+    save_data/load_data and name the table they map to). On first use the
+    JSON files in data_dir are imported into data_dir/hospital.db.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or os.path.join(os.path.expanduser('~'), 'hospital_data')
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        self.patients_file = os.path.join(self.data_dir, "patients.json")
+        self.doctors_file = os.path.join(self.data_dir, "doctors.json")
+        self.appointments_file = os.path.join(self.data_dir, "appointments.json")
+        self.pharmacy_file = os.path.join(self.data_dir, "pharmacy.json")
+        self.lab_file = os.path.join(self.data_dir, "lab_reports.json")
+        self.billing_file = os.path.join(self.data_dir, "billing.json")
+        self.users_file = os.path.join(self.data_dir, "users.json")
+        self._tables = {
+            self.patients_file: 'patients',
+            self.doctors_file: 'doctors',
+            self.appointments_file: 'appointments',
+            self.pharmacy_file: 'pharmacy',
+            self.lab_file: 'lab_reports',
+            self.billing_file: 'billing',
+            self.users_file: 'users'
+        }
+        # Prefix of the IDs generate_id hands out per table
+        self.id_prefixes = {
+            'patients': 'P',
+            'doctors': 'D',
+            'appointments': 'A',
+            'pharmacy': 'M',
+            'lab_reports': 'L',
+            'billing': 'B'
+        }
+
+        db_path = os.path.join(self.data_dir, 'hospital.db')
+        if not os.path.exists(db_path):
+            migrate_json_dir(self.data_dir, db_path)
+        self.storage = SQLiteStorage(db_path, self._tables.values())
+        # Held by _write across a record's version or ID check and its write
+        self._write_lock = file_lock(db_path + '.lock')
+
+        # Undo stack for billing operations
+        self.billing_undo_stack = []
+
+        # Appointment queue
+        self.appointment_queue = deque()
+
+        # (appointments version, AppointmentSlotIndex)
+        self._slot_index = None
+
+        # Fields covered by text search, and table -> (version, TrigramIndex)
+        self.text_fields = {
+            'patients': ('name', 'id', 'contact'),
+            'doctors': ('name', 'id', 'specialization', 'contact'),
+            'pharmacy': ('name', 'id', 'category'),
+            'lab_reports': ('patient_name', 'id', 'test'),
+            'billing': ('bill_no', 'patient_name')
+        }
+        self._text_indexes = {}
+
+        # Running dashboard counters, each table's part tagged with its version
+        self.stats = DashboardStats()
+
+        # (billing version, RevenueRollup)
+        self._revenue = None
+
+    def _table(self, filepath):
+        if filepath not in self._tables:
+            raise ValueError(f"Unknown data file: {filepath}")
+        return self._tables[filepath]
+
+    def save_data(self, filepath, data):
+        """Replace the table behind a data file"""
+        if filepath == self.users_file and isinstance(data, dict):
+            data = [{'id': uname, **info} for uname, info in data.items()]
+        self.storage.replace(self._table(filepath), data)
+
+    def load_data(self, filepath):
+        """Load the table behind a data file"""
+        records = self.storage.load(self._table(filepath))
+        if filepath == self.users_file:
+            return {u['id']: {k: v for k, v in u.items() if k != 'id'} for u in records}
+        return records
+
+    def close(self):
+        self.storage.close()
+
+    def text_index(self, filepath):
+        """Trigram index over the text fields of a table, rebuilt only when
+        the table changed in a way _write() did not see"""
+        table = self._table(filepath)
+        version = self.storage.version(table)
+        cached = self._text_indexes.get(table)
+        if cached is None or cached[0] != version:
+            index = TrigramIndex(self.text_fields[table], self.storage.load(table),
+                                 self.storage.key_field(table))
+            cached = (version, index)
+            self._text_indexes[table] = cached
+        return cached[1]
+
+    def search_records(self, filepath, term, prefix=False):
+        """Records with term in one of the table's text fields"""
+        return self.text_index(filepath).search(term, prefix)
+
+    def fuzzy_search(self, filepath, term, limit=10, fields=None):
+        """Closest matches for a possibly misspelt term, best first"""
+        return self.text_index(filepath).fuzzy(term, limit, fields=fields)
+
+    def dashboard_stats(self):
+        """Dashboard counters, recounting only tables changed elsewhere"""
+        for table in self.stats.rules:
+            version = self.storage.version(table)
+            if self.stats.source(table) != version:
+                self.stats.recount(table, self.storage.load(table), version)
+        return self.stats
+
+    def revenue_rollup(self):
+        """Revenue summed per day, month and payment method"""
+        version = self.storage.version('billing')
+        if self._revenue is None or self._revenue[0] != version:
+            rollup = RevenueRollup(self.storage.key_field('billing'))
+            rollup.recount(self.storage.load('billing'))
+            self._revenue = (version, rollup)
+        return self._revenue[1]
+
+    def _write(self, table, operation, *args, expected_version=None):
+        """Run storage.insert/update/delete on a table and patch its text
+        index and dashboard counters when the write was the only change
+        since they were built.
+
+        An inserted record whose key is missing or already taken gets the
+        next free ID. Updates bump the record's version; with
+        expected_version, an update or delete is refused with
+        StaleRecordError unless the stored record is still at that version.
+        """
+        with self._write_lock:
+            if operation == 'insert':
+                record, key = args[0], self.storage.key_field(table)
+                if record.get(key) is None or self.storage.get(table, record[key]) is not None:
+                    record[key] = self.generate_id(self.id_prefixes[table],
+                                                   self.storage.load(table), key)
+                record.setdefault('version', 1)
+            else:
+                current = self.storage.get(table, args[0])
+                if current is not None:
+                    version = check_version(table, args[0], current, expected_version)
+                    if operation == 'update':
+                        args = (args[0], {**args[1], 'version': version + 1})
+            before = self.storage.version(table)
+            result = getattr(self.storage, operation)(table, *args)
+            after = self.storage.version(table)
+        if after == before:
+            return result
+        if operation == 'insert':
+            change, value = 'add', args[0]
+        elif operation == 'update':
+            change, value = 'update', result
+        else:
+            change, value = 'remove', args[0]
+        # storage.delete drops only the first record with the key
+        first_only = {'first_only': True} if change == 'remove' else {}
+
+        cached = self._text_indexes.get(table)
+        if cached is not None and cached[0] == before and after == before + 1:
+            getattr(cached[1], change)(value, **first_only)
+            self._text_indexes[table] = (after, cached[1])
+        if table in self.stats.rules and self.stats.source(table) == before and after == before + 1:
+            getattr(self.stats, change)(table, value, **first_only)
+            self.stats.set_source(table, after)
+        if table == 'billing' and self._revenue is not None and self._revenue[0] == before \
+                and after == before + 1:
+            getattr(self._revenue[1], change)(value, **first_only)
+            self._revenue = (after, self._revenue[1])
+        return result
+
+    # Patient operations
+    def get_patients(self):
+        return self.storage.load('patients')
+
+    def add_patient(self, patient):
+        self._write('patients', 'insert', patient)
+
+    def update_patient(self, patient_id, updated_data, expected_version=None):
+        return self._write('patients', 'update', patient_id, updated_data,
+                           expected_version=expected_version) is not None
+
+    def delete_patient(self, patient_id, expected_version=None):
+        self._write('patients', 'delete', patient_id, expected_version=expected_version)
+
+    def get_patient_by_id(self, patient_id):
+        """Primary key index lookup"""
+        return self.storage.get('patients', patient_id)
+
+    # Doctor operations
+    def get_doctors(self):
+        return self.storage.load('doctors')
+
+    def add_doctor(self, doctor):
+        self._write('doctors', 'insert', doctor)
+
+    def update_doctor(self, doctor_id, updated_data, expected_version=None):
+        return self._write('doctors', 'update', doctor_id, updated_data,
+                           expected_version=expected_version) is not None
+
+    def delete_doctor(self, doctor_id, expected_version=None):
+        self._write('doctors', 'delete', doctor_id, expected_version=expected_version)
+
+    # Appointment operations
+    def get_appointments(self):
+        return self.storage.load('appointments')
+
+    def add_appointment(self, appointment):
+        before = self.storage.version('appointments')
+        self._write('appointments', 'insert', appointment)
+        self.appointment_queue.append(appointment)
+        slots = self._slots_following(before)
+        if slots is not None:
+            slots.add(appointment)
+
+    def update_appointment(self, appointment_id, updated_data, expected_version=None):
+        before = self.storage.version('appointments')
+        updated = self._write('appointments', 'update', appointment_id, updated_data,
+                              expected_version=expected_version)
+        if updated is None:
+            return False
+        slots = self._slots_following(before)
+        if slots is not None:
+            slots.update(updated)
+        return True
+
+    def delete_appointment(self, appointment_id, expected_version=None):
+        before = self.storage.version('appointments')
+        if self._write('appointments', 'delete', appointment_id,
+                       expected_version=expected_version):
+            slots = self._slots_following(before)
+            if slots is not None:
+                slots.remove(appointment_id)
+
+    def appointment_slots(self):
+        """Per-doctor, per-day interval index of booked appointments"""
+        version = self.storage.version('appointments')
+        if self._slot_index is None or self._slot_index[0] != version:
+            self._slot_index = (version, AppointmentSlotIndex(self.storage.load('appointments')))
+        return self._slot_index[1]
+
+    def _slots_following(self, before):
+        """The slot index if it was current before a write that was the only
+        change since, so it can be patched instead of rebuilt"""
+        if self._slot_index is None or self._slot_index[0] != before:
+            return None
+        after = self.storage.version('appointments')
+        if after != before + 1:
+            return None
+        self._slot_index = (after, self._slot_index[1])
+        return self._slot_index[1]
+
+    # Pharmacy operations
+    def get_medicines(self):
+        return self.storage.load('pharmacy')
+
+    def add_medicine(self, medicine):
+        self._write('pharmacy', 'insert', medicine)
+
+    def update_medicine(self, medicine_id, updated_data, expected_version=None):
+        return self._write('pharmacy', 'update', medicine_id, updated_data,
+                           expected_version=expected_version) is not None
+
+    def delete_medicine(self, medicine_id, expected_version=None):
+        self._write('pharmacy', 'delete', medicine_id, expected_version=expected_version)
+
+    # Lab operations
+    def get_lab_reports(self):
+        return self.storage.load('lab_reports')
+
+    def add_lab_report(self, report):
+        self._write('lab_reports', 'insert', report)
+
+    def update_lab_report(self, report_id, updated_data, expected_version=None):
+        return self._write('lab_reports', 'update', report_id, updated_data,
+                           expected_version=expected_version) is not None
+
+    def delete_lab_report(self, report_id, expected_version=None):
+        self._write('lab_reports', 'delete', report_id, expected_version=expected_version)
+
+    # Billing operations
+    def get_bills(self):
+        return self.storage.load('billing')
+
+    def update_bill(self, bill_no, updated_data, expected_version=None):
+        return self._write('billing', 'update', bill_no, updated_data,
+                           expected_version=expected_version) is not None
+
+    def add_bill(self, bill):
+        self.billing_undo_stack.append(('add', bill))
+        self._write('billing', 'insert', bill)
+
+    def undo_last_bill(self):
+        """Undo last billing operation"""
+        if self.billing_undo_stack:
+            operation, bill = self.billing_undo_stack.pop()
+            if operation == 'add':
+                self._write('billing', 'delete', bill['bill_no'])
+                return True
+        return False
+
+    # User operations
+    def get_users(self):
+        """Return list of user dicts with 'id' set to the username"""
+        return self.storage.load('users')
+
+    def verify_user(self, username, password):
+        user = self.storage.get('users', username)
+        if user is not None and user.get('password') == password:
+            return dict(user)
+        return None
+
+    def add_user(self, username, password, role, name, **kwargs):
+        """Add a new user (plain-text password, as in main.DataManager)"""
+        with self._write_lock:
+            if self.storage.get('users', username) is not None:
+                raise ValueError('Username already exists')
+            user = {'id': username, 'password': password, 'role': role, 'name': name, **kwargs}
+            self.storage.insert('users', user)
+        return dict(user)
+
+    def generate_id(self, prefix, existing_list, key='id'):
+        """Generate unique ID (key is 'bill_no' for bills)"""
+        if not existing_list:
+            return f"{prefix}001"
+
+        max_num = 0
+        for item in existing_list:
+            if key in item:
+                num_part = int(item[key][len(prefix):])
+                max_num = max(max_num, num_part)
+
+        return f"{prefix}{str(max_num + 1).zfill(3)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import JSON data folders into SQLite (hospital.db in each folder)')
+    parser.add_argument('dirs', nargs='*',
+                        default=['data', os.path.join('~', 'hospital_data')])
+    parser.add_argument('--overwrite', action='store_true',
+                        help='replace tables that already contain records')
+    args = parser.parse_args()
+    for json_dir in args.dirs:
+        json_dir = Path(json_dir).expanduser()
+        if not json_dir.is_dir():
+            print(f"{json_dir}: not found, skipped")
+            continue
+        imported = migrate_json_dir(json_dir, overwrite=args.overwrite)
+        summary = ', '.join(f"{name} ({count})" for name, count in imported.items()) or 'nothing new'
+        print(f"{json_dir / 'hospital.db'}: {summary}")
+
+
+if __name__ == '__main__':
+    main()
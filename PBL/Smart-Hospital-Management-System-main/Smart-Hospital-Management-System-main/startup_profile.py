@@ -0,0 +1,59 @@
+import builtins
+import sys
+import threading
+import time
+from typing import List, Optional, TextIO, Tuple
+
+
+class StartupProfile:
+    """Timing of module imports and startup stages (--profile-startup).
+
+    While installed, each import of a module that is not loaded yet is
+    timed. Modules it pulls in are charged to it, so the report shows what
+    each import line of the entry module costs. stage() records how long
+    after start a point of startup was reached.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports: List[Tuple[str, float]] = []
+        self.stages: List[Tuple[str, float]] = []
+        self._nested = threading.local()
+        self._original = None
+
+    def install(self) -> None:
+        if self._original is not None:
+            return
+        original = self._original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules or getattr(self._nested, 'depth', 0):
+                return original(name, globals, locals, fromlist, level)
+            self._nested.depth = 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._nested.depth = 0
+                self.imports.append((name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def stage(self, name: str) -> None:
+        self.stages.append((name, time.perf_counter() - self.started))
+
+    def report(self, out: Optional[TextIO] = None, limit: int = 15) -> None:
+        out = out or sys.stdout
+        total = self.stages[-1][1] if self.stages else time.perf_counter() - self.started
+        print(f"Startup profile ({total:.3f}s)", file=out)
+        print("  slowest imports:", file=out)
+        for name, seconds in sorted(self.imports, key=lambda i: -i[1])[:limit]:
+            print(f"    {seconds:8.3f}s  {name}", file=out)
+        print("  stages (since start):", file=out)
+        for name, seconds in self.stages:
+            print(f"    {seconds:8.3f}s  {name}", file=out)
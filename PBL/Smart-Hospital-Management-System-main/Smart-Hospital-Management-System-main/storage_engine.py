@@ -0,0 +1,367 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from durable_write import write_json
+from file_lock import OwnerLock
+from record_cache import RecordCache
+
+
+class JsonFileStorage:
+    """Stores each collection as one JSON list, rewritten on every change.
+
+    This is the original DataManager storage format. Parsed collections are
+    kept in a RecordCache so reads only touch the disk when a file changes.
+    Files are replaced atomically (see durable_write); with backup=True the
+    previous version of each file is kept as <name>.json.bak.
+    """
+
+    def __init__(self, files: Dict[str, Path], backup: bool = False):
+        self.files = files
+        self.backup = backup
+        self._cache = RecordCache()
+        # Bumped whenever a collection is re-read from disk or rewritten
+        self._versions = {name: 0 for name in files}
+
+        # Create files if they don't exist
+        for name, file_path in self.files.items():
+            if not file_path.exists():
+                self.replace(name, [])
+
+    def load(self, collection: str) -> List[Dict[str, Any]]:
+        """Return the records of a collection.
+
+        The returned list is a fresh copy, but the record dicts are shared
+        with the cache, so changes must be persisted through update/replace.
+        """
+        file_path = self.files[collection]
+        cached = self._cache.get(file_path)
+        if cached is not None:
+            return list(cached)
+
+        signature = self._cache.signature(file_path)
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return []
+
+        self._cache.put(file_path, data, signature)
+        self._versions[collection] += 1
+        return list(data)
+
+    def replace(self, collection: str, records: List[Dict[str, Any]]) -> None:
+        """Overwrite a whole collection"""
+        file_path = self.files[collection]
+        try:
+            write_json(file_path, records, backup=self.backup)
+        except Exception:
+            # Records may have been mutated in place before the failed write
+            self._cache.invalidate(file_path)
+            raise
+
+        # Write-through: keep the cache in sync with what is now on disk
+        self._cache.put(file_path, list(records))
+        self._versions[collection] += 1
+
+    def refresh(self, collection: str) -> None:
+        """Re-read a collection if the file changed since it was cached.
+
+        Called with the collection's file lock held, before a
+        read-modify-write. The cache's (mtime, size, inode) signature
+        changes with every rewrite by another process, so the file is only
+        parsed again when it really was replaced.
+        """
+        self.load(collection)
+
+    def insert(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Append one record to a collection"""
+        records = self.load(collection)
+        records.append(record)
+        self.replace(collection, records)
+        return record
+
+    def update(self, collection: str, record_id: str,
+               changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to the record with the given id, None if not found"""
+        records = self.load(collection)
+        for record in records:
+            if record.get('id') == record_id:
+                record.update(changes)
+                self.replace(collection, records)
+                return record
+        return None
+
+    def version(self, collection: str) -> int:
+        """Change counter for a collection, used to validate derived indexes.
+
+        A file changed on disk since it was cached is re-read first, so the
+        counter also moves for writes by other processes; otherwise this is
+        one stat() call.
+        """
+        if not self._cache.current(self.files[collection]):
+            self.load(collection)
+        return self._versions[collection]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def close(self) -> None:
+        pass
+
+
+class JournalStorage:
+    """Append-only storage: one snapshot plus one journal per collection.
+
+    Every mutation is written as a single JSON line to ``<name>.journal``
+    and applied to the in-memory collection, so a write costs O(record)
+    instead of O(collection). Once a journal grows past
+    ``compact_threshold`` bytes it is folded into the ``<name>.json``
+    snapshot, by default on a background thread.
+
+    The snapshot keeps the plain JSON-list format used by JsonFileStorage,
+    so a data directory can be switched between the two backends after a
+    ``compact()``. On startup the state is rebuilt from snapshot + journal.
+
+    Replay is idempotent for records with an ``id`` (inserts are upserts and
+    updates carry absolute values), which makes a crash between writing a
+    snapshot and deleting the rotated journal harmless.
+
+    The collections are served from this process's memory, so only one
+    JournalStorage may use a folder at a time: it holds ``journal.lock``
+    there until close(), and opening a second one, in this process or
+    another, raises RuntimeError.
+    """
+
+    def __init__(self, files: Dict[str, Path], compact_threshold: int = 1024 * 1024,
+                 background: bool = True, sync: bool = False, backup: bool = False):
+        self.files = files
+        self.backup = backup
+        self.compact_threshold = compact_threshold
+        self.background = background
+        self.sync = sync
+
+        self._lock = threading.RLock()
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_id: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self._journals: Dict[str, Any] = {}
+        self._journal_bytes: Dict[str, int] = {}
+        self._compacting: Dict[str, threading.Thread] = {}
+        self._versions = {name: 0 for name in files}
+
+        self._owner_locks: List[OwnerLock] = []
+        try:
+            for folder in sorted({path.parent for path in files.values()}):
+                owner = OwnerLock(folder / 'journal.lock')
+                owner.acquire()
+                self._owner_locks.append(owner)
+        except RuntimeError:
+            self._release_owner_locks()
+            raise
+
+        for name in self.files:
+            self._open(name)
+
+    # ---- paths ----
+    def _journal_path(self, collection: str) -> Path:
+        return self.files[collection].with_suffix('.journal')
+
+    def _rotated_path(self, collection: str) -> Path:
+        return self.files[collection].with_suffix('.journal.old')
+
+    # ---- startup ----
+    def _open(self, collection: str) -> None:
+        snapshot = self.files[collection]
+        try:
+            with open(snapshot, 'r') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            records = []
+            self._write_snapshot(collection, records)
+        except json.JSONDecodeError:
+            records = []
+
+        self._records[collection] = records
+        self._by_id[collection] = {r['id']: r for r in records if 'id' in r}
+
+        rotated = self._rotated_path(collection)
+        journal = self._journal_path(collection)
+        interrupted = rotated.exists()
+        if interrupted:
+            self._replay(collection, rotated)
+        self._replay(collection, journal)
+
+        self._journals[collection] = open(journal, 'a')
+        self._journal_bytes[collection] = journal.stat().st_size
+
+        # Finish a compaction that was cut short, or one that is overdue
+        if interrupted or self._journal_bytes[collection] >= self.compact_threshold:
+            self._compact(collection)
+
+    def _replay(self, collection: str, journal: Path) -> None:
+        if not journal.exists():
+            return
+        with open(journal, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from a crash mid-append
+                    break
+                self._apply(collection, entry)
+
+    def _apply(self, collection: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        op = entry['op']
+        by_id = self._by_id[collection]
+        if op == 'insert':
+            record = entry['record']
+            existing = by_id.get(record.get('id'))
+            if existing is not None:
+                existing.clear()
+                existing.update(record)
+                return existing
+            self._records[collection].append(record)
+            if 'id' in record:
+                by_id[record['id']] = record
+            return record
+        if op == 'update':
+            record = by_id.get(entry['id'])
+            if record is not None:
+                record.update(entry['changes'])
+            return record
+        if op == 'replace':
+            self._records[collection] = list(entry['records'])
+            self._by_id[collection] = {r['id']: r for r in entry['records'] if 'id' in r}
+            return None
+        raise ValueError(f"Unknown journal operation: {op}")
+
+    # ---- writes ----
+    def _append(self, collection: str, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry) + '\n'
+        journal = self._journals[collection]
+        journal.write(line)
+        journal.flush()
+        if self.sync:
+            os.fsync(journal.fileno())
+        self._journal_bytes[collection] += len(line)
+
+    def _log(self, collection: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._append(collection, entry)
+            result = self._apply(collection, entry)
+            self._versions[collection] += 1
+            if self._journal_bytes[collection] >= self.compact_threshold:
+                self._schedule_compaction(collection)
+            return result
+
+    def load(self, collection: str) -> List[Dict[str, Any]]:
+        """Return the records of a collection (a fresh list, shared dicts)"""
+        with self._lock:
+            return list(self._records[collection])
+
+    def refresh(self, collection: str) -> None:
+        """Nothing to do: the state lives in this process (one writer per data folder)"""
+
+    def replace(self, collection: str, records: List[Dict[str, Any]]) -> None:
+        self._log(collection, {'op': 'replace', 'records': records})
+
+    def insert(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self._log(collection, {'op': 'insert', 'record': record})
+
+    def update(self, collection: str, record_id: str,
+               changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if record_id not in self._by_id[collection]:
+                return None
+            return self._log(collection, {'op': 'update', 'id': record_id, 'changes': changes})
+
+    # ---- compaction ----
+    def _schedule_compaction(self, collection: str) -> None:
+        if collection in self._compacting:
+            return
+        if not self.background:
+            self._compact(collection)
+            return
+        worker = threading.Thread(target=self._compact_in_background,
+                                  args=(collection,), daemon=True)
+        self._compacting[collection] = worker
+        worker.start()
+
+    def _compact_in_background(self, collection: str) -> None:
+        try:
+            self._compact(collection)
+        except Exception as e:
+            # The rotated journal is kept and folded in by the next compaction
+            print(f"Journal compaction of {collection} failed: {e}")
+        finally:
+            with self._lock:
+                self._compacting.pop(collection, None)
+
+    def _compact(self, collection: str) -> None:
+        """Fold the journal into the snapshot.
+
+        The journal is rotated under the lock so writers can keep appending
+        to a fresh one while the (slow) snapshot write happens without it.
+        """
+        rotated = self._rotated_path(collection)
+        journal = self._journal_path(collection)
+        with self._lock:
+            self._journals[collection].close()
+            if rotated.exists():
+                # Left over from a failed compaction: fold everything in
+                # while holding the lock, then start from an empty journal.
+                self._write_snapshot(collection, self._records[collection])
+                rotated.unlink()
+                self._journals[collection] = open(journal, 'w')
+                self._journal_bytes[collection] = 0
+                return
+            os.replace(journal, rotated)
+            self._journals[collection] = open(journal, 'a')
+            self._journal_bytes[collection] = 0
+            # Copy the records so later updates can't race the serializer
+            snapshot = [dict(r) for r in self._records[collection]]
+
+        self._write_snapshot(collection, snapshot)
+        rotated.unlink()
+
+    def _write_snapshot(self, collection: str, records: List[Dict[str, Any]]) -> None:
+        write_json(self.files[collection], records, backup=self.backup)
+
+    def compact(self, collection: Optional[str] = None) -> None:
+        """Synchronously compact one collection, or all of them"""
+        names = [collection] if collection else list(self.files)
+        for name in names:
+            worker = self._compacting.get(name)
+            if worker is not None:
+                worker.join()
+            self._compact(name)
+
+    def version(self, collection: str) -> int:
+        """Change counter for a collection, used to validate derived indexes"""
+        return self._versions[collection]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'records': {name: len(records) for name, records in self._records.items()},
+                'journal_bytes': dict(self._journal_bytes),
+                'compacting': list(self._compacting)
+            }
+
+    def close(self) -> None:
+        """Wait for background compactions, close the journals and unlock the folder"""
+        for worker in list(self._compacting.values()):
+            worker.join()
+        with self._lock:
+            for journal in self._journals.values():
+                journal.close()
+        self._release_owner_locks()
+
+    def _release_owner_locks(self) -> None:
+        for owner in self._owner_locks:
+            owner.release()
+        self._owner_locks = []
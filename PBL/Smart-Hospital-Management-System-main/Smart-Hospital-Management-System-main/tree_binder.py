@@ -0,0 +1,70 @@
+from typing import Dict, List, Any, Optional, Callable, Iterable, Sequence, Tuple
+
+
+class TreeBinder:
+    """Keeps the rows of a ttk.Treeview in step with a list of records.
+
+    Rows are keyed by record id (the Treeview item id is the record key),
+    and bind() only issues Tk calls for rows that were added, removed,
+    changed or moved since the previous bind(). Refreshing a large table
+    after one edit therefore costs one row operation.
+
+    All row changes of the tree must go through the binder; call reset()
+    if something else cleared it.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows: Dict[str, Tuple[tuple, tuple]] = {}  # iid -> (values, tags)
+        self._order: List[str] = []
+
+    def bind(self, records: Iterable[Dict[str, Any]],
+             values: Callable[[Dict[str, Any]], Sequence[Any]],
+             tags: Optional[Callable[[Dict[str, Any]], Sequence[str]]] = None,
+             key: str = 'id') -> None:
+        """Show exactly ``records``, in order, with one row per record"""
+        rows = {}
+        order = []
+        for record in records:
+            iid = str(record[key])
+            if iid in rows:
+                # Duplicate keys in legacy data still get their own row
+                n = 2
+                while f"{iid}#{n}" in rows:
+                    n += 1
+                iid = f"{iid}#{n}"
+            rows[iid] = (tuple(values(record)), tuple(tags(record)) if tags else ())
+            order.append(iid)
+
+        tree = self.tree
+        removed = [iid for iid in self._order if iid not in rows]
+        if removed:
+            tree.delete(*removed)
+
+        kept = [iid for iid in self._order if iid in rows]
+        kept_set = set(kept)
+        in_place = kept == [iid for iid in order if iid in kept_set]
+
+        for position, iid in enumerate(order):
+            row = rows[iid]
+            old = self._rows.get(iid)
+            if old is None:
+                tree.insert('', position if in_place else 'end', iid=iid,
+                            values=row[0], tags=row[1])
+            elif old != row:
+                tree.item(iid, values=row[0], tags=row[1])
+
+        if not in_place:
+            for position, iid in enumerate(order):
+                tree.move(iid, '', position)
+
+        self._rows = rows
+        self._order = order
+
+    def reset(self) -> None:
+        """Remove every row and forget the bound records"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._rows = {}
+        self._order = []
@@ -0,0 +1,180 @@
+import difflib
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+
+# Field values are indexed as START + value + END so prefix and whole-word
+# queries have trigrams of their own; SEP keeps fields from running together
+START, END, SEP = '\x02', '\x03', '\x1f'
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """In-memory trigram inverted index over some text fields of a collection.
+
+    Every record is reduced to one lower-cased text holding its indexed
+    fields, and each trigram of that text maps to the set of records that
+    contain it. A substring query only has to verify the records found in
+    all of its trigrams' posting sets, smallest set first, instead of
+    scanning the collection. Queries shorter than a trigram fall back to a
+    scan of the stored texts.
+
+    Records are kept by key (``id`` by default) and patched with add(),
+    update() and remove() as the collection is written. Results come back
+    in the order the records were added. All methods are thread-safe, so
+    searches can run on a worker while the Tk thread writes.
+    """
+
+    def __init__(self, fields: Sequence[str], records: Iterable[Dict[str, Any]] = (),
+                 key: str = 'id'):
+        self.fields = tuple(fields)
+        self.key = key
+        self._lock = threading.Lock()
+        self._postings: Dict[str, set] = {}
+        self._texts: Dict[int, str] = {}
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._docs: Dict[Any, List[int]] = {}  # key -> doc numbers
+        self._next_doc = 0
+        for record in records:
+            self._add(record)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _text(self, record: Dict[str, Any]) -> str:
+        return SEP.join(START + str(record.get(field, '')).lower() + END
+                        for field in self.fields)
+
+    def _index(self, doc: int, record: Dict[str, Any]) -> None:
+        text = self._text(record)
+        self._texts[doc] = text
+        self._records[doc] = record
+        postings = self._postings
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            found = postings.get(gram)
+            if found is None:
+                postings[gram] = {doc}
+            else:
+                found.add(doc)
+
+    def _unindex(self, doc: int) -> None:
+        for gram in trigrams(self._texts.pop(doc)):
+            postings = self._postings[gram]
+            postings.discard(doc)
+            if not postings:
+                del self._postings[gram]
+        del self._records[doc]
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        doc = self._next_doc
+        self._next_doc += 1
+        self._docs.setdefault(record.get(self.key), []).append(doc)
+        self._index(doc, record)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._add(record)
+
+    def update(self, record: Dict[str, Any]) -> None:
+        """Re-index the record with this record's key, keeping its position"""
+        with self._lock:
+            docs = self._docs.get(record.get(self.key))
+            if not docs:
+                self._add(record)
+                return
+            self._unindex(docs[0])
+            self._index(docs[0], record)
+
+    def remove(self, key_value: Any, first_only: bool = False) -> None:
+        """Drop the records with this key (only the oldest with first_only)"""
+        with self._lock:
+            docs = self._docs.pop(key_value, [])
+            if first_only and len(docs) > 1:
+                self._docs[key_value] = docs[1:]
+                docs = docs[:1]
+            for doc in docs:
+                self._unindex(doc)
+
+    def search(self, term: str, prefix: bool = False) -> List[Dict[str, Any]]:
+        """Records with ``term`` in one of the indexed fields (case-insensitive).
+        With prefix=True the field has to start with it."""
+        term = term.lower()
+        if prefix:
+            term = START + term
+        with self._lock:
+            if not term:
+                docs = list(self._records)
+            elif len(term) < 3:
+                docs = [doc for doc, text in self._texts.items() if term in text]
+            else:
+                docs = self._candidates(term)
+                if docs is None:
+                    return []
+                if len(term) > 3:
+                    texts = self._texts
+                    docs = [doc for doc in docs if term in texts[doc]]
+            docs.sort()
+            records = self._records
+            return [records[doc] for doc in docs]
+
+    def _candidates(self, term: str) -> Optional[List[int]]:
+        postings = []
+        for gram in trigrams(term):
+            found = self._postings.get(gram)
+            if found is None:
+                return None
+            postings.append(found)
+        postings.sort(key=len)
+        result = postings[0]
+        for found in postings[1:]:
+            result = result.intersection(found)
+            if not result:
+                return None
+        return list(result)
+
+    def fuzzy(self, term: str, limit: int = 10, cutoff: float = 0.6,
+              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Records whose field value is closest to ``term``, best first.
+
+        Candidates are the records sharing the most trigrams with the term
+        (padded like the field values, so misspelt names still share their
+        first and last letters); they are then ranked by the best
+        difflib.SequenceMatcher ratio against ``fields`` (all indexed fields
+        by default) or a run of their words, keeping those of at least
+        ``cutoff``.
+        """
+        term = term.strip().lower()
+        if not term:
+            return []
+        fields = tuple(fields or self.fields)
+        with self._lock:
+            shared = Counter()
+            for gram in trigrams(START + term + END):
+                shared.update(self._postings.get(gram, ()))
+            candidates = [(doc, self._records[doc])
+                          for doc, _ in shared.most_common(max(limit * 10, 50))]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(term)
+        width = len(term.split())
+        scored = []
+        for doc, record in candidates:
+            best = 0.0
+            for field in fields:
+                # Compare with the whole value and with each run of as many
+                # words as the term has ('jon' vs 'John Smith' -> 'john')
+                words = str(record.get(field, '')).lower().split()
+                spans = {' '.join(words)}
+                spans.update(' '.join(words[i:i + width])
+                             for i in range(len(words) - width + 1))
+                for span in spans:
+                    matcher.set_seq1(span)
+                    if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                        best = max(best, matcher.ratio())
+            if best >= cutoff:
+                scored.append((best, -doc, record))
+        return [record for _, _, record in heapq.nlargest(limit, scored, key=lambda s: s[:2])]
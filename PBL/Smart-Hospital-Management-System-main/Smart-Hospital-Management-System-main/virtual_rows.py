@@ -0,0 +1,119 @@
+from tkinter import ttk
+from typing import Dict, Any, Optional, Callable, Sequence
+
+from tree_binder import TreeBinder
+
+
+class VirtualRows:
+    """Windowed rendering for a ttk.Treeview.
+
+    Only the rows that fit in the widget exist in Tk; the rest of the
+    records stay in the backing source and are paged in as the user
+    scrolls. The source can be any sequence that supports len() and
+    slicing (a list, or a lazy wrapper over a database query).
+
+    bind() has the same signature as TreeBinder.bind(), so a listing
+    screen switches by replacing ``TreeBinder(tree)`` with
+    ``VirtualRows(tree, scrollbar)``. Rows are keyed by record id as
+    before; a selection is dropped once its row scrolls out of view.
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar=None, wheel_rows: int = 3):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.wheel_rows = wheel_rows
+        self.offset = 0
+        self.visible = int(tree.cget('height')) or 10
+
+        self._binder = TreeBinder(tree)
+        self._source: Sequence[Dict[str, Any]] = []
+        self._values: Optional[Callable] = None
+        self._tags: Optional[Callable] = None
+        self._key = 'id'
+
+        # The tree never scrolls by itself; the scrollbar drives the window
+        tree.configure(yscrollcommand='')
+        if scrollbar is not None:
+            scrollbar.config(command=self.yview)
+        tree.bind('<Configure>', self._on_resize, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self._on_wheel, add='+')
+        for sequence in ('<Up>', '<Down>', '<Prior>', '<Next>'):
+            tree.bind(sequence, self._on_key, add='+')
+
+    def bind(self, source: Sequence[Dict[str, Any]],
+             values: Callable[[Dict[str, Any]], Sequence[Any]],
+             tags: Optional[Callable[[Dict[str, Any]], Sequence[str]]] = None,
+             key: str = 'id') -> None:
+        """Show ``source``, keeping the current scroll position if possible"""
+        self._source = source
+        self._values = values
+        self._tags = tags
+        self._key = key
+        self._render()
+
+    def __len__(self) -> int:
+        return len(self._source)
+
+    def scroll_to(self, index: int) -> None:
+        """Make row ``index`` of the source the first visible row"""
+        self.offset = index
+        self._render()
+
+    def yview(self, *args) -> None:
+        """Scrollbar command ('moveto', fraction) / ('scroll', n, what)"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self._source)))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible
+            self.scroll_to(self.offset + step)
+
+    def _render(self) -> None:
+        total = len(self._source)
+        self.offset = max(0, min(self.offset, total - self.visible))
+        window = self._source[self.offset:self.offset + self.visible]
+        if self._values is not None:
+            self._binder.bind(window, self._values, self._tags, self._key)
+        if self.scrollbar is not None:
+            if total:
+                self.scrollbar.set(self.offset / total, (self.offset + len(window)) / total)
+            else:
+                self.scrollbar.set(0, 1)
+
+    def _on_resize(self, event) -> None:
+        rowheight = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # One row's worth of height goes to the headings
+        visible = max(1, event.height // rowheight - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_wheel(self, event) -> str:
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_to(self.offset + (-self.wheel_rows if up else self.wheel_rows))
+        return 'break'
+
+    def _on_key(self, event) -> Optional[str]:
+        """Scroll the window when keyboard navigation reaches its edge"""
+        children = self.tree.get_children()
+        if not children:
+            return None
+        focus = self.tree.focus()
+        if event.keysym == 'Down' and focus == children[-1]:
+            step, edge = 1, -1
+        elif event.keysym == 'Up' and focus == children[0]:
+            step, edge = -1, 0
+        elif event.keysym == 'Next':
+            step, edge = self.visible, -1
+        elif event.keysym == 'Prior':
+            step, edge = -self.visible, 0
+        else:
+            return None
+        self.scroll_to(self.offset + step)
+        children = self.tree.get_children()
+        if children:
+            self.tree.focus(children[edge])
+            self.tree.selection_set(children[edge])
+        return 'break'
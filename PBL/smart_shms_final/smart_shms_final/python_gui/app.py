@@ -1,9 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
-import csv, os, subprocess, json, qrcode
+import csv, os, shutil, subprocess, json, qrcode
 from datetime import datetime
 import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE, 'data')
@@ -19,12 +20,35 @@ def read_csv(fname):
     with open(path, newline='', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
+def atomic_write(path, write, newline=None):
+    # unique temp file next to path, fsynced and renamed over it, then the folder
+    # fsynced: a crash (or a second writer) never leaves a truncated or mixed file
+    directory, name = os.path.split(os.path.abspath(path))
+    temp = os.path.join(directory, f'.{name}.{os.getpid()}.{os.urandom(4).hex()}.tmp')
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline=newline) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temp, os.stat(path).st_mode & 0o7777)
+        os.replace(temp, path)
+    except BaseException:
+        try: os.remove(temp)
+        except OSError: pass
+        raise
+    if os.name == 'posix':
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try: os.fsync(dir_fd)
+        finally: os.close(dir_fd)
+
 def write_csv(fname, fieldnames, rows):
-    path = os.path.join(DATA_DIR, fname)
-    with open(path, 'w', newline='', encoding='utf-8') as f:
+    def write(f):
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows)
+    atomic_write(os.path.join(DATA_DIR, fname), write, newline='')
 
 # Simple PDF generator using reportlab if available
 def generate_pdf_bill(bill_rec, out_path):
@@ -47,6 +71,25 @@ def generate_pdf_bill(bill_rec, out_path):
     c.save()
     return True
 
+def _preload_reportlab():
+    # worker initializer: import reportlab once per worker, not per bill
+    try:
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+    except Exception:
+        pass
+
+# PDF bills are written by worker processes so the UI never waits on them
+_pdf_pool = None
+def pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        try:
+            _pdf_pool = ProcessPoolExecutor(max_workers=2, initializer=_preload_reportlab)
+        except (OSError, NotImplementedError):
+            _pdf_pool = ThreadPoolExecutor(max_workers=1, initializer=_preload_reportlab)
+    return _pdf_pool
+
 class RoleLogin(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -404,6 +447,7 @@ class MainApp(tk.Tk):
         ttk.Button(btnf, text='Generate Bill', command=lambda: self.generate_bill(tree)).pack(side='left', padx=4)
         ttk.Button(btnf, text='Undo Last (Java stack)', command=self.java_undo_bill).pack(side='left', padx=4)
         ttk.Button(btnf, text='Download PDF', command=lambda: self.download_selected_pdf(tree)).pack(side='left', padx=4)
+        ttk.Button(btnf, text="Today's PDFs", command=self.generate_todays_pdfs).pack(side='left', padx=4)
 
     def generate_bill(self, tree):
         win = tk.Toplevel(self); win.title('Generate Bill')
@@ -435,17 +479,42 @@ class MainApp(tk.Tk):
             if b['billId']==str(billId):
                 b['paid']='yes'
                 write_csv('bills.csv',['billId','patientId','amount','date','mode','paid'], self.bills)
-                # generate PDF
+                # generate PDF in the background
                 out = os.path.join(BASE,'images', f'bill_{billId}.pdf')
-                ok = generate_pdf_bill(b, out)
-                if ok:
-                    messagebox.showinfo('Paid','Payment recorded and PDF bill generated at images/{}.pdf'.format(billId))
-                else:
-                    messagebox.showinfo('Paid','Payment recorded but reportlab not installed; cannot generate PDF.')
+                def finished(futures):
+                    error = futures[0].exception()
+                    if error is not None:
+                        messagebox.showerror('Paid','Payment recorded but the PDF bill could not be generated: {}'.format(error))
+                    elif futures[0].result():
+                        messagebox.showinfo('Paid','Payment recorded and PDF bill generated at images/{}.pdf'.format(billId))
+                    else:
+                        messagebox.showinfo('Paid','Payment recorded but reportlab not installed; cannot generate PDF.')
+                self.when_done([pdf_pool().submit(generate_pdf_bill, dict(b), out)], finished)
                 break
         if win: win.destroy()
         self.refresh_current_tab()
 
+    def generate_todays_pdfs(self):
+        # batch: a PDF for every paid bill dated today, written in parallel
+        today = datetime.now().strftime('%Y-%m-%d')
+        bills = [b for b in self.bills if b.get('date') == today and b.get('paid') == 'yes']
+        if not bills:
+            messagebox.showinfo('PDFs', 'No paid bills dated today.')
+            return
+        futures = [pdf_pool().submit(generate_pdf_bill, dict(b), os.path.join(BASE,'images', f"bill_{b['billId']}.pdf"))
+                   for b in bills]
+        def finished(futures):
+            ok = sum(1 for f in futures if f.exception() is None and f.result())
+            messagebox.showinfo('PDFs', f'{ok} of {len(futures)} PDF bill(s) generated in images/')
+        self.when_done(futures, finished)
+
+    def when_done(self, futures, callback):
+        # poll from the Tk loop; callback(futures) runs on the Tk thread
+        if all(f.done() for f in futures):
+            callback(futures)
+            return
+        self.after(100, lambda: self.when_done(futures, callback))
+
     def download_selected_pdf(self, tree):
         sel = tree.selection()
         if not sel: messagebox.showerror('Select','Select a bill to download'); return